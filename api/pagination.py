@@ -1,7 +1,16 @@
 """
 custom pagination support
 """
+import base64
+import json
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 # NOTE: this value is set here for v1 api support
 DEFAULT_PAGINATION_SIZE = 20
@@ -14,14 +23,28 @@ def _is_positive(integer_string):
     return int(integer_string) > 0
 
 
-def _get_count(queryset):
+def estimate_count(queryset):
     """
-    Determine an object count, supporting either querysets or regular lists.
+    Estimate the number of objects in `queryset` from the postgres
+    statistics instead of counting them: `pg_class.reltuples` for a whole
+    table, the planner's row estimate for a filtered queryset.
     """
-    try:
-        return queryset.count()
-    except (AttributeError, TypeError):
-        return len(queryset)
+    connection = connections[queryset.db]
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            return max(int(row[0]), 0) if row else 0
+        sql, params = query.sql_with_params()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, basestring):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -30,6 +53,168 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
 
 
+class KeysetPagination(StandardResultsSetPagination):
+    """
+    Page numbers by default, keyset pages when `?cursor` is given.
+
+    Keyset pages are ordered by `keyset_ordering` (of the view, defaults to
+    newest first) and start after the last object of the previous page, so
+    reaching any page costs the same, no matter how deep it is, and nothing
+    is counted. Start with an empty `?cursor=` and follow `next`.
+
+    With `?estimate_count=true`, the number of objects is estimated from
+    the postgres statistics rather than counted (see `estimate_count`) and
+    returned in the X-Estimated-Count header. Pages are then not counted
+    either: whether there is a `next` page is found by reading one more
+    object than the page holds.
+    """
+    cursor_query_param = 'cursor'
+    estimate_count_query_param = 'estimate_count'
+    estimated_count_header = 'X-Estimated-Count'
+    keyset_ordering = ('-start_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset = self.cursor_query_param in request.query_params
+        self.estimated_count = None
+        if self.estimate_count_requested(request):
+            self.estimated_count = estimate_count(queryset)
+        if not self.keyset:
+            if self.estimated_count is not None:
+                return self.paginate_uncounted(queryset, request)
+            return super(KeysetPagination, self).paginate_queryset(
+                queryset, request, view=view
+            )
+
+        self.keyset_ordering = getattr(
+            view, 'keyset_ordering', self.keyset_ordering
+        )
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.keyset_ordering)
+        if position:
+            queryset = queryset.filter(self.after(position))
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.results = results[:page_size]
+        return self.results
+
+    def paginate_uncounted(self, queryset, request):
+        """
+        The page of `?page=` without counting the objects: the page after
+        it exists if one more object than the page holds can be read.
+        """
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            raise NotFound("Invalid page.")
+        if self.page_number < 1:
+            raise NotFound("Invalid page.")
+        start = (self.page_number - 1) * page_size
+        results = list(queryset[start:start + page_size + 1])
+        if not results and self.page_number > 1:
+            raise NotFound("Invalid page.")
+        self.has_next = len(results) > page_size
+        self.results = results[:page_size]
+        return self.results
+
+    def estimate_count_requested(self, request):
+        value = request.query_params.get(self.estimate_count_query_param, '')
+        return value.lower() == 'true'
+
+    def after(self, position):
+        """
+        Filter for the objects after `position` (the values of the keyset
+        fields of the last object of the previous page)
+        """
+        after = Q()
+        equal = Q()
+        for (ordering, value) in zip(self.keyset_ordering, position):
+            field = ordering.lstrip('-')
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            after |= equal & Q(**{'%s__%s' % (field, lookup): value})
+            equal &= Q(**{field: value})
+        return after
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(position, list)\
+                or len(position) != len(self.keyset_ordering):
+            raise NotFound("Invalid cursor")
+        return position
+
+    def encode_cursor(self, obj):
+        position = []
+        for ordering in self.keyset_ordering:
+            value = obj
+            for attr in ordering.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            position.append(value)
+        # Keep the full precision of datetimes, unlike DjangoJSONEncoder
+        return base64.urlsafe_b64encode(
+            json.dumps(position, default=lambda value: value.isoformat())
+        )
+
+    def get_next_link(self):
+        if not self.keyset and self.estimated_count is None:
+            return super(KeysetPagination, self).get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.keyset:
+            return replace_query_param(
+                url, self.page_query_param, self.page_number + 1
+            )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.results[-1])
+        )
+
+    def get_previous_link(self):
+        if self.estimated_count is None:
+            return super(KeysetPagination, self).get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            response = Response(
+                OrderedDict(
+                    [('next', self.get_next_link()), ('results', data)]
+                )
+            )
+        elif self.estimated_count is not None:
+            response = Response(
+                OrderedDict(
+                    [
+                        ('next', self.get_next_link()),
+                        ('previous', self.get_previous_link()),
+                        ('results', data)
+                    ]
+                )
+            )
+        else:
+            response = super(KeysetPagination,
+                             self).get_paginated_response(data)
+        if self.estimated_count is not None:
+            response[self.estimated_count_header] = self.estimated_count
+        return response
+
+
 class OptionalPagination(PageNumberPagination):
     """
     Defaults to no pagination but supports pagination
@@ -40,11 +225,27 @@ class OptionalPagination(PageNumberPagination):
     def paginate_queryset(self, queryset, request, view=None):
         if self.has_page(request):
             self.page_size = DEFAULT_PAGINATION_SIZE
-        else:
-            self.page_size = _get_count(queryset)
+            return super(OptionalPagination, self).paginate_queryset(
+                queryset, request, view=view
+            )
+        # Everything in a single 'page', without counting it first
+        self.page = None
+        self.results = list(queryset)
+        if not self.results:
+            # Like an empty page_size, nothing to paginate
+            return None
+        return self.results
 
-        return super(OptionalPagination, self).paginate_queryset(
-            queryset, request, view=view
+    def get_paginated_response(self, data):
+        if self.page is not None:
+            return super(OptionalPagination, self).get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ('count', len(self.results)), ('next', None),
+                    ('previous', None), ('results', data)
+                ]
+            )
         )
 
     def has_page(self, request):
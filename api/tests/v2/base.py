@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 
@@ -69,3 +73,21 @@ class APISanityTestCase(object):
         )
         response = client.get(url)
         self.assertEquals(response.status_code, 404)
+
+
+class QueryBudgetTestCase(object):
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        """
+        Fail if the wrapped block runs more than `budget` queries,
+        listing the queries that were run.
+        """
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context)
+        self.assertLessEqual(
+            executed, budget, "%s queries executed, budget is %s:\n%s" % (
+                executed, budget,
+                "\n".join(query['sql'] for query in context.captured_queries)
+            )
+        )
@@ -157,3 +157,19 @@ class ApplicationTests(APITestCase, APISanityTestCase):
 
     def test_delete_endpoint_does_not_exist(self):
         self.assertTrue('delete' not in ViewSet.http_method_names)
+
+    def test_search_matches_change_log_and_identifier(self):
+        self.public_version.change_log = 'Upgraded the kernel'
+        self.public_version.save()
+        factory = APIRequestFactory()
+        list_url = reverse(self.url_route + '-list')
+        identifier = str(self.public_machine.instance_source.identifier)
+        for search in ['upgraded kernel', identifier[:-1]]:
+            request = factory.get(list_url, {'search': search})
+            force_authenticate(request, user=self.user)
+            response = self.list_view(request)
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(
+                [image['id'] for image in response.data['results']],
+                [self.public_image.id]
+            )
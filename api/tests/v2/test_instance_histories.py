@@ -0,0 +1,60 @@
+import uuid
+from datetime import timedelta
+
+from django.core.urlresolvers import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.factories import (
+    IdentityFactory, InstanceFactory, InstanceHistoryFactory,
+    InstanceStatusFactory, ProviderFactory, ProviderMachineFactory, UserFactory
+)
+
+
+class InstanceHistoryTests(APITestCase):
+    url_route = 'api:v2:instancestatushistory'
+
+    def setUp(self):
+        self.user = UserFactory.create()
+        identity = IdentityFactory.create_identity(
+            created_by=self.user, provider=ProviderFactory.create()
+        )
+        machine = ProviderMachineFactory.create_provider_machine(
+            self.user, identity
+        )
+        statuses = [
+            InstanceStatusFactory.create(name=name)
+            for name in ['build', 'active', 'suspended']
+        ]
+        now = timezone.now()
+        self.instances = []
+        for index in range(4):
+            instance = InstanceFactory.create(
+                provider_alias=uuid.uuid4(),
+                source=machine.instance_source,
+                created_by=self.user,
+                created_by_identity=identity,
+                start_date=now - timedelta(hours=index)
+            )
+            # Several histories per instance
+            for status in statuses:
+                InstanceHistoryFactory.create(
+                    status=status, instance=instance, start_date=now
+                )
+            self.instances.append(instance)
+
+    def test_unique_keyset_pages_cover_every_instance_once(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse(self.url_route + "-list") +\
+            "?unique=true&cursor=&page_size=1"
+        seen = []
+        while url:
+            response = client.get(url)
+            self.assertEquals(response.status_code, 200)
+            seen.extend(
+                history['instance']['id']
+                for history in response.data['results']
+            )
+            url = response.data['next']
+        self.assertEquals(seen, [instance.id for instance in self.instances])
@@ -2,6 +2,8 @@ import uuid
 import mock
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from rest_framework.test import APIClient
@@ -12,11 +14,11 @@ from api.tests.factories import (
     InstanceStatusFactory, ProviderMachineFactory, IdentityFactory,
     ProviderFactory
 )
-from .base import APISanityTestCase
+from .base import APISanityTestCase, QueryBudgetTestCase
 from api.v2.views import InstanceViewSet
 
 
-class InstanceTests(APITestCase, APISanityTestCase):
+class InstanceTests(APITestCase, APISanityTestCase, QueryBudgetTestCase):
     url_route = 'api:v2:instance'
 
     def setUp(self):
@@ -164,3 +166,84 @@ class InstanceTests(APITestCase, APISanityTestCase):
         with mock.patch('api.v2.views.instance.destroy_instance'):
             response = client.delete(url, HTTP_ACCEPT='application/json')
         self.assertEquals(response.status_code, 204)
+
+    def test_list_queries_do_not_grow_with_instances(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse(self.url_route + "-list")
+        with CaptureQueriesContext(connection) as baseline:
+            response = client.get(url)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.data['count'], 4)
+
+        active = InstanceStatusFactory.create(name='active')
+        for index in range(10):
+            instance = InstanceFactory.create(
+                name="Instance %s" % index,
+                provider_alias=uuid.uuid4(),
+                source=self.machine.instance_source,
+                created_by=self.user,
+                created_by_identity=self.user_identity,
+                start_date=timezone.now()
+            )
+            InstanceHistoryFactory.create(
+                status=active, activity="", instance=instance
+            )
+
+        with self.assertMaxQueries(len(baseline)):
+            response = client.get(url)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.data['count'], 14)
+
+    def test_keyset_pages_cover_every_instance_once(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse(self.url_route + "-list") + "?cursor=&page_size=3"
+        seen = []
+        while url:
+            response = client.get(url)
+            self.assertEquals(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(instance['id'] for instance in response.data['results'])
+            url = response.data['next']
+        expected = [
+            self.deploy_error_instance.id, self.deploying_instance.id,
+            self.networking_instance.id, self.active_instance.id
+        ]
+        self.assertEquals(seen, expected)
+
+    def test_estimated_count_header(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse(self.url_route + "-list") + "?estimate_count=true"
+        response = client.get(url)
+        self.assertEquals(response.status_code, 200)
+        self.assertIn('X-Estimated-Count', response)
+        self.assertNotIn('count', response.data)
+        self.assertEquals(len(response.data['results']), 4)
+
+    def test_wrong_estimate_does_not_change_the_pages(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        first_url = reverse(self.url_route + "-list") +\
+            "?estimate_count=true&page_size=3"
+        for estimate in [1, 1000]:
+            with mock.patch(
+                'api.pagination.estimate_count', return_value=estimate
+            ):
+                seen = []
+                url = first_url
+                while url:
+                    response = client.get(url)
+                    self.assertEquals(response.status_code, 200)
+                    self.assertEquals(
+                        int(response['X-Estimated-Count']), estimate
+                    )
+                    seen.extend(
+                        instance['id'] for instance in response.data['results']
+                    )
+                    url = response.data['next']
+                self.assertEquals(len(seen), 4)
+                self.assertEquals(len(set(seen)), 4)
+                response = client.get(first_url + "&page=3")
+                self.assertEquals(response.status_code, 404)
@@ -1,9 +1,15 @@
 from unittest import skip
 
+from django.http import StreamingHttpResponse
+
 from django.core.urlresolvers import reverse
-from rest_framework.test import APITestCase, APIRequestFactory, force_authenticate
+from rest_framework.test import (
+    APIClient, APITestCase, APIRequestFactory, force_authenticate
+)
 
-from api.tests.factories import UserFactory, AnonymousUserFactory
+from api.tests.factories import (
+    UserFactory, AnonymousUserFactory, InstanceFactory
+)
 from api.v2.views import ReportingViewSet
 
 
@@ -58,3 +64,25 @@ class ReportingTests(APITestCase):
     @skip('skip for now')
     def test_access_not_allowed_provider(self):
         raise NotImplementedError
+
+    def test_stream_csv(self):
+        staff_user = UserFactory.create(is_staff=True)
+        instance = InstanceFactory.create(created_by=staff_user)
+        client = APIClient()
+        client.force_authenticate(user=staff_user)
+        response = client.get(
+            reverse('api:v2:reporting-list'), {
+                'username': staff_user.username,
+                'format': 'csv',
+                'stream': 'true'
+            }
+        )
+        self.assertEquals(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        lines = ''.join(response.streaming_content).splitlines()
+        self.assertEquals(lines[0].split(',')[:2], ['id', 'instance_id'])
+        self.assertEquals(len(lines), 2)
+        self.assertEquals(
+            lines[1].split(',')[:2],
+            [str(instance.id), instance.provider_alias]
+        )
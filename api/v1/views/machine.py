@@ -22,7 +22,7 @@ from core.models.machine import compare_core_machines, filter_core_machine,\
 
 from service.driver import prepare_driver
 from service.machine import update_machine_metadata
-from service.search import search, CoreSearchProvider
+from service.search import search, FullTextSearchProvider
 
 from api.exceptions import (
     invalid_creds, malformed_response, connection_failure, failure_response,
@@ -161,7 +161,7 @@ class MachineSearch(AuthListAPIView):
             return ProviderMachine.objects.all()
 
         identity = Identity.objects.filter(uuid=identity_uuid).first()
-        return search([CoreSearchProvider], identity, query)
+        return search([FullTextSearchProvider], identity, query)
 
 
 class Machine(AuthAPIView):
@@ -19,12 +19,13 @@ from api.exceptions import (
 )
 
 from core.exceptions import ProviderNotActive
-from core.models.provider import AccountProvider
 from core.models.volume import convert_esh_volume
 from core.models.volume import Volume as CoreVolume
 from core.models.instance_source import InstanceSource
 from core.models.group import IdentityMembership
+from core.models.identity import Identity
 
+from service.cache import get_cached_volumes, invalidate_cached_volumes
 from service.driver import prepare_driver
 from service.volume import create_esh_volume,\
     create_bootable_volume,\
@@ -246,13 +247,14 @@ class VolumeList(AuthAPIView):
             return failure_response(status.HTTP_409_CONFLICT, e.message)
         if not esh_driver:
             return invalid_creds(provider_uuid, identity_uuid)
-        volume_list_method = esh_driver.list_volumes
-
-        if AccountProvider.objects.filter(identity__uuid=identity_uuid):
-            # Instance list method changes when using the OPENSTACK provider
-            volume_list_method = esh_driver.list_all_volumes
         try:
-            esh_volume_list = volume_list_method()
+            identity = Identity.shared_with_user(user).get(
+                provider__uuid=provider_uuid, uuid=identity_uuid
+            )
+        except Identity.DoesNotExist:
+            return invalid_creds(provider_uuid, identity_uuid)
+        try:
+            esh_volume_list = get_cached_volumes(identity=identity)
         except (socket_error, ConnectionFailure):
             return connection_failure(provider_uuid, identity_uuid)
         except LibcloudBadResponseError:
@@ -548,6 +550,9 @@ class Volume(AuthAPIView):
         )
         # Delete the object, update the DB
         esh_driver.destroy_volume(esh_volume)
+        invalidate_cached_volumes(
+            identity=Identity.objects.get(uuid=identity_uuid)
+        )
         core_volume.end_date = now()
         core_volume.save()
         # Return the object
@@ -20,10 +20,10 @@ class AllocationSourceSerializer(serializers.HyperlinkedModelSerializer):
     )
 
     def _get_allocation_source_snapshot(self, allocation_source, attr_name):
-        snapshot = AllocationSourceSnapshot.objects.filter(
-            allocation_source=allocation_source
-        ).first()
-        if not snapshot:
+        # Use the (possibly select_related) one-to-one `snapshot`
+        try:
+            snapshot = allocation_source.snapshot
+        except AllocationSourceSnapshot.DoesNotExist:
             return None
         attr = getattr(snapshot, attr_name)
         return attr
@@ -34,10 +34,18 @@ class AllocationSourceSerializer(serializers.HyperlinkedModelSerializer):
         return self.context['request'].user
 
     def _get_user_allocation_snapshot(self, allocation_source, attr_name):
-        user = self._get_request_user()
-        snapshot = UserAllocationSnapshot.objects.filter(
-            allocation_source=allocation_source, user=user
-        ).first()
+        # Looked up once per allocation source for all of the user_* fields,
+        # and shared through the context by every serializer of a request
+        user_snapshots = self.context.setdefault(
+            'user_allocation_snapshots', {}
+        )
+        source_id = allocation_source.id
+        if source_id not in user_snapshots:
+            user_snapshots[source_id] = UserAllocationSnapshot.objects.filter(
+                allocation_source=allocation_source,
+                user=self._get_request_user()
+            ).first()
+        snapshot = user_snapshots[source_id]
         if not snapshot:
             return None
         attr = getattr(snapshot, attr_name)
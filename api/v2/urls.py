@@ -16,6 +16,9 @@ router.register(r'accounts', views.AccountViewSet, base_name='account')
 router.register(r'allocation_sources', views.AllocationSourceViewSet)
 router.register(r'boot_scripts', views.BootScriptViewSet)
 router.register(r'credentials', views.CredentialViewSet)
+router.register(
+    r'deploy_metrics', views.DeployMetricViewSet, base_name='deploymetrics'
+)
 router.register(r'email_template', views.EmailTemplateViewSet)
 router.register(
     r'email_feedback', views.FeedbackEmailViewSet, base_name='email-feedback'
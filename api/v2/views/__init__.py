@@ -4,6 +4,7 @@ from .allocation_source import AllocationSourceViewSet
 from .boot_script import BootScriptViewSet
 from .base import BaseRequestViewSet
 from .credential import CredentialViewSet
+from .deploy_metric import DeployMetricViewSet
 from .email_template import EmailTemplateViewSet
 from .group import GroupViewSet
 from .help_link import HelpLinkViewSet
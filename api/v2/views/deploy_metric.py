@@ -0,0 +1,50 @@
+"""
+ Timing of instance launches
+"""
+from datetime import timedelta
+
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import list_route
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from api import permissions
+from api.v2.exceptions import failure_response
+from core.models import Instance
+from service.deploy_metrics import render_stage_histograms, time_to_active
+
+
+class DeployMetricViewSet(GenericViewSet):
+    """
+    Durations of the stages of instance launches, as Prometheus histograms
+    (list) and as percentiles of time-to-active (time_to_active).
+    """
+    permission_classes = (
+        permissions.InMaintenance, permissions.CloudAdminRequired
+    )
+    queryset = Instance.objects.none()
+
+    def list(self, *args, **kwargs):
+        return HttpResponse(
+            render_stage_histograms(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+    @list_route()
+    def time_to_active(self, *args, **kwargs):
+        """
+        p50/p95 seconds from launch to active, per provider and image, of
+        the instances launched in the last ?days=30 days
+        """
+        try:
+            days = int(self.request.query_params.get('days', 30))
+        except ValueError:
+            return failure_response(
+                status.HTTP_400_BAD_REQUEST, "Expected a number of 'days'"
+            )
+        instances = Instance.objects.filter(
+            start_date__gte=timezone.now() - timedelta(days=days)
+        )
+        return Response(time_to_active(instances))
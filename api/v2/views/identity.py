@@ -7,6 +7,7 @@ import django_filters
 
 from core.models import Identity, AtmosphereUser
 from core.query import only_current_provider
+from service.quota import get_usage_summary
 
 from api.v2.serializers.details import IdentitySerializer
 from api.v2.views.base import UserListAdminQueryAndUpdate
@@ -52,6 +53,15 @@ class IdentityViewSet(
         export_data = identity.export()
         return Response(export_data, status=status.HTTP_200_OK)
 
+    @detail_route(methods=['GET'])
+    def usage(self, request, pk=None):
+        """
+        The resources used by the identity, as counted against its quota
+        (cached for a few seconds).
+        """
+        identity = self.get_object()
+        return Response(get_usage_summary(identity), status=status.HTTP_200_OK)
+
     def get_queryset(self):
         """
         Filter identities by user
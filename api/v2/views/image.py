@@ -2,11 +2,13 @@ from rest_framework import filters
 import django_filters
 
 from api import permissions
+from api.pagination import KeysetPagination
 from api.v2.serializers.details import ImageSerializer
 from api.v2.views.base import AuthOptionalViewSet
 from api.v2.views.mixins import MultipleFieldLookup
 
 from core.models import Application as Image
+from service.search import full_text_search
 
 #
 # The following imports and method and monkey patch are a quick fix for a big
@@ -94,6 +96,45 @@ class FeaturedFilterBackend(filters.BaseFilterBackend):
         return queryset
 
 
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Search images through their full-text search index, best matches first
+    (unless an ordering is requested). Images matching every search term in
+    one of the other `search_fields` of the view (id, change log, creator,
+    identifier, provider...) still match.
+    """
+    #: Searched through the full-text search index rather than by substring
+    vector_fields = ('name', 'tags__name', 'tags__description')
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        query = ' '.join(search_terms)
+        if not query:
+            return queryset
+        orm_lookups = [
+            self.construct_search(six.text_type(search_field))
+            for search_field in getattr(view, 'search_fields', [])
+            if search_field not in self.vector_fields
+        ]
+        extra = None
+        if orm_lookups:
+            conditions = [
+                reduce(
+                    operator.or_, [
+                        models.Q(**{orm_lookup: search_term})
+                        for orm_lookup in orm_lookups
+                    ]
+                ) for search_term in search_terms
+            ]
+            matching = Image.objects.filter(reduce(operator.and_, conditions))
+            extra = models.Q(id__in=matching.values('id'))
+        ordering = queryset.query.order_by
+        queryset = full_text_search(queryset, query, extra=extra)
+        if filters.OrderingFilter.ordering_param in request.query_params:
+            return queryset.order_by(*ordering)
+        return queryset.order_by('-search_rank', *ordering)
+
+
 class ImageViewSet(MultipleFieldLookup, AuthOptionalViewSet):
     """
     API endpoint that allows images to be viewed or edited.
@@ -108,7 +149,7 @@ class ImageViewSet(MultipleFieldLookup, AuthOptionalViewSet):
     serializer_class = ImageSerializer
     filter_backends = (
         filters.OrderingFilter, filters.DjangoFilterBackend,
-        filters.SearchFilter, FeaturedFilterBackend, BookmarkedFilterBackend
+        FullTextSearchFilter, FeaturedFilterBackend, BookmarkedFilterBackend
     )
     filter_class = ImageFilter
     search_fields = (
@@ -118,6 +159,7 @@ class ImageViewSet(MultipleFieldLookup, AuthOptionalViewSet):
         'versions__machines__instance_source__provider__location'
     )
     ordering = ('-end_date', '-start_date')
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         request_user = self.request.user
@@ -1,6 +1,9 @@
+from collections import OrderedDict
+
 import django_filters
 from django.db.models import Q
 
+from api.pagination import KeysetPagination
 from api.v2.serializers.details import InstanceSerializer, InstanceActionSerializer
 from api.v2.serializers.post import InstanceSerializer as POST_InstanceSerializer
 from api.v2.views.base import AuthModelViewSet
@@ -62,6 +65,7 @@ class InstanceViewSet(MultipleFieldLookup, AuthModelViewSet):
     filter_class = InstanceFilter
     filter_fields = ('created_by__id', 'project')
     lookup_fields = ("id", "provider_alias")
+    pagination_class = KeysetPagination
     http_method_names = [
         'get', 'put', 'patch', 'post', 'delete', 'head', 'options', 'trace'
     ]
@@ -82,10 +86,20 @@ class InstanceViewSet(MultipleFieldLookup, AuthModelViewSet):
         if 'archived' not in self.request.query_params:
             qs = qs.filter(only_current_instances())
         # logger.info("DEBUG- User %s querying for instances, available IDs are:%s" % (user, qs.values_list('id',flat=True)))
+        # Load everything InstanceSerializer reads with the instances, so
+        # listing does not cost extra queries per instance.
         qs = qs.select_related("created_by")\
-            .select_related('created_by_identity')\
-            .select_related('source')\
-            .select_related('project')
+            .select_related('created_by_identity__provider')\
+            .select_related(
+                'source__providermachine__application_version__application')\
+            .select_related('project__created_by')\
+            .select_related('project__owner')\
+            .select_related('last_history__status')\
+            .select_related('last_history__size')\
+            .select_related(
+                'instanceallocationsourcesnapshot__allocation_source__snapshot')\
+            .prefetch_related('created_by_identity__credential_set')\
+            .prefetch_related('scripts__script_type')
         return qs
 
     @detail_route(methods=['post'])
@@ -337,6 +351,7 @@ class InstanceViewSet(MultipleFieldLookup, AuthModelViewSet):
         deploy = data.get('deploy', True)
         project_uuid = data.get('project')
         extra = data.get('extra', {})
+        timings = OrderedDict()
         try:
             identity = Identity.objects.get(uuid=identity_uuid)
             allocation_source = AllocationSource.objects.get(
@@ -349,6 +364,7 @@ class InstanceViewSet(MultipleFieldLookup, AuthModelViewSet):
                 source_alias,
                 name,
                 deploy,
+                timings=timings,
                 allocation_source=allocation_source,
                 **extra
             )
@@ -371,9 +387,15 @@ class InstanceViewSet(MultipleFieldLookup, AuthModelViewSet):
             if boot_scripts:
                 _save_scripts_to_instance(instance, boot_scripts)
             instance.change_allocation_source(allocation_source)
-            return Response(
+            response = Response(
                 serialized_instance.data, status=status.HTTP_201_CREATED
             )
+            # Time taken by each step of the launch
+            response['Server-Timing'] = ', '.join(
+                '%s;dur=%.1f' % (step, duration)
+                for (step, duration) in timings.items()
+            )
+            return response
         except UnderThresholdError as ute:
             return under_threshold(ute)
         except (OverQuotaError, OverAllocationError) as oqe:
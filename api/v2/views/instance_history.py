@@ -5,6 +5,7 @@ import django_filters
 
 from core.models import InstanceStatusHistory
 
+from api.pagination import KeysetPagination
 from api.v2.serializers.details import InstanceStatusHistorySerializer
 from api.v2.views.base import AuthReadOnlyViewSet
 from api.v2.views.mixins import MultipleFieldLookup
@@ -40,6 +41,15 @@ class InstanceStatusHistoryViewSet(MultipleFieldLookup, AuthReadOnlyViewSet):
     lookup_fields = ("id", "uuid")
     filter_class = InstanceStatusHistoryFilter
     filter_backends = (filters.OrderingFilter, filters.DjangoFilterBackend)
+    pagination_class = KeysetPagination
+
+    @property
+    def keyset_ordering(self):
+        if self.request.query_params.get('unique', "").lower() == 'true':
+            # Only the field of distinct(): one history per start date, so
+            # the next page starts strictly after the last start date
+            return ('-instance__start_date', )
+        return KeysetPagination.keyset_ordering
 
     def get_queryset(self):
         """
@@ -10,9 +10,14 @@ from api import permissions
 from api.v2.exceptions import failure_response
 
 from core.models import Instance
-from core.metrics.instance import get_instance_metrics
+from core.metrics.instance import (
+    get_instance_metrics, get_metrics_for_instances
+)
 from threepio import logger
 
+#: Most instances a single list request can ask metrics for
+MAXIMUM_INSTANCES = 50
+
 
 class MetricViewSet(GenericViewSet):
 
@@ -42,3 +47,31 @@ class MetricViewSet(GenericViewSet):
             logger.exception("Failed to retrieve instance metrics")
             return failure_response(status.HTTP_409_CONFLICT, str(exc.message))
         return Response(instance_metrics)
+
+    def list(self, *args, **kwargs):
+        """
+        Metrics of several instances, fetched together:
+        ?instances=<provider_alias>,<provider_alias>,...
+        """
+        params = self.request.query_params
+        aliases = [
+            alias for alias in params.get('instances', '').split(',') if alias
+        ]
+        if not aliases:
+            return failure_response(
+                status.HTTP_400_BAD_REQUEST,
+                "Expected a comma separated list of 'instances'"
+            )
+        if len(aliases) > MAXIMUM_INSTANCES:
+            return failure_response(
+                status.HTTP_400_BAD_REQUEST,
+                "At most %s instances can be requested at once" %
+                MAXIMUM_INSTANCES
+            )
+        instances = self.get_queryset().filter(provider_alias__in=aliases)
+        try:
+            metrics = get_metrics_for_instances(instances, params)
+        except Exception as exc:
+            logger.exception("Failed to retrieve instance metrics")
+            return failure_response(status.HTTP_409_CONFLICT, str(exc.message))
+        return Response(metrics)
@@ -1,11 +1,15 @@
 """
  RESTful Reporting API
 """
+import tempfile
+from wsgiref.util import FileWrapper
+
 import numpy as np
 import pandas as pd
 import pytz
 from dateutil.parser import parse
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from rest_framework import exceptions
 from rest_framework import status
 from rest_framework.settings import api_settings
@@ -15,6 +19,7 @@ from api.v2.exceptions import failure_response
 from api.v2.serializers.details import InstanceReportingSerializer
 from api.v2.views.base import AuthModelViewSet
 from core.models import Instance
+from service.reporting import report_rows, write_csv, write_xlsx
 
 
 class ReportingViewSet(AuthModelViewSet):
@@ -270,6 +275,39 @@ class ReportingViewSet(AuthModelViewSet):
 
         return writer
 
+    @staticmethod
+    def is_streaming(request):
+        """
+        With `?stream=true`, CSV and XLSX reports are streamed
+        (see `stream_report`)
+        """
+        return request.query_params.get('stream', '').lower() == 'true'\
+            and request.accepted_renderer.format in ['csv', 'xlsx']
+
+    def stream_report(self, request, queryset):
+        """
+        Stream the report of `queryset`, written row by row instead of
+        through a pandas DataFrame, so it can cover any number of instances.
+        """
+        report_format = request.accepted_renderer.format
+        filename = request.query_params.get(
+            'filename', 'instance_reporting.%s' % report_format
+        )
+        if report_format == 'xlsx':
+            output = tempfile.TemporaryFile()
+            write_xlsx(output, queryset, self.set_frequency())
+            output.seek(0)
+            response = StreamingHttpResponse(
+                FileWrapper(output),
+                content_type=PandasExcelRenderer.media_type
+            )
+        else:
+            response = StreamingHttpResponse(
+                write_csv(report_rows(queryset)), content_type='text/csv'
+            )
+        response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+        return response
+
     def get_queryset(self):
         request_user = self.request.user
         if request_user.is_staff or request_user.is_superuser:
@@ -337,6 +375,10 @@ class ReportingViewSet(AuthModelViewSet):
                 " ['start_date', 'end_date', 'provider_id']"
             )
         try:
+            if self.is_streaming(request):
+                return self.stream_report(
+                    request, self.filter_queryset(self.get_queryset())
+                )
             results = super(ReportingViewSet,
                             self).list(request, *args, **kwargs)
         except ValueError:
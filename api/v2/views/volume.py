@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from api.exceptions import (inactive_provider)
+from api.pagination import KeysetPagination
 from api.v2.serializers.details import VolumeSerializer, UpdateVolumeSerializer
 from api.v2.serializers.post import VolumeSerializer as POSTVolumeSerializer
 from api.v2.views.base import AuthModelViewSet
@@ -46,6 +47,8 @@ class VolumeViewSet(MultipleFieldLookup, AuthModelViewSet):
     lookup_fields = ("id", "instance_source__identifier")
     serializer_class = VolumeSerializer
     filter_class = VolumeFilter
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-instance_source__start_date', '-id')
     http_method_names = (
         'get', 'post', 'put', 'patch', 'delete', 'head', 'options', 'trace'
     )
@@ -24,12 +24,13 @@ class PredeclareRouter(object):
 
 DEPLOY_TASKS = [
     "_deploy_instance", "_deploy_instance_for_user", "check_web_desktop_task",
-    "_deploy_init_to", "service.tasks.driver._deploy_init_to",
-    "deploy_ready_test", "service.tasks.driver.deploy_ready_test",
-    "check_process_task", "service.tasks.driver.check_process_task",
-    "check_volume_task", "service.tasks.volume.check_volume_task",
-    "mount_volume_task", "service.tasks.volume.mount_volume_task",
-    "unmount_volume_task", "service.tasks.volume.unmount_volume_task"
+    "deploy_queued_instances", "_deploy_init_to",
+    "service.tasks.driver._deploy_init_to", "deploy_ready_test",
+    "service.tasks.driver.deploy_ready_test", "check_process_task",
+    "service.tasks.driver.check_process_task", "check_volume_task",
+    "service.tasks.volume.check_volume_task", "mount_volume_task",
+    "service.tasks.volume.mount_volume_task", "unmount_volume_task",
+    "service.tasks.volume.unmount_volume_task"
 ]
 EMAIL_TASKS = [
     "send_email",
@@ -76,9 +77,13 @@ PERIODIC_TASKS = [
     #ALLOCATION SOURCES - PERIODIC TASKS
     "update_snapshot_cyverse",
     "allocation_threshold_check",
+    "dispatch_events",
+    "refresh_all_application_metrics",
+    "refresh_stale_application_metrics",
 ]
 SHORT_TASKS = [
     "wait_for_instance",
+    "check_pending_instances",
 ]
 
 
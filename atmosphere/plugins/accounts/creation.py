@@ -1,3 +1,5 @@
+import time
+
 from threepio import logger
 from jetstream.allocation import TASAPIDriver
 from cyverse.api import GrouperDriver
@@ -6,6 +8,18 @@ from django.conf import settings
 from service.exceptions import AccountCreationConflict
 
 
+def _account_result(
+    username, project_name=None, identity=None, timings=None, error=None
+):
+    return {
+        'username': username,
+        'project_name': project_name,
+        'identity': identity,
+        'timings': timings or {},
+        'error': error,
+    }
+
+
 class AccountCreationPlugin(object):
     """
     Validation plugins must implement a create_accounts function that
@@ -37,6 +51,43 @@ class AccountCreationPlugin(object):
             provider=provider
         ).filter(contains_credential('key', username))
 
+    def create_many_accounts(
+        self, provider, usernames, force=False, concurrency=None
+    ):
+        """
+        Create the accounts of each user of `usernames`, one user at a time.
+        Returns the {'username', 'project_name', 'identity', 'timings',
+        'error'} of each account (see `AccountDriver.create_accounts`).
+        """
+        results = []
+        for username in usernames:
+            start_time = time.time()
+            try:
+                identities = self.create_accounts(
+                    provider, username, force=force
+                )
+            except Exception as exc:
+                logger.exception(
+                    "Could *NOT* Create NEW account for %s" % username
+                )
+                error = "%s: %s" % (type(exc).__name__, exc)
+                results.append(_account_result(username, error=error))
+                continue
+            timings = {'accounts': (time.time() - start_time) * 1000}
+            if not identities:
+                error = "No account was created for %s" % username
+                results.append(_account_result(username, error=error))
+            for identity in identities:
+                results.append(
+                    _account_result(
+                        username,
+                        identity.project_name(),
+                        identity=str(identity.uuid),
+                        timings=timings
+                    )
+                )
+        return results
+
 
 class DirectOpenstackAccount(AccountCreationPlugin):
     """
@@ -121,10 +172,10 @@ class AtmosphereAccountCreationPlugin(AccountCreationPlugin):
         raise NotImplementedError("See docs")
 
     def create_accounts(self, provider, username, force=False):
-        from service.driver import get_account_driver
-        from core.models import Project, Identity
+        from core.models import Identity
         credentials_list = self.get_credentials_list(provider, username)
         identities = Identity.objects.none()
+        account_driver = None
         for credentials in credentials_list:
             try:
                 project_name = credentials['project_name']
@@ -138,41 +189,98 @@ class AtmosphereAccountCreationPlugin(AccountCreationPlugin):
                     "Creating new account for %s with credentials - %s" %
                     (username, credentials)
                 )
-                account_driver = get_account_driver(provider)
                 if not account_driver:
-                    raise ValueError(
-                        "Provider %s produced an invalid account driver "\
-                        "-- Use plugin after you create a core.Provider "\
-                        "*AND* assign a core.Identity to be the core.AccountProvider."
-                        % provider)
+                    account_driver = self.get_account_driver(provider)
                 new_identity = account_driver.create_account(**credentials)
                 identities |= Identity.objects.filter(id=new_identity.id)
-                memberships = new_identity.identity_memberships.filter(
-                    member__memberships__is_leader=True
-                )
-                if not memberships:
-                    memberships = new_identity.identity_memberships.all()
-                membership = memberships.first()
-                if not membership:
-                    raise ValueError(
-                        "Expected at least one member in identity %s" %
-                        new_identity
-                    )
-                group = membership.member
-                try:
-                    Project.objects.get(name=project_name, owner=group)
-                except Project.DoesNotExist:
-                    Project.objects.create(
-                        name=project_name,
-                        created_by=new_identity.created_by,
-                        owner=group
-                    )
+                self.create_project(new_identity, project_name)
             except:
                 logger.exception(
                     "Could *NOT* Create NEW account for %s" % username
                 )
         return identities
 
+    def create_many_accounts(
+        self, provider, usernames, force=False, concurrency=None
+    ):
+        """
+        Create the accounts of every user of `usernames` with a single
+        account driver, the keystone entities of several users at once (see
+        `AccountDriver.create_accounts`). Returns the result of each account.
+        """
+        from core.models import Identity
+        results = []
+        credentials_list = []
+        for username in usernames:
+            try:
+                user_credentials = self.get_credentials_list(provider, username)
+            except Exception as exc:
+                logger.exception("Could not list the accounts of %s" % username)
+                results.append(
+                    _account_result(
+                        username, error="%s: %s" % (type(exc).__name__, exc)
+                    )
+                )
+                continue
+            for credentials in user_credentials:
+                if force or not self.find_accounts(provider, **credentials):
+                    credentials_list.append(credentials)
+        if not credentials_list:
+            return results
+        account_driver = self.get_account_driver(provider)
+        for result in account_driver.create_accounts(
+            credentials_list, concurrency=concurrency
+        ):
+            if result['identity']:
+                try:
+                    new_identity = Identity.objects.get(uuid=result['identity'])
+                    self.create_project(new_identity, result['project_name'])
+                except Exception as exc:
+                    logger.exception(
+                        "Could not create the project of identity %s" %
+                        result['identity']
+                    )
+                    result['error'] = "%s: %s" % (type(exc).__name__, exc)
+            results.append(result)
+        return results
+
+    def get_account_driver(self, provider):
+        from service.driver import get_account_driver
+        account_driver = get_account_driver(provider)
+        if not account_driver:
+            raise ValueError(
+                "Provider %s produced an invalid account driver "\
+                "-- Use plugin after you create a core.Provider "\
+                "*AND* assign a core.Identity to be the core.AccountProvider."
+                % provider)
+        return account_driver
+
+    def create_project(self, new_identity, project_name):
+        """
+        Create the project `project_name` of the group of `new_identity`,
+        unless it exists.
+        """
+        from core.models import Project
+        memberships = new_identity.identity_memberships.filter(
+            member__memberships__is_leader=True
+        )
+        if not memberships:
+            memberships = new_identity.identity_memberships.all()
+        membership = memberships.first()
+        if not membership:
+            raise ValueError(
+                "Expected at least one member in identity %s" % new_identity
+            )
+        group = membership.member
+        try:
+            Project.objects.get(name=project_name, owner=group)
+        except Project.DoesNotExist:
+            Project.objects.create(
+                name=project_name,
+                created_by=new_identity.created_by,
+                owner=group
+            )
+
     def delete_accounts(self, provider, username):
         from service.driver import get_account_driver
         account_driver = get_account_driver(provider)
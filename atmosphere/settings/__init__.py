@@ -55,6 +55,7 @@ INSTALLED_APPS = (
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # 3rd party apps
     'rest_framework',
@@ -505,6 +506,34 @@ CELERYBEAT_SCHEDULE = {
                 "expires": 60 * 60
             }
         },
+    "check_pending_instances":
+        {
+            "task": "check_pending_instances",
+            "schedule": timedelta(seconds=10),
+            "options": {
+                "expires": 10,
+                "time_limit": 5 * 60
+            }
+        },
+    "refresh_stale_application_metrics":
+        {
+            "task": "refresh_stale_application_metrics",
+            "schedule": timedelta(minutes=5),
+            "options": {
+                "expires": 5 * 60,
+                "time_limit": 5 * 60
+            }
+        },
+    "refresh_all_application_metrics":
+        {
+            "task": "refresh_all_application_metrics",
+    # Every day of the week @ 2am
+            "schedule": crontab(hour="2", minute="0", day_of_week="*"),
+            "options": {
+                "expires": 60 * 60,
+                "time_limit": 10 * 60
+            }
+        },
 }
 
 #     # Django-Celery Development settings
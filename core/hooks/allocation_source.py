@@ -5,7 +5,8 @@ from threepio import logger
 
 from core.models import (
     AllocationSource, Instance, AtmosphereUser, UserAllocationSnapshot,
-    InstanceAllocationSourceSnapshot, AllocationSourceSnapshot
+    InstanceAllocationSourceSnapshot, AllocationSourceSnapshot,
+    InstanceAllocationTimeline
 )
 from core.models import UserAllocationSource
 from core.models.allocation_source import get_allocation_source_object
@@ -308,6 +309,24 @@ def listen_for_instance_allocation_changes(sender, instance, created, **kwargs):
     return snapshot
 
 
+def listen_for_instance_allocation_timeline(
+    sender, instance, created, **kwargs
+):
+    """
+       This listener expects:
+       EventType - 'instance_allocation_source_changed'
+       (see `listen_for_instance_allocation_changes`)
+
+       The method records the change in the InstanceAllocationTimeline
+    """
+    event = instance
+    if event.name != 'instance_allocation_source_changed':
+        return None
+    if 'instance_id' not in event.payload:
+        return None
+    return InstanceAllocationTimeline.record(event)
+
+
 ## EVENT FIRED WHEN ALLOCATION SOURCE IS CREATED OR RENEWED
 
 
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.models import InstanceAllocationTimeline
+
+
+class Command(BaseCommand):
+    help = 'Record the instance allocation source changes missing from '\
+        'the InstanceAllocationTimeline.'
+
+    def handle(self, *args, **options):
+        count = InstanceAllocationTimeline.backfill()
+        self.stdout.write(
+            "Recorded %s instance allocation source changes" % count
+        )
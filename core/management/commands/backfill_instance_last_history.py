@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from core.models import Instance, InstanceStatusHistory
+
+
+class Command(BaseCommand):
+    help = 'Point every instance at its newest InstanceStatusHistory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Also re-compute instances that already have a last history"
+        )
+
+    def handle(self, *args, **options):
+        instances = Instance.objects.all()
+        if not options.get('all'):
+            instances = instances.filter(last_history__isnull=True)
+        newest_history = InstanceStatusHistory.objects.filter(
+            instance=OuterRef('pk')
+        ).order_by('-start_date').values('id')[:1]
+        count = instances.update(last_history=Subquery(newest_history))
+        self.stdout.write("Updated the last history of %s instances" % count)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+
+from service.tasks.accounts import create_accounts_for
+
+
+class Command(BaseCommand):
+    help = 'Create the accounts of many users on a provider at once, '\
+        'reporting the time spent in each step of every account.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='+')
+        parser.add_argument(
+            '--provider', type=int, required=True, help='Provider ID'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Create the accounts that already exist again'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Users whose accounts are created at once '
+            '(default: ACCOUNT_CREATION_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='run_async',
+            help='Create the accounts from a celery task'
+        )
+
+    def handle(self, *args, **options):
+        task_args = (options['provider'], options['usernames'])
+        task_kwargs = {
+            'force': options['force'],
+            'concurrency': options['concurrency']
+        }
+        if options['run_async']:
+            result = create_accounts_for.apply_async(task_args, task_kwargs)
+            self.stdout.write("Creating the accounts from task %s" % result.id)
+            return
+        results = create_accounts_for(*task_args, **task_kwargs)
+        for result in results:
+            timings = ", ".join(
+                "%s=%.0fms" % timing for timing in result['timings'].items()
+            )
+            self.stdout.write(
+                "%s/%s: %s %s" % (
+                    result['username'], result['project_name'], result['error']
+                    or result['identity'], timings
+                )
+            )
+        failed = len([result for result in results if result['error']])
+        self.stdout.write(
+            "Created %s accounts (%s failed)" % (len(results) - failed, failed)
+        )
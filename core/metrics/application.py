@@ -1,11 +1,17 @@
-import pickle
 import collections
+import json
 import redis
 
+from django.db.models import Count
 from threepio import logger
 from core.models import Instance
 
-METRICS_CACHE_DURATION = 4 * 24 * 60 * 60    # 4 days (persist over the weekend)
+#: Hash of application id -> JSON summarized metrics
+METRICS_CACHE_KEY = "metrics-application-summary"
+#: Set of application ids whose metrics need to be refreshed
+METRICS_STALE_KEY = "metrics-application-summary-stale"
+
+APPLICATION_PATH = 'source__providermachine__application_version__application'
 
 
 def _get_summarized_application_metrics(
@@ -13,21 +19,74 @@ def _get_summarized_application_metrics(
 ):
     metrics = collections.OrderedDict()
     redis_cache = redis.StrictRedis()
-    key = "metrics-application-summary-%s" % (application.id)
     try:
-        if redis_cache.exists(key) and not force:
-            pickled_object = redis_cache.get(key)
-            metrics = pickle.loads(pickled_object)
+        cached_metrics = redis_cache.hget(METRICS_CACHE_KEY, application.id)
+        if cached_metrics and not force:
+            metrics = json.loads(cached_metrics)
         elif not read_only:
-            metrics = calculate_summarized_application_metrics(application)
-            pickled_object = pickle.dumps(metrics)
-            redis_cache.set(key, pickled_object)
-            redis_cache.expire(key, METRICS_CACHE_DURATION)
+            metrics = refresh_application_metrics([application.id]
+                                                 )[application.id]
     except:
         logger.exception("Unexpected errror in application metrics")
     return metrics
 
 
+def refresh_application_metrics(application_ids=None):
+    """
+    Calculate and store the metrics of `application_ids` (or of every
+    application). Returns {application id: metrics}.
+    """
+    all_metrics = calculate_application_metrics(application_ids)
+    if all_metrics:
+        redis.StrictRedis().hmset(
+            METRICS_CACHE_KEY,
+            dict(
+                (app_id, json.dumps(metrics))
+                for (app_id, metrics) in all_metrics.items()
+            )
+        )
+    return all_metrics
+
+
+def refresh_stale_application_metrics():
+    """
+    Refresh the metrics of the applications marked stale since the last
+    refresh. Returns the number of applications refreshed.
+    """
+    pipeline = redis.StrictRedis().pipeline()
+    pipeline.smembers(METRICS_STALE_KEY)
+    pipeline.delete(METRICS_STALE_KEY)
+    (stale_ids, _) = pipeline.execute()
+    if not stale_ids:
+        return 0
+    return len(
+        refresh_application_metrics([int(app_id) for app_id in stale_ids])
+    )
+
+
+def mark_application_metrics_stale(application_ids):
+    """
+    Queue `application_ids` for `refresh_stale_application_metrics`.
+    """
+    application_ids = [app_id for app_id in application_ids if app_id]
+    if not application_ids:
+        return
+    try:
+        redis.StrictRedis().sadd(METRICS_STALE_KEY, *application_ids)
+    except redis.exceptions.RedisError:
+        logger.exception("Could not mark application metrics as stale")
+
+
+def mark_instance_application_metrics_stale(instance_ids):
+    """
+    Queue the applications launched by `instance_ids` for refresh.
+    """
+    mark_application_metrics_stale(
+        Instance.objects.filter(id__in=instance_ids
+                               ).values_list(APPLICATION_PATH, flat=True)
+    )
+
+
 def calculate_summarized_application_metrics(app):
     """
     From start_date of Application to now/End-date of application
@@ -37,31 +96,71 @@ def calculate_summarized_application_metrics(app):
         # launches total
         # launches success
     """
-    from core.models import MachineRequest
-    num_forks = MachineRequest.objects.filter(status__name='completed', new_version_forked=True)\
-        .filter(instance__source__providermachine__application_version__application__id=app.id).count()
-    num_bookmarked = app.bookmarks.count()
-    num_in_projects = app.projects.count()
-    app_instances = Instance.objects.filter(
-        source__providermachine__application_version__application__id=app.id
+    return calculate_application_metrics([app.id])[app.id]
+
+
+def calculate_application_metrics(application_ids=None):
+    """
+    Summarize the metrics of `application_ids` (or of every application)
+    with one grouped query per metric. Returns {application id: metrics}.
+    """
+    from core.models import (
+        Application, ApplicationBookmark, MachineRequest, Project
+    )
+    applications = Application.objects.all()
+    if application_ids is not None:
+        applications = applications.filter(id__in=application_ids)
+    forks = _count_by_application(
+        MachineRequest.objects.filter(
+            status__name='completed', new_version_forked=True
+        ), 'instance__' + APPLICATION_PATH, application_ids
+    )
+    bookmarks = _count_by_application(
+        ApplicationBookmark.objects.all(), 'application', application_ids
+    )
+    projects = _count_by_application(
+        Project.applications.through.objects.all(), 'application',
+        application_ids
+    )
+    launched = _count_by_application(
+        Instance.objects.all(), APPLICATION_PATH, application_ids
+    )
+    successful = _count_by_application(
+        Instance.objects.filter(instancestatushistory__status__name='active'),
+        APPLICATION_PATH,
+        application_ids,
+        distinct=True
+    )
+
+    all_metrics = {}
+    for app_id in applications.values_list('id', flat=True):
+        total_launched = launched.get(app_id, 0)
+        total_successful = successful.get(app_id, 0)
+        success_pct = 0.0
+        if total_launched != 0:
+            success_pct = total_successful / float(total_launched) * 100
+        all_metrics[app_id] = {
+            'forks': forks.get(app_id, 0),
+            'bookmarks': bookmarks.get(app_id, 0),
+            'projects': projects.get(app_id, 0),
+            'instances':
+                {
+                    'total': total_launched,
+                    'success': total_successful,
+                    'percent': success_pct,
+                }
+        }
+    return all_metrics
+
+
+def _count_by_application(
+    queryset, application_field, application_ids=None, distinct=False
+):
+    if application_ids is not None:
+        queryset = queryset.filter(
+            **{application_field + '__in': application_ids}
+        )
+    counts = queryset.order_by().values(application_field).annotate(
+        count=Count('id', distinct=distinct)
     )
-    total_launched = app_instances.count()
-    total_successful = app_instances.filter(
-        instancestatushistory__status__name='active'
-    ).distinct().count()
-    success_pct = 0.0
-    if total_launched != 0:
-        success_pct = total_successful / float(total_launched) * 100
-
-    application_metrics = {
-        'forks': num_forks,
-        'bookmarks': num_bookmarked,
-        'projects': num_in_projects,
-        'instances':
-            {
-                'total': total_launched,
-                'success': total_successful,
-                'percent': success_pct,
-            }
-    }
-    return application_metrics
+    return dict((row[application_field], row['count']) for row in counts)
@@ -2,15 +2,18 @@
  Instance metrics stored in graphite
 """
 import json
+import time
 
 from django.conf import settings
-import redis
 import requests
+from requests.adapters import HTTPAdapter
 
 from rest_framework.exceptions import NotFound
 
 from threepio import logger
 
+from service.cache import redis_connection
+
 # The hyper-stats service fetches metrics every minute
 CACHE_DURATION = 60
 
@@ -22,39 +25,67 @@ DEFAULT_RESOLUTION = 1
 #: Maximum time period is only two weeks
 MAXIMUM_TIME_PERIOD = 1209600
 
+#: Held while one caller fetches a cache key
+LOCK_SUFFIX = ":lock"
+LOCK_POLL_INTERVAL = 0.1
+
+session = None
+
+
+def _session():
+    """
+    Return the HTTP session shared by every metrics request.
+    """
+    global session
+    if not session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=getattr(settings, 'METRIC_SERVER_POOL_SIZE', 10)
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
 
 def request_instance_metrics(uuid, params):
-    uri = create_request_uri(uuid, params)
-    r = requests.get(uri)
+    return request_metrics_for([uuid], params)[uuid]
+
+
+def request_metrics_for(uuids, params):
+    """
+    Fetch the metrics of every instance in `uuids` with a single render
+    request. Returns {uuid: list of series}.
+    """
+    uri = create_batch_request_uri(uuids, params)
+    r = _session().get(
+        uri, timeout=getattr(settings, 'METRIC_SERVER_TIMEOUT', (3, 10))
+    )
     if r.status_code != 200:
         raise NotFound()
-    return r.json()
+    if len(uuids) == 1:
+        return {uuids[0]: r.json()}
+    metrics = dict((uuid, []) for uuid in uuids)
+    for series in r.json():
+        for uuid in uuids:
+            if uuid in series.get("target", ""):
+                metrics[uuid].append(series)
+                break
+    return metrics
 
 
 def create_request_uri(uuid, params):
-    endpoint = "{server}/render/?target={target}&format={format}"
-    query = "stats.*.{uuid}.{field}"
-    summarize = "summarize({metric}, {resolution}, 'avg')"
-    metric = query.format(uuid=uuid, field=params.get("field"))
-
-    # Apply function to metric
-    if "fun" in params:
-        metric = "{}({})".format(params.get("fun"), metric)
+    return create_batch_request_uri([uuid], params)
 
-    #: Check for default resolution
-    if (
-        params.get("res", DEFAULT_RESOLUTION) != DEFAULT_RESOLUTION
-        and params.get("field") != "*"
-    ):
-        res = '"{}min"'.format(params["res"])
 
-        target = summarize.format(metric=metric, resolution=res)
-    else:
-        target = metric
+def create_batch_request_uri(uuids, params):
+    endpoint = "{server}/render/?{targets}&format={format}"
+    targets = "&".join(
+        "target={}".format(create_target(uuid, params)) for uuid in uuids
+    )
 
     fields = {
         "server": settings.METRIC_SERVER,
-        "target": target,
+        "targets": targets,
         "format": "json"
     }
 
@@ -71,6 +102,28 @@ def create_request_uri(uuid, params):
     return request_uri
 
 
+def create_target(uuid, params):
+    query = "stats.*.{uuid}.{field}"
+    summarize = "summarize({metric}, {resolution}, 'avg')"
+    metric = query.format(uuid=uuid, field=params.get("field"))
+
+    # Apply function to metric
+    if "fun" in params:
+        metric = "{}({})".format(params.get("fun"), metric)
+
+    #: Check for default resolution
+    if (
+        params.get("res", DEFAULT_RESOLUTION) != DEFAULT_RESOLUTION
+        and params.get("field") != "*"
+    ):
+        res = '"{}min"'.format(params["res"])
+
+        target = summarize.format(metric=metric, resolution=res)
+    else:
+        target = metric
+    return target
+
+
 def params_to_fields(params):
     fields = {"field": "*", "res": DEFAULT_RESOLUTION}
 
@@ -101,25 +154,79 @@ def params_to_fields(params):
     return fields
 
 
-def _to_instance_key(instance, fields):
-    inputs = [instance.provider_alias] + fields.values()
+def _to_key(provider_alias, fields):
+    inputs = [provider_alias] + fields.values()
     return ":".join(map(str, inputs))
 
 
 def get_instance_metrics(instance, params=None):
+    return get_metrics_for_instances([instance],
+                                     params)[instance.provider_alias]
+
+
+def get_metrics_for_instances(instances, params=None):
+    """
+    Return {provider alias: metrics} for `instances`.
+
+    Cached metrics are read in one round trip and the misses are fetched
+    in one render request. Only one caller fetches a given key at a time:
+    the others wait up to METRIC_LOCK_WAIT seconds for it to be cached
+    before fetching it themselves.
+    """
     fields = params_to_fields(params)
-    key = _to_instance_key(instance, fields)
-    redis_cache = redis.StrictRedis()
-    instance_metrics = {}
+    params = params if params is not None else {}
+    aliases = [instance.provider_alias for instance in instances]
+    keys = dict((alias, _to_key(alias, fields)) for alias in aliases)
+    all_metrics = dict((alias, {}) for alias in aliases)
     try:
-        if redis_cache.exists(key):
-            instance_metrics = json.loads(redis_cache.get(key))
-        else:
-            instance_metrics = request_instance_metrics(
-                instance.provider_alias, params=params
+        redis_cache = redis_connection()
+        missing = _read_cached(redis_cache, keys, all_metrics)
+        locked = []
+        for alias in missing:
+            lock_key = keys[alias] + LOCK_SUFFIX
+            if redis_cache.set(lock_key, 1, nx=True, ex=CACHE_DURATION):
+                locked.append(alias)
+        if len(locked) < len(missing):
+            missing = _wait_for_cached(
+                redis_cache, keys, all_metrics,
+                [alias for alias in missing if alias not in locked]
+            ) + locked
+        if not missing:
+            return all_metrics
+        try:
+            fetched = request_metrics_for(missing, params)
+        finally:
+            redis_cache.delete(*[keys[alias] + LOCK_SUFFIX for alias in locked])
+        pipeline = redis_cache.pipeline()
+        for (alias, instance_metrics) in fetched.items():
+            all_metrics[alias] = instance_metrics
+            pipeline.setex(
+                keys[alias], CACHE_DURATION, json.dumps(instance_metrics)
             )
-            redis_cache.set(key, json.dumps(instance_metrics))
-            redis_cache.expire(key, CACHE_DURATION)
+        pipeline.execute()
     except Exception:
         logger.exception("Failed to retrieve metrics")
-    return instance_metrics
+    return all_metrics
+
+
+def _read_cached(redis_cache, keys, all_metrics, aliases=None):
+    """
+    Fill `all_metrics` from the cache, returning the aliases not cached.
+    """
+    aliases = aliases if aliases is not None else keys.keys()
+    missing = []
+    values = redis_cache.mget([keys[alias] for alias in aliases])
+    for (alias, value) in zip(aliases, values):
+        if value is None:
+            missing.append(alias)
+        else:
+            all_metrics[alias] = json.loads(value)
+    return missing
+
+
+def _wait_for_cached(redis_cache, keys, all_metrics, aliases):
+    deadline = time.time() + getattr(settings, 'METRIC_LOCK_WAIT', 2)
+    while aliases and time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        aliases = _read_cached(redis_cache, keys, all_metrics, aliases)
+    return aliases
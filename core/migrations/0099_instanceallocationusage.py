@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0098_applicationversion_doc_object_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstanceAllocationUsage',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                (
+                    'compute_used',
+                    models.DecimalField(decimal_places=3, max_digits=19)
+                ),
+                (
+                    'allocation_source',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='instance_allocation_usages',
+                        to='core.AllocationSource'
+                    )
+                ),
+                (
+                    'instance',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='instance_allocation_usages',
+                        to='core.Instance'
+                    )
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='instance_allocation_usages',
+                        to=settings.AUTH_USER_MODEL
+                    )
+                ),
+            ],
+            options={
+                'db_table': 'instance_allocation_usage',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='instanceallocationusage',
+            unique_together=set([('user', 'allocation_source', 'instance')]),
+        ),
+        migrations.CreateModel(
+            name='AllocationUsageWatermark',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('rebuilt', models.DateTimeField()),
+                (
+                    'allocation_source',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='allocation_usage_watermarks',
+                        to='core.AllocationSource'
+                    )
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='allocation_usage_watermarks',
+                        to=settings.AUTH_USER_MODEL
+                    )
+                ),
+            ],
+            options={
+                'db_table': 'allocation_usage_watermark',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='allocationusagewatermark',
+            unique_together=set([('user', 'allocation_source')]),
+        ),
+    ]
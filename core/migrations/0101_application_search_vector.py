@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+SEARCH_CONFIG = getattr(settings, 'SEARCH_CONFIG', 'english')
+
+POPULATE_SEARCH_VECTOR = """
+UPDATE application SET search_vector =
+    setweight(to_tsvector('{config}', COALESCE(application.name, '')), 'A') ||
+    setweight(to_tsvector('{config}', COALESCE((
+        SELECT string_agg(tag.name || ' ' || tag.description, ' ')
+        FROM tag
+        JOIN application_tags ON application_tags.tag_id = tag.id
+        WHERE application_tags.application_id = application.id
+    ), '')), 'B') ||
+    setweight(
+        to_tsvector('{config}', COALESCE(application.description, '')), 'C'
+    );
+""".format(config=SEARCH_CONFIG)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0100_instance_last_history'),
+    ]
+
+    operations = [
+        # A no-op when pg_trgm is already installed, which it has to be when
+        # the database user is not a superuser (see README.md)
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='application',
+            name='search_vector',
+            field=SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=GinIndex(
+                fields=['search_vector'], name='application_search_idx'
+            ),
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX application_name_trgm_idx "
+            "ON application USING gin (name gin_trgm_ops);",
+            "DROP INDEX application_name_trgm_idx;"
+        ),
+        migrations.RunSQL(POPULATE_SEARCH_VECTOR, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0101_application_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='instance',
+            index=models.Index(
+                fields=['start_date', 'id'], name='instance_start_date_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='instancestatushistory',
+            index=models.Index(
+                fields=['start_date', 'id'],
+                name='instance_history_start_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='instancesource',
+            index=models.Index(
+                fields=['start_date', 'id'],
+                name='instance_source_start_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(
+                fields=['start_date', 'id'],
+                name='application_start_date_id_idx'
+            ),
+        ),
+    ]
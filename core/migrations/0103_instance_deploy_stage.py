@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0102_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstanceDeployStage',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                (
+                    'stage',
+                    models.CharField(
+                        choices=[
+                            ('wait_for_instance', 'wait_for_instance'),
+                            ('add_fixed_ip', 'add_fixed_ip'),
+                            ('add_floating_ip', 'add_floating_ip'),
+                            ('deploy_ready_test', 'deploy_ready_test'),
+                            ('deploy_instance', 'deploy_instance'),
+                            ('check_web_desktop', 'check_web_desktop')
+                        ],
+                        max_length=32
+                    )
+                ),
+                (
+                    'start_date',
+                    models.DateTimeField(default=django.utils.timezone.now)
+                ),
+                ('end_date', models.DateTimeField(blank=True, null=True)),
+                ('succeeded', models.NullBooleanField()),
+                (
+                    'instance',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='deploy_stages',
+                        to='core.Instance'
+                    )
+                ),
+            ],
+            options={
+                'db_table': 'instance_deploy_stage',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='instancedeploystage',
+            index=models.Index(
+                fields=['stage', 'start_date'],
+                name='deploy_stage_start_date_idx'
+            ),
+        ),
+    ]
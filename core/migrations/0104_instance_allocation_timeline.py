@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Record the allocation source changes of events from before this table
+BACKFILL = """
+INSERT INTO instance_allocation_timeline
+    (event_id, instance_alias, username, entity_id, allocation_source_name,
+     allocation_source_uuid, timestamp)
+SELECT event.id, event.payload->>'instance_id',
+    COALESCE(event.payload->>'username', ''), event.entity_id,
+    event.payload->>'allocation_source_name',
+    lower(event.payload->>'allocation_source_id'), event.timestamp
+FROM event_table AS event
+WHERE event.name = 'instance_allocation_source_changed'
+    AND event.payload->>'instance_id' IS NOT NULL
+    AND NOT EXISTS (
+        SELECT 1 FROM instance_allocation_timeline AS timeline
+        WHERE timeline.event_id = event.id
+    )
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0103_instance_deploy_stage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstanceAllocationTimeline',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                ('instance_alias', models.CharField(max_length=256)),
+                (
+                    'username',
+                    models.CharField(blank=True, default='', max_length=256)
+                ),
+                (
+                    'entity_id',
+                    models.CharField(blank=True, default='', max_length=255)
+                ),
+                (
+                    'allocation_source_name',
+                    models.CharField(blank=True, max_length=255, null=True)
+                ),
+                (
+                    'allocation_source_uuid',
+                    models.CharField(blank=True, max_length=36, null=True)
+                ),
+                ('timestamp', models.DateTimeField()),
+                (
+                    'event',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='allocation_timeline',
+                        to='core.EventTable'
+                    )
+                ),
+            ],
+            options={
+                'db_table': 'instance_allocation_timeline',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='instanceallocationtimeline',
+            index=models.Index(
+                fields=['instance_alias', 'timestamp'],
+                name='allocation_timeline_inst_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='instanceallocationtimeline',
+            index=models.Index(
+                fields=['username', 'timestamp'],
+                name='allocation_timeline_user_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='instanceallocationtimeline',
+            index=models.Index(
+                fields=['entity_id', 'timestamp'],
+                name='allocation_timeline_entity_idx'
+            ),
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
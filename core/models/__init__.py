@@ -6,7 +6,9 @@ from django.db.models import ObjectDoesNotExist
 from core.models.access_token import AccessToken
 from core.models.allocation_source import (
     AllocationSource, UserAllocationSource, UserAllocationSnapshot,
-    InstanceAllocationSourceSnapshot, AllocationSourceSnapshot
+    InstanceAllocationSourceSnapshot, AllocationSourceSnapshot,
+    InstanceAllocationUsage, AllocationUsageWatermark,
+    InstanceAllocationTimeline
 )
 from core.models.application import Application, ApplicationMembership,\
     ApplicationBookmark, ApplicationThreshold
@@ -36,6 +38,7 @@ from core.models.pattern_match import PatternMatch, MatchType
 from core.models.maintenance import MaintenanceRecord
 from core.models.instance import Instance
 from core.models.instance_action import InstanceAction
+from core.models.instance_deploy_stage import InstanceDeployStage
 from core.models.instance_history import InstanceStatus, InstanceStatusHistory
 from core.models.instance_source import InstanceSource
 from core.models.node import NodeController
@@ -1,8 +1,11 @@
+import datetime
 import decimal
 
+from dateutil.parser import parse
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils import timezone
 from threepio import logger
 from uuid import uuid4
@@ -177,6 +180,195 @@ class InstanceAllocationSourceSnapshot(models.Model):
         app_label = 'core'
 
 
+class InstanceAllocationUsage(models.Model):
+    """
+    Running total of the compute (in seconds) `instance` has used on
+    `allocation_source`, over the period of the `AllocationUsageWatermark`
+    of the user and allocation source. Maintained by `accumulated_usage`.
+    """
+    user = models.ForeignKey(
+        "AtmosphereUser", related_name="instance_allocation_usages"
+    )
+    allocation_source = models.ForeignKey(
+        AllocationSource, related_name="instance_allocation_usages"
+    )
+    instance = models.ForeignKey(
+        "Instance", related_name="instance_allocation_usages"
+    )
+    compute_used = models.DecimalField(max_digits=19, decimal_places=3)
+
+    def __unicode__(self):
+        return "Instance %s + AllocationSource %s: %s seconds" %\
+            (self.instance_id, self.allocation_source_id, self.compute_used)
+
+    class Meta:
+        db_table = 'instance_allocation_usage'
+        app_label = 'core'
+        unique_together = ('user', 'allocation_source', 'instance')
+
+
+class AllocationUsageWatermark(models.Model):
+    """
+    The period the `InstanceAllocationUsage` totals of `user` on
+    `allocation_source` cover: from `start_date` to the high-water mark
+    `end_date`. `accumulated_usage` only reports on the time since
+    `end_date` on each run, and rebuilds the totals from `start_date` every
+    ALLOCATION_USAGE_REBUILD_INTERVAL (`rebuilt`). Kept even when the user
+    has no usage, so that nothing is reported on twice.
+    """
+    user = models.ForeignKey(
+        "AtmosphereUser", related_name="allocation_usage_watermarks"
+    )
+    allocation_source = models.ForeignKey(
+        AllocationSource, related_name="allocation_usage_watermarks"
+    )
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    rebuilt = models.DateTimeField()
+
+    def __unicode__(self):
+        return "User %s + AllocationSource %s: %s-%s" %\
+            (self.user_id, self.allocation_source_id, self.start_date,
+             self.end_date)
+
+    class Meta:
+        db_table = 'allocation_usage_watermark'
+        app_label = 'core'
+        unique_together = ('user', 'allocation_source')
+
+
+class InstanceAllocationTimeline(models.Model):
+    """
+    Every change of the allocation source of an instance: the columns of
+    the payload of the 'instance_allocation_source_changed' `event`, kept
+    up to date by `listen_for_instance_allocation_timeline` (and
+    `backfill` for older events).
+
+    A change belongs to a user when either its `username` (of the payload)
+    or its `entity_id` (of the event) is theirs (see `of_user`).
+    """
+    event = models.OneToOneField(
+        "EventTable", related_name="allocation_timeline"
+    )
+    instance_alias = models.CharField(max_length=256)
+    username = models.CharField(max_length=256, blank=True, default='')
+    entity_id = models.CharField(max_length=255, blank=True, default='')
+    allocation_source_name = models.CharField(
+        max_length=255, null=True, blank=True
+    )
+    allocation_source_uuid = models.CharField(
+        max_length=36, null=True, blank=True
+    )
+    timestamp = models.DateTimeField()
+
+    @classmethod
+    def record(cls, event):
+        """
+        Record the change of allocation source of `event`.
+        """
+        (entry, _) = cls.objects.update_or_create(
+            event=event, defaults=cls._fields(event)
+        )
+        return entry
+
+    @staticmethod
+    def _fields(event):
+        payload = event.payload
+        source_uuid = payload.get('allocation_source_id')
+        if source_uuid:
+            source_uuid = str(source_uuid).lower()
+        return {
+            'instance_alias': payload['instance_id'],
+            'username': payload.get('username') or '',
+            'entity_id': event.entity_id,
+            'allocation_source_name': payload.get('allocation_source_name'),
+            'allocation_source_uuid': source_uuid,
+            'timestamp': event.timestamp,
+        }
+
+    @classmethod
+    def backfill(cls, batch_size=1000):
+        """
+        Record the events that are not in the timeline yet, `batch_size`
+        per INSERT. Returns the number of events recorded.
+        """
+        EventTable = cls._meta.get_field('event').related_model
+        events = EventTable.objects.filter(
+            name='instance_allocation_source_changed',
+            allocation_timeline__isnull=True
+        )
+        entries = [
+            cls(event=event, **cls._fields(event))
+            for event in events.iterator()
+            if event.payload.get('instance_id') is not None
+        ]
+        cls.objects.bulk_create(entries, batch_size=batch_size)
+        return len(entries)
+
+    @staticmethod
+    def of_user(username):
+        """
+        Filter for the changes belonging to `username`
+        """
+        return Q(username=username) | Q(entity_id=username)
+
+    def belongs_to(self, username):
+        return username in (self.username, self.entity_id)
+
+    @classmethod
+    def entry_at(cls, instance_alias, timestamp, username=None):
+        """
+        The last change of allocation source of the instance (by
+        `username`) before `timestamp`, or None.
+        """
+        entries = cls.objects.filter(
+            instance_alias=instance_alias, timestamp__lt=timestamp
+        )
+        if username:
+            entries = entries.filter(cls.of_user(username))
+        return entries.order_by('-timestamp').first()
+
+    @classmethod
+    def allocation_source_at(cls, instance_alias, timestamp, username=None):
+        """
+        The allocation source the instance was on at `timestamp`, or None.
+        """
+        entry = cls.entry_at(instance_alias, timestamp, username=username)
+        if not entry:
+            return None
+        if entry.allocation_source_name:
+            return AllocationSource.objects.filter(
+                name=entry.allocation_source_name
+            ).last()
+        return AllocationSource.objects.filter(
+            uuid=entry.allocation_source_uuid
+        ).first()
+
+    def __unicode__(self):
+        return "Instance %s on AllocationSource %s at %s" %\
+            (self.instance_alias,
+             self.allocation_source_name or self.allocation_source_uuid,
+             self.timestamp)
+
+    class Meta:
+        db_table = 'instance_allocation_timeline'
+        app_label = 'core'
+        indexes = [
+            models.Index(
+                fields=['instance_alias', 'timestamp'],
+                name='allocation_timeline_inst_idx'
+            ),
+            models.Index(
+                fields=['username', 'timestamp'],
+                name='allocation_timeline_user_idx'
+            ),
+            models.Index(
+                fields=['entity_id', 'timestamp'],
+                name='allocation_timeline_entity_idx'
+            ),
+        ]
+
+
 class AllocationSourceSnapshot(models.Model):
     allocation_source = models.OneToOneField(
         AllocationSource, related_name="snapshot"
@@ -247,6 +439,104 @@ def total_usage(
     return compute_used_total
 
 
+def accumulated_usage(
+    user, allocation_source, start_date, end_date=None, rebuild=False
+):
+    """
+    Return [compute used (hours), burn rate] for `user` on
+    `allocation_source` since `start_date`, like
+    `total_usage(..., burn_rate=True)`.
+
+    Per-instance totals are kept in InstanceAllocationUsage and the period
+    they cover in AllocationUsageWatermark, so only the time since the
+    previous call is reported on. The totals are rebuilt
+    from `start_date` when it changes, when `rebuild` is set and every
+    ALLOCATION_USAGE_REBUILD_INTERVAL; rebuilds log any drift from the
+    incremental totals.
+    """
+    from service.allocation_logic import create_report
+    if not end_date:
+        end_date = timezone.now()
+    if not isinstance(start_date, datetime.datetime):
+        start_date = parse(start_date)
+    rebuild_interval = getattr(
+        settings, 'ALLOCATION_USAGE_REBUILD_INTERVAL',
+        datetime.timedelta(days=1)
+    )
+    usage_query = InstanceAllocationUsage.objects.filter(
+        user=user, allocation_source=allocation_source
+    )
+    totals = dict(
+        (usage.instance_id, float(usage.compute_used)) for usage in usage_query
+    )
+    watermark = AllocationUsageWatermark.objects.filter(
+        user=user, allocation_source=allocation_source
+    ).first()
+    incremental = bool(watermark) and watermark.start_date == start_date\
+        and watermark.end_date <= end_date
+
+    def _report(report_start_date):
+        return create_report(
+            report_start_date,
+            end_date,
+            user_id=user.username,
+            allocation_source_name=allocation_source.name
+        )
+
+    if incremental:
+        last_rebuilt = watermark.rebuilt
+        rows = _report(watermark.end_date)
+        for row in rows:
+            totals[row['instance_id']
+                  ] = totals.get(row['instance_id'],
+                                 0.0) + row['applicable_duration']
+        rebuild = rebuild or last_rebuilt <= end_date - rebuild_interval
+    if rebuild or not incremental:
+        rows = _report(start_date)
+        rebuilt_totals = {}
+        for row in rows:
+            rebuilt_totals[row['instance_id']
+                          ] = rebuilt_totals.get(row['instance_id'], 0.0
+                                                ) + row['applicable_duration']
+        if incremental:
+            drift = sum(rebuilt_totals.values()) - sum(totals.values())
+            if abs(drift) / 3600.0 >= 0.01:
+                logger.warn(
+                    "Incremental usage for User %s with AllocationSource %s "
+                    "drifted by %s hours, rebuilt from %s" % (
+                        user.username, allocation_source.name,
+                        round(drift / 3600.0, 2), start_date
+                    )
+                )
+        totals = rebuilt_totals
+        last_rebuilt = end_date
+
+    with transaction.atomic():
+        usage_query.delete()
+        InstanceAllocationUsage.objects.bulk_create(
+            [
+                InstanceAllocationUsage(
+                    user=user,
+                    allocation_source=allocation_source,
+                    instance_id=instance_id,
+                    compute_used=compute_used
+                ) for (instance_id, compute_used) in totals.items()
+            ]
+        )
+        AllocationUsageWatermark.objects.update_or_create(
+            user=user,
+            allocation_source=allocation_source,
+            defaults={
+                'start_date': start_date,
+                'end_date': end_date,
+                'rebuilt': last_rebuilt
+            }
+        )
+    compute_used_total = round(sum(totals.values()) / 3600.0, 2)
+    burn_rate_total = rows[-1]['burn_rate'] if rows else 0
+    return [compute_used_total, burn_rate_total]
+
+
 def get_allocation_source_object(source_id):
     if not source_id:
         raise Exception(
@@ -1,6 +1,13 @@
 from uuid import uuid4, uuid5
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
-from django.db.models import Q
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Concat
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
 from django.contrib.auth.models import AnonymousUser
 from django.utils import timezone
 
@@ -40,6 +47,9 @@ class Application(models.Model):
     # User/Identity that created the application object
     created_by = models.ForeignKey('AtmosphereUser')
     created_by_identity = models.ForeignKey(Identity, null=True)
+    # Full-text search index of name, tags and description.
+    # Maintained by `update_search_vectors`
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     def get_users_from_access_list(self):
         """
@@ -269,6 +279,13 @@ class Application(models.Model):
     class Meta:
         db_table = 'application'
         app_label = 'core'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='application_search_idx'),
+            models.Index(
+                fields=['start_date', 'id'],
+                name='application_start_date_id_idx'
+            )
+        ]
 
 
 class ApplicationMembership(models.Model):
@@ -515,3 +532,99 @@ class ApplicationThreshold(models.Model):
     class Meta:
         db_table = 'application_threshold'
         app_label = 'core'
+
+
+def invalidate_application_metrics(sender, instance, **kwargs):
+    """
+    Bookmarking (or un-bookmarking) changes the application's metrics.
+    """
+    from core.metrics.application import mark_application_metrics_stale
+    mark_application_metrics_stale([instance.application_id])
+
+
+post_save.connect(invalidate_application_metrics, sender=ApplicationBookmark)
+post_delete.connect(invalidate_application_metrics, sender=ApplicationBookmark)
+
+
+def update_search_vectors(application_ids):
+    """
+    Rebuild the full-text search vector of `application_ids` from their
+    name (weight A), tags (weight B) and description (weight C) with a
+    single UPDATE. Returns the number of applications updated.
+    """
+    application_ids = [app_id for app_id in application_ids if app_id]
+    if not application_ids:
+        return 0
+    config = getattr(settings, 'SEARCH_CONFIG', 'english')
+    tags = Tag.objects.filter(application=OuterRef('pk')).order_by()
+    tag_text = Concat(
+        'name', Value(' '), 'description', output_field=models.TextField()
+    )
+    tag_text = tags.values('application').annotate(
+        text=StringAgg(tag_text, delimiter=' ')
+    ).values('text')
+    return Application.objects.filter(id__in=application_ids).update(
+        search_vector=(
+            SearchVector('name', weight='A', config=config) + SearchVector(
+                Subquery(tag_text, output_field=models.TextField()),
+                weight='B',
+                config=config
+            ) + SearchVector('description', weight='C', config=config)
+        )
+    )
+
+
+def update_application_search_vector(
+    sender, instance, update_fields=None, **kwargs
+):
+    if update_fields and not set(['name', 'description']) & set(update_fields):
+        return
+    update_search_vectors([instance.id])
+
+
+def update_tagged_search_vectors(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    (Un)tagging changes the search vector of the applications involved.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_vectors([instance.id])
+    elif action == 'pre_clear':
+        instance._search_application_ids = list(
+            instance.application_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        update_search_vectors(instance._search_application_ids)
+    elif action in ('post_add', 'post_remove'):
+        update_search_vectors(pk_set)
+
+
+def collect_tag_search_vectors(sender, instance, **kwargs):
+    instance._search_application_ids = list(
+        instance.application_set.values_list('id', flat=True)
+    )
+
+
+def update_tag_search_vectors(sender, instance, **kwargs):
+    """
+    Renaming or deleting a tag changes the search vector of the
+    applications it was tagged on.
+    """
+    if kwargs.get('created'):
+        return
+    if hasattr(instance, '_search_application_ids'):
+        application_ids = instance._search_application_ids
+    else:
+        application_ids = instance.application_set.values_list('id', flat=True)
+    update_search_vectors(application_ids)
+
+
+post_save.connect(update_application_search_vector, sender=Application)
+m2m_changed.connect(
+    update_tagged_search_vectors, sender=Application.tags.through
+)
+post_save.connect(update_tag_search_vectors, sender=Tag)
+pre_delete.connect(collect_tag_search_vectors, sender=Tag)
+post_delete.connect(update_tag_search_vectors, sender=Tag)
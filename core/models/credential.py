@@ -7,6 +7,7 @@ Note:
 
 from uuid import uuid4
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from core.models.identity import Identity
 from core.models.provider import Provider
 
@@ -68,3 +69,29 @@ class Credential(models.Model):
     class Meta:
         db_table = 'credential'
         app_label = 'core'
+
+
+def invalidate_identity_driver(sender, instance, **kwargs):
+    """
+    Drop any cached driver built from the changed credential.
+    """
+    from service.cache import driver_cache, DRIVER_KEY_IDENTITY
+    # NOTE: Use `identity_id`, the identity may already be gone on delete.
+    driver_cache.delete(DRIVER_KEY_IDENTITY.format(instance.identity_id))
+
+
+def invalidate_provider_drivers(sender, instance, **kwargs):
+    """
+    Provider credentials are shared by every identity on the provider, so
+    drop every cached driver and client.
+    """
+    from service.cache import client_cache, driver_cache
+    driver_cache.clear()
+    client_cache.clear()
+
+
+# Instantiate the hooks:
+post_save.connect(invalidate_identity_driver, sender=Credential)
+post_delete.connect(invalidate_identity_driver, sender=Credential)
+post_save.connect(invalidate_provider_drivers, sender=ProviderCredential)
+post_delete.connect(invalidate_provider_drivers, sender=ProviderCredential)
@@ -1,6 +1,8 @@
+from functools import partial
+from itertools import groupby
 from uuid import uuid4
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_save, pre_save
 from django.utils import timezone
 from django.contrib.postgres.fields import JSONField
@@ -9,6 +11,7 @@ from core.hooks.allocation_source import (
     listen_before_allocation_snapshot_changes,
     listen_for_allocation_snapshot_changes, listen_for_user_snapshot_changes,
     listen_for_allocation_threshold_met, listen_for_instance_allocation_changes,
+    listen_for_instance_allocation_timeline,
     listen_for_allocation_source_created_or_renewed,
     listen_for_user_allocation_source_deleted,
     listen_for_user_allocation_source_created,
@@ -40,6 +43,43 @@ class EventTable(models.Model):
             name=name, entity_id=entity_id, payload=payload
         )
 
+    @classmethod
+    def create_events(cls, events, defer=False):
+        """
+        Create `events` (dicts of EventTable fields) with bulk INSERTs and
+        run the handlers registered for each event's name, in order.
+
+        Events with pre_save handlers are saved one at a time, as those
+        handlers read the state left by the events before them. When
+        `defer` is True the post_save handlers of bulk created events run
+        in the `dispatch_events` task once the transaction commits.
+        """
+        from core.tasks import dispatch_events
+        logger.info("Creating %s new events" % len(events))
+        created_events = []
+        for (save_one_at_a_time, group) in groupby(
+            [EventTable(**fields) for fields in events],
+            lambda event: event.name in PRE_SAVE_EVENT_HANDLERS
+        ):
+            if save_one_at_a_time:
+                for event in group:
+                    event.save()
+                    created_events.append(event)
+                continue
+            new_events = EventTable.objects.bulk_create(list(group))
+            created_events.extend(new_events)
+            if defer:
+                transaction.on_commit(
+                    partial(
+                        dispatch_events.apply_async,
+                        args=[[event.id for event in new_events]]
+                    )
+                )
+                continue
+            for event in new_events:
+                dispatch_post_save_event(EventTable, event, created=True)
+        return created_events
+
     def __str__(self):
         return "%s" % self.name
 
@@ -51,24 +91,82 @@ class EventTable(models.Model):
         app_label = "core"
 
 
-# Instantiate the hooks:
-post_save.connect(listen_for_allocation_threshold_met, sender=EventTable)
-post_save.connect(listen_for_instance_allocation_changes, sender=EventTable)
-post_save.connect(
-    listen_for_allocation_source_created_or_renewed, sender=EventTable
+# Event handlers, by event name. Each event only runs its own handlers.
+PRE_SAVE_EVENT_HANDLERS = {}
+POST_SAVE_EVENT_HANDLERS = {}
+
+
+def register_event_handler(name, handler, before_save=False):
+    """
+    Run `handler` as a post_save (or, `before_save`, pre_save) receiver
+    for `name` events only.
+    """
+    if before_save:
+        handlers = PRE_SAVE_EVENT_HANDLERS
+    else:
+        handlers = POST_SAVE_EVENT_HANDLERS
+    handlers.setdefault(name, []).append(handler)
+
+
+def dispatch_pre_save_event(sender, instance, **kwargs):
+    for handler in PRE_SAVE_EVENT_HANDLERS.get(instance.name, []):
+        handler(sender, instance, **kwargs)
+
+
+def dispatch_post_save_event(sender, instance, **kwargs):
+    for handler in POST_SAVE_EVENT_HANDLERS.get(instance.name, []):
+        handler(sender, instance, **kwargs)
+
+
+register_event_handler(
+    'allocation_source_snapshot',
+    listen_before_allocation_snapshot_changes,
+    before_save=True
+)
+register_event_handler(
+    'allocation_source_threshold_met', listen_for_allocation_threshold_met
+)
+register_event_handler(
+    'instance_allocation_source_changed',
+    listen_for_instance_allocation_timeline
+)
+register_event_handler(
+    'instance_allocation_source_changed', listen_for_instance_allocation_changes
+)
+register_event_handler(
+    'allocation_source_created_or_renewed',
+    listen_for_allocation_source_created_or_renewed
+)
+register_event_handler(
+    'allocation_source_compute_allowed_changed',
+    listen_for_allocation_source_compute_allowed_changed
+)
+register_event_handler(
+    'user_allocation_source_created', listen_for_user_allocation_source_created
 )
-post_save.connect(
-    listen_for_allocation_source_compute_allowed_changed, sender=EventTable
+register_event_handler(
+    'user_allocation_source_deleted', listen_for_user_allocation_source_deleted
 )
-post_save.connect(listen_for_user_allocation_source_created, sender=EventTable)
-post_save.connect(listen_for_user_allocation_source_deleted, sender=EventTable)
-pre_save.connect(listen_before_allocation_snapshot_changes, sender=EventTable)
-post_save.connect(listen_for_instance_allocation_removed, sender=EventTable)
-post_save.connect(listen_for_allocation_snapshot_changes, sender=EventTable)
-post_save.connect(listen_for_user_snapshot_changes, sender=EventTable)
-post_save.connect(
-    listen_for_allocation_source_renewal_strategy_changed, sender=EventTable
+register_event_handler(
+    'instance_allocation_source_removed', listen_for_instance_allocation_removed
 )
-post_save.connect(listen_for_allocation_source_name_changed, sender=EventTable)
-post_save.connect(listen_for_allocation_source_removed, sender=EventTable)
-post_save.connect(listen_for_quota_assigned, sender=EventTable)
+register_event_handler(
+    'allocation_source_snapshot', listen_for_allocation_snapshot_changes
+)
+register_event_handler(
+    'user_allocation_snapshot_changed', listen_for_user_snapshot_changes
+)
+register_event_handler(
+    'allocation_source_renewal_strategy_changed',
+    listen_for_allocation_source_renewal_strategy_changed
+)
+register_event_handler(
+    'allocation_source_name_changed', listen_for_allocation_source_name_changed
+)
+register_event_handler(
+    'allocation_source_removed', listen_for_allocation_source_removed
+)
+register_event_handler('quota_assigned', listen_for_quota_assigned)
+
+pre_save.connect(dispatch_pre_save_event, sender=EventTable)
+post_save.connect(dispatch_post_save_event, sender=EventTable)
@@ -4,8 +4,9 @@
 from hashlib import md5
 from datetime import datetime, timedelta
 
-from django.db import models
+from django.db import DatabaseError, models
 from django.db.models import (Q, ObjectDoesNotExist)
+from django.db.models.signals import post_save
 from django.utils import timezone
 
 import pytz
@@ -65,6 +66,15 @@ class Instance(models.Model):
     # FIXME  Problems when setting a default, missing auto_now_add
     start_date = models.DateTimeField()
     end_date = models.DateTimeField(null=True, blank=True)
+    # The newest InstanceStatusHistory, maintained by
+    # InstanceStatusHistory.save so reads do not have to look it up.
+    last_history = models.ForeignKey(
+        "InstanceStatusHistory",
+        models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
 
     # Model Managers
     objects = models.Manager()    # The default manager.
@@ -101,6 +111,29 @@ class Instance(models.Model):
             membership_query | project_query | ownership_query
         ).distinct()
 
+    def save(self, *args, **kwargs):
+        # `last_history` is only written by InstanceStatusHistory.save, so
+        # saving a stale copy of an instance can not point it back to an
+        # older history.
+        force_insert = kwargs.get('force_insert', args[0] if args else False)
+        if (
+            not self._state.adding and not force_insert
+            and not kwargs.get('update_fields')
+        ):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'last_history'
+            ]
+            try:
+                return super(Instance, self).save(
+                    *args, **dict(kwargs, update_fields=update_fields)
+                )
+            except DatabaseError as exc:
+                # The row is gone (or lives in another database): insert it
+                if 'did not affect any rows' not in str(exc):
+                    raise
+        super(Instance, self).save(*args, **kwargs)
+
     def get_first_history(self):
         """
         Returns the first InstanceStatusHistory
@@ -134,6 +167,8 @@ class Instance(models.Model):
         # except InstanceStatusHistory.DoesNotExist:
         # TODO: Profile current choice
         # FIXME: Move this call so that it happens inside InstanceStatusHistory to avoid circ.dep.
+        if self.last_history_id:
+            return self.last_history
         last_history = self.instancestatushistory_set.order_by('-start_date'
                                                               ).first()
         if last_history:
@@ -546,6 +581,11 @@ class Instance(models.Model):
     class Meta:
         db_table = "instance"
         app_label = "core"
+        indexes = [
+            models.Index(
+                fields=['start_date', 'id'], name='instance_start_date_id_idx'
+            )
+        ]
 
 
 """
@@ -922,3 +962,17 @@ def create_instance(
         ))
     # FIXME: create instance_status_history here, pass in size & status to help
     return new_inst
+
+
+def invalidate_application_metrics(sender, instance, created, **kwargs):
+    """
+    A new instance changes its application's launch metrics.
+    """
+    if not created:
+        return
+    from core.metrics.application import \
+        mark_instance_application_metrics_stale
+    mark_instance_application_metrics_stale([instance.id])
+
+
+post_save.connect(invalidate_application_metrics, sender=Instance)
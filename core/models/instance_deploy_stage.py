@@ -0,0 +1,69 @@
+"""
+  Instance deploy stage model for atmosphere.
+"""
+from django.db import models
+from django.utils import timezone
+
+from core.models.instance import Instance
+
+#: Stages of the launch chain (see service.tasks.driver), in order
+DEPLOY_STAGES = (
+    'wait_for_instance', 'add_fixed_ip', 'add_floating_ip', 'deploy_ready_test',
+    'deploy_instance', 'check_web_desktop'
+)
+
+
+class InstanceDeployStage(models.Model):
+    """
+    Time spent by an instance in a stage of its launch, from the first
+    attempt of the stage to its success (or final failure).
+    """
+    instance = models.ForeignKey(Instance, related_name='deploy_stages')
+    stage = models.CharField(
+        max_length=32, choices=[(stage, stage) for stage in DEPLOY_STAGES]
+    )
+    start_date = models.DateTimeField(default=timezone.now)
+    end_date = models.DateTimeField(null=True, blank=True)
+    succeeded = models.NullBooleanField()
+
+    @classmethod
+    def start(cls, instance_alias, stage):
+        """
+        Start `stage` of the instance, unless it was started already (by a
+        previous attempt).
+        """
+        instances = Instance.objects.filter(provider_alias=instance_alias)
+        instance_id = instances.values_list('id', flat=True).first()
+        if not instance_id:
+            return None
+        (deploy_stage, _) = cls.objects.get_or_create(
+            instance_id=instance_id, stage=stage, end_date=None
+        )
+        return deploy_stage
+
+    @classmethod
+    def end(cls, instance_alias, stage=None, succeeded=True):
+        """
+        End `stage` (or every started stage) of the instance.
+        """
+        stages = cls.objects.filter(
+            instance__provider_alias=instance_alias, end_date=None
+        )
+        if stage:
+            stages = stages.filter(stage=stage)
+        return stages.update(end_date=timezone.now(), succeeded=succeeded)
+
+    def __unicode__(self):
+        return "%s %s: %s - %s" % (
+            self.instance, self.stage, self.start_date, self.end_date
+        )
+
+    class Meta:
+        db_table = "instance_deploy_stage"
+        app_label = "core"
+        indexes = [
+            models.Index(
+                fields=['stage', 'start_date'],
+                name='deploy_stage_start_date_idx'
+            ),
+        ]
@@ -5,7 +5,8 @@ from uuid import uuid4
 from datetime import timedelta
 
 from django.db import models, transaction, DatabaseError
-from django.db.models import ObjectDoesNotExist
+from django.db.models import ObjectDoesNotExist, Q
+from django.db.models.signals import post_save
 from django.contrib.postgres.fields import JSONField
 
 from django.utils import timezone
@@ -58,6 +59,22 @@ class InstanceStatusHistory(models.Model):
     end_date = models.DateTimeField(null=True, blank=True)
     extra = JSONField(null=True, blank=True)
 
+    def save(self, *args, **kwargs):
+        """
+        Save, then point `instance.last_history` here if this is (still)
+        the newest history of the instance.
+        """
+        # Imported here to avoid a circular import with core.models.instance
+        from core.models import Instance
+        super(InstanceStatusHistory, self).save(*args, **kwargs)
+        is_newest = Instance.objects.filter(
+            Q(last_history__isnull=True) |
+            Q(last_history__start_date__lte=self.start_date),
+            id=self.instance_id
+        ).update(last_history=self)
+        if is_newest:
+            self.instance.last_history = self
+
     def previous(self):
         """
         Given that you are a node on a linked-list, traverse yourself backwards
@@ -283,3 +300,23 @@ class InstanceStatusHistory(models.Model):
     class Meta:
         db_table = "instance_status_history"
         app_label = "core"
+        indexes = [
+            models.Index(
+                fields=['start_date', 'id'],
+                name='instance_history_start_id_idx'
+            )
+        ]
+
+
+def invalidate_application_metrics(sender, instance, created, **kwargs):
+    """
+    An instance reaching 'active' changes its application's launch metrics.
+    """
+    if not created or instance.status.name != 'active':
+        return
+    from core.metrics.application import \
+        mark_instance_application_metrics_stale
+    mark_instance_application_metrics_stale([instance.instance_id])
+
+
+post_save.connect(invalidate_application_metrics, sender=InstanceStatusHistory)
@@ -163,6 +163,12 @@ class InstanceSource(models.Model):
         db_table = "instance_source"
         app_label = "core"
         unique_together = ('provider', 'identifier')
+        indexes = [
+            models.Index(
+                fields=['start_date', 'id'],
+                name='instance_source_start_id_idx'
+            )
+        ]
 
 
 def update_instance_source_size(instance_source, image_size_in_bytes):
@@ -7,6 +7,7 @@ import os
 
 from django.db import models
 from django.db.models import Q, Model
+from django.db.models.signals import post_save
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from core.models.user import AtmosphereUser as User
@@ -496,3 +497,18 @@ def _match_membership_to_access(access_list, membership):
     query_list = reduce(lambda qry1, qry2: qry1 | qry2, query_list)
     members = Group.objects.filter(query_list)
     return members | membership.all()
+
+
+def invalidate_application_metrics(sender, instance, **kwargs):
+    """
+    A completed fork changes the forked application's metrics.
+    """
+    if not instance.new_version_forked or \
+            instance.status.name != 'completed':
+        return
+    from core.metrics.application import \
+        mark_instance_application_metrics_stale
+    mark_instance_application_metrics_stale([instance.instance_id])
+
+
+post_save.connect(invalidate_application_metrics, sender=MachineRequest)
@@ -1,6 +1,7 @@
 from uuid import uuid4
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import m2m_changed
 from django.utils import timezone
 from core.models.application import Application
 from core.models.link import ExternalLink
@@ -146,3 +147,26 @@ class Project(models.Model):
     class Meta:
         db_table = 'project'
         app_label = 'core'
+
+
+def invalidate_application_metrics(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Adding (or removing) applications to projects changes their metrics.
+    """
+    from core.metrics.application import mark_application_metrics_stale
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            mark_application_metrics_stale([instance.id])
+    elif action in ('post_add', 'post_remove'):
+        mark_application_metrics_stale(pk_set)
+    elif action == 'pre_clear':
+        mark_application_metrics_stale(
+            instance.applications.values_list('id', flat=True)
+        )
+
+
+m2m_changed.connect(
+    invalidate_application_metrics, sender=Project.applications.through
+)
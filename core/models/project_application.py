@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from core.models.application import Application
 from core.models.project import Project
 
@@ -14,3 +15,16 @@ class ProjectApplication(models.Model):
     class Meta:
         db_table = 'project_applications'
         managed = False
+
+
+def invalidate_application_metrics(sender, instance, **kwargs):
+    """
+    Adding (or removing) an application to a project through the v2 API
+    changes the application's metrics.
+    """
+    from core.metrics.application import mark_application_metrics_stale
+    mark_application_metrics_stale([instance.application_id])
+
+
+post_save.connect(invalidate_application_metrics, sender=ProjectApplication)
+post_delete.connect(invalidate_application_metrics, sender=ProjectApplication)
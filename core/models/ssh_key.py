@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 
 from core.models import AtmosphereUser
 
@@ -31,3 +32,22 @@ class SSHKey(models.Model):
 def get_user_ssh_keys(username):
     user = AtmosphereUser.objects.get(username=username)
     return SSHKey.objects.filter(atmo_user=user)
+
+
+def invalidate_keypair_setup(sender, instance, **kwargs):
+    """
+    Import the user's keys again on their next launch.
+    """
+    from core.models.identity import Identity
+    from service.cache import invalidate_launch_setup
+    identity_uuids = Identity.objects.filter(
+        created_by_id=instance.atmo_user_id
+    ).values_list(
+        'uuid', flat=True
+    )
+    invalidate_launch_setup(identity_uuids, 'keypair')
+
+
+# Instantiate the hooks:
+post_save.connect(invalidate_keypair_setup, sender=SSHKey)
+post_delete.connect(invalidate_keypair_setup, sender=SSHKey)
@@ -247,6 +247,28 @@ To restore 'basic' functionality, please set settings.ACCOUNT_CREATION_PLUGINS t
                 accounts.extend(created)
         return accounts
 
+    @classmethod
+    def create_many_accounts(
+        cls, provider, usernames, force=False, concurrency=None
+    ):
+        """
+        Create the accounts of every user of `usernames` at once, returning
+        the {'username', 'project_name', 'identity', 'timings', 'error'} of
+        each account.
+        """
+        results = []
+        for AccountCreationPluginCls in cls.load_plugins(cls.list_of_classes):
+            plugin = AccountCreationPluginCls()
+            results.extend(
+                plugin.create_many_accounts(
+                    provider=provider,
+                    usernames=usernames,
+                    force=force,
+                    concurrency=concurrency
+                )
+            )
+        return results
+
     @classmethod
     def delete_accounts(cls, provider, username):
         """
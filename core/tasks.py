@@ -59,3 +59,35 @@ def set_request_as_failed(request):
     """
     request.status = get_status_type(status="failed")
     request.save()
+
+
+@task(name="dispatch_events")
+def dispatch_events(event_ids):
+    """
+    Run the post_save handlers of events created by
+    `EventTable.create_events(..., defer=True)`.
+    """
+    from core.models.event_table import EventTable, dispatch_post_save_event
+    for event in EventTable.objects.filter(id__in=event_ids).order_by('id'):
+        dispatch_post_save_event(EventTable, event, created=True)
+
+
+@task(name="refresh_all_application_metrics")
+def refresh_all_application_metrics():
+    """
+    Re-calculate the metrics of every application.
+    """
+    from core.metrics.application import refresh_application_metrics
+    metrics = refresh_application_metrics()
+    celery_logger.info("Refreshed metrics of %s applications" % len(metrics))
+
+
+@task(name="refresh_stale_application_metrics")
+def refresh_stale_application_metrics():
+    """
+    Re-calculate the metrics of applications changed since the last run.
+    """
+    from core.metrics.application import \
+        refresh_stale_application_metrics as refresh_stale
+    count = refresh_stale()
+    celery_logger.info("Refreshed metrics of %s applications" % count)
@@ -0,0 +1,178 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+import mock
+
+from api.tests.factories import AllocationSourceFactory, InstanceFactory
+from core.models import (
+    AllocationUsageWatermark, EventTable, InstanceAllocationTimeline,
+    InstanceAllocationUsage
+)
+from core.models.allocation_source import accumulated_usage
+
+
+class AccumulatedUsageTest(TestCase):
+    def setUp(self):
+        self.instance = InstanceFactory.create()
+        self.user = self.instance.created_by
+        self.allocation_source = AllocationSourceFactory.create()
+        self.start_date = timezone.now() - timedelta(days=10)
+
+    def _row(self, seconds, burn_rate=1):
+        return {
+            'instance_id': self.instance.id,
+            'applicable_duration': seconds,
+            'burn_rate': burn_rate
+        }
+
+    def test_only_the_window_since_the_last_run_is_reported(self):
+        first_end = self.start_date + timedelta(days=1)
+        second_end = first_end + timedelta(hours=1)
+        with mock.patch(
+            'service.allocation_logic.create_report'
+        ) as create_report:
+            create_report.return_value = [self._row(7200)]
+            self.assertEqual(
+                accumulated_usage(
+                    self.user,
+                    self.allocation_source,
+                    self.start_date,
+                    end_date=first_end
+                ), [2.0, 1]
+            )
+            create_report.return_value = [self._row(3600)]
+            self.assertEqual(
+                accumulated_usage(
+                    self.user,
+                    self.allocation_source,
+                    self.start_date,
+                    end_date=second_end
+                ), [3.0, 1]
+            )
+        self.assertEqual(
+            create_report.call_args[0][:2], (first_end, second_end)
+        )
+        usage = InstanceAllocationUsage.objects.get(user=self.user)
+        self.assertEqual(usage.compute_used, 10800)
+        watermark = AllocationUsageWatermark.objects.get(user=self.user)
+        self.assertEqual(watermark.end_date, second_end)
+
+    def test_users_without_usage_are_reported_on_incrementally(self):
+        first_end = self.start_date + timedelta(days=1)
+        second_end = first_end + timedelta(hours=1)
+        with mock.patch(
+            'service.allocation_logic.create_report', return_value=[]
+        ) as create_report:
+            for end_date in [first_end, second_end]:
+                self.assertEqual(
+                    accumulated_usage(
+                        self.user,
+                        self.allocation_source,
+                        self.start_date,
+                        end_date=end_date
+                    ), [0.0, 0]
+                )
+        self.assertEqual(
+            create_report.call_args[0][:2], (first_end, second_end)
+        )
+        self.assertFalse(InstanceAllocationUsage.objects.exists())
+
+    def test_changed_start_date_rebuilds_totals(self):
+        end_date = self.start_date + timedelta(days=1)
+        with mock.patch(
+            'service.allocation_logic.create_report'
+        ) as create_report:
+            create_report.return_value = [self._row(7200)]
+            accumulated_usage(
+                self.user,
+                self.allocation_source,
+                self.start_date,
+                end_date=end_date
+            )
+            renewed = self.start_date + timedelta(hours=12)
+            create_report.return_value = [self._row(3600, burn_rate=0)]
+            self.assertEqual(
+                accumulated_usage(
+                    self.user,
+                    self.allocation_source,
+                    renewed,
+                    end_date=end_date
+                ), [1.0, 0]
+            )
+        self.assertEqual(create_report.call_args[0][:2], (renewed, end_date))
+
+
+class InstanceAllocationTimelineTest(TestCase):
+    def setUp(self):
+        self.first = AllocationSourceFactory.create()
+        self.second = AllocationSourceFactory.create()
+        self.now = timezone.now()
+
+    def _change(self, timestamp, **payload):
+        payload.setdefault('instance_id', 'alias')
+        return EventTable(
+            name='instance_allocation_source_changed',
+            entity_id='user',
+            payload=payload,
+            timestamp=timestamp
+        )
+
+    def test_allocation_source_at_a_time(self):
+        for (hours, allocation_source) in [(2, self.first), (1, self.second)]:
+            self._change(
+                self.now - timedelta(hours=hours),
+                allocation_source_name=allocation_source.name
+            ).save()
+        self.assertIsNone(
+            InstanceAllocationTimeline.allocation_source_at(
+                'alias', self.now - timedelta(hours=3)
+            )
+        )
+        self.assertEqual(
+            InstanceAllocationTimeline.allocation_source_at(
+                'alias', self.now - timedelta(minutes=90)
+            ), self.first
+        )
+        self.assertEqual(
+            InstanceAllocationTimeline.allocation_source_at('alias', self.now),
+            self.second
+        )
+
+    def test_backfill_records_missing_events(self):
+        # Created without running the event handlers
+        EventTable.objects.bulk_create(
+            [
+                self._change(
+                    self.now,
+                    username='other',
+                    allocation_source_id=str(self.second.uuid).upper()
+                )
+            ]
+        )
+
+        self.assertEqual(InstanceAllocationTimeline.backfill(), 1)
+        self.assertEqual(InstanceAllocationTimeline.backfill(), 0)
+        entry = InstanceAllocationTimeline.objects.get()
+        self.assertEqual(entry.username, 'other')
+        self.assertEqual(
+            InstanceAllocationTimeline.allocation_source_at(
+                'alias', self.now + timedelta(seconds=1), username='other'
+            ), self.second
+        )
+
+    def test_changes_belong_to_payload_user_and_entity(self):
+        self._change(
+            self.now, username='other', allocation_source_name=self.first.name
+        ).save()
+        for username in ['other', 'user']:
+            self.assertEqual(
+                InstanceAllocationTimeline.allocation_source_at(
+                    'alias', self.now + timedelta(seconds=1), username=username
+                ), self.first
+            )
+        self.assertIsNone(
+            InstanceAllocationTimeline.allocation_source_at(
+                'alias', self.now + timedelta(seconds=1), username='nobody'
+            )
+        )
@@ -0,0 +1,69 @@
+from django.test import TestCase
+import mock
+
+from api.tests.factories import (
+    ImageFactory, InstanceFactory, InstanceHistoryFactory,
+    InstanceStatusFactory, ProjectFactory, ProviderMachineFactory
+)
+from core.metrics.application import calculate_application_metrics
+from core.models import ApplicationBookmark, ProjectApplication
+
+
+class CalculateApplicationMetricsTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch(
+            'core.metrics.application.mark_application_metrics_stale'
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_metrics_are_grouped_by_application(self):
+        machine = ProviderMachineFactory.create()
+        other_machine = ProviderMachineFactory.create()
+        application = machine.application_version.application
+        other_application = other_machine.application_version.application
+        active = InstanceStatusFactory.create(name='active')
+        launched = InstanceFactory.create(provider_machine=machine)
+        InstanceHistoryFactory.create(instance=launched, status=active)
+        InstanceHistoryFactory.create(instance=launched, status=active)
+        InstanceFactory.create(provider_machine=machine)
+        ApplicationBookmark.objects.create(
+            user=launched.created_by, application=application
+        )
+
+        metrics = calculate_application_metrics(
+            [application.id, other_application.id]
+        )
+
+        self.assertEqual(metrics[application.id]['bookmarks'], 1)
+        self.assertEqual(
+            metrics[application.id]['instances'], {
+                'total': 2,
+                'success': 1,
+                'percent': 50.0
+            }
+        )
+        self.assertEqual(
+            metrics[other_application.id]['instances'], {
+                'total': 0,
+                'success': 0,
+                'percent': 0.0
+            }
+        )
+
+
+class ProjectApplicationMetricsTest(TestCase):
+    def test_project_links_mark_the_application_stale(self):
+        application = ImageFactory.create()
+        with mock.patch(
+            'core.metrics.application.mark_application_metrics_stale'
+        ) as mark_stale:
+            link = ProjectApplication.objects.create(
+                project=ProjectFactory.create(), application=application
+            )
+            link.delete()
+        self.assertEqual(
+            mark_stale.call_args_list,
+            [mock.call([application.id]),
+             mock.call([application.id])]
+        )
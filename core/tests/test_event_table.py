@@ -1,10 +1,12 @@
 from unittest import skip
 
 from django.test import TestCase, override_settings
+import mock
 
 from api.tests.factories import UserFactory
 from core.models import EventTable, AllocationSource
 from core.models import UserAllocationSource
+from core.models.event_table import POST_SAVE_EVENT_HANDLERS
 
 
 class EventTableTest(TestCase):
@@ -47,3 +49,46 @@ class EventTableTest(TestCase):
                 'threshold': 10
             }
         )
+
+
+class EventDispatchTest(TestCase):
+    def test_events_only_run_their_own_handlers(self):
+        handler = mock.Mock()
+        other_handler = mock.Mock()
+        with mock.patch.dict(
+            POST_SAVE_EVENT_HANDLERS, {
+                'test_event': [handler],
+                'other_test_event': [other_handler]
+            }
+        ):
+            event = EventTable.create_event(
+                name='test_event', payload={}, entity_id='test'
+            )
+        self.assertEqual(handler.call_count, 1)
+        self.assertEqual(handler.call_args[0], (EventTable, event))
+        self.assertTrue(handler.call_args[1]['created'])
+        self.assertFalse(other_handler.called)
+
+    def test_create_events_bulk_inserts_and_dispatches_in_order(self):
+        seen = []
+
+        def handler(sender, instance, **kwargs):
+            seen.append(instance.entity_id)
+
+        with mock.patch.dict(
+            POST_SAVE_EVENT_HANDLERS, {'test_event': [handler]}
+        ):
+            events = EventTable.create_events(
+                [
+                    {
+                        'name': 'test_event',
+                        'payload': {},
+                        'entity_id': str(index)
+                    } for index in range(3)
+                ]
+            )
+        self.assertEqual(seen, ['0', '1', '2'])
+        self.assertEqual(
+            EventTable.objects.filter(name='test_event').count(), 3
+        )
+        self.assertTrue(all(event.id for event in events))
@@ -3,9 +3,12 @@ import uuid
 import unittest
 
 from dateutil.relativedelta import relativedelta
+from django.test import TestCase
 from django.utils.timezone import datetime
 import pytz
 
+from api.tests.factories import InstanceFactory, InstanceHistoryFactory
+from core.models import Instance
 from core.tests.helpers import CoreStatusHistoryHelper, CoreInstanceHelper
 
 # Create an instance
@@ -89,3 +92,29 @@ class TestInstanceStatusHistory(CoreInstanceTestCase):
             next_start = next_start + self.history_swap_every
         self.instance_1.end_date_all(self.terminate_time)
         self.assertNoActiveHistory(self.instance_1)
+
+
+class TestInstanceLastHistory(TestCase):
+    def test_last_history_follows_the_newest_history(self):
+        instance = InstanceFactory.create()
+        start = instance.start_date
+        first = InstanceHistoryFactory.create(
+            instance=instance, start_date=start
+        )
+        newest = InstanceHistoryFactory.create(
+            instance=instance, start_date=start + relativedelta(hours=1)
+        )
+        # Saving an older history does not move the pointer back
+        first.end_date = newest.start_date
+        first.save()
+
+        self.assertEqual(
+            Instance.objects.get(id=instance.id).last_history_id, newest.id
+        )
+        self.assertEqual(instance.get_last_history(), newest)
+
+    def test_deleted_instance_is_saved_again(self):
+        instance = InstanceFactory.create()
+        Instance.objects.filter(id=instance.id).delete()
+        instance.save()
+        self.assertTrue(Instance.objects.filter(id=instance.id).exists())
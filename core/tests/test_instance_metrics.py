@@ -0,0 +1,34 @@
+from django.test import TestCase, override_settings
+import mock
+
+from core.metrics.instance import (
+    create_batch_request_uri, request_metrics_for
+)
+
+
+@override_settings(METRIC_SERVER='http://graphite')
+class BatchedInstanceMetricsTest(TestCase):
+    def test_one_target_per_instance(self):
+        uri = create_batch_request_uri(['a', 'b'], {'field': 'cpu'})
+        self.assertEqual(
+            uri, 'http://graphite/render/?target=stats.*.a.cpu'
+            '&target=stats.*.b.cpu&format=json'
+        )
+
+    def test_series_are_split_by_instance(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = [
+            {
+                'target': 'stats.host.b.cpu',
+                'datapoints': []
+            }, {
+                'target': 'stats.host.a.cpu',
+                'datapoints': []
+            }
+        ]
+        with mock.patch('core.metrics.instance._session') as session:
+            session.return_value.get.return_value = response
+            metrics = request_metrics_for(['a', 'b'], {'field': 'cpu'})
+        self.assertEqual(session.return_value.get.call_count, 1)
+        self.assertEqual(metrics['a'], [response.json.return_value[1]])
+        self.assertEqual(metrics['b'], [response.json.return_value[0]])
@@ -99,6 +99,7 @@ def allocation_threshold_check():
         )
         return
 
+    threshold_events = []
     for allocation_source in AllocationSource.objects.filter(
         compute_allowed__gte=0
     ).all():
@@ -126,12 +127,16 @@ def allocation_threshold_check():
                 payload['threshold'] = threshold
                 payload['usage_percentage'] = float(percentage_used)
 
-                EventTable.objects.create(
-                    name='allocation_source_threshold_met',
-                    payload=payload,
-                    entity_id=payload['allocation_source_name']
+                threshold_events.append(
+                    {
+                        'name': 'allocation_source_threshold_met',
+                        'payload': payload,
+                        'entity_id': payload['allocation_source_name']
+                    }
                 )
                 break
+    # Emails are sent to the users of each source from the dispatch_events task
+    EventTable.create_events(threshold_events, defer=True)
     logger.debug(
         "allocation_threshold_check task finished at %s." % datetime.now()
     )
@@ -146,6 +151,7 @@ def renew_allocation_sources(
 ):
     current_time = timezone.now() if not current_time else current_time
 
+    renewal_events = []
     for strategy, args in renewal_strategies.iteritems():
 
         if renewal_strategy and (str(renewal_strategy) != str(strategy)):
@@ -154,10 +160,19 @@ def renew_allocation_sources(
         for allocation_source in AllocationSource.objects.filter(
             renewal_strategy=str(strategy)
         ):
-            renew_allocation_source_for(
-                compute_allowed, allocation_source, current_time,
-                ignore_current_compute_allowed, dry_run
+            if dry_run:
+                renew_allocation_source_for(
+                    compute_allowed, allocation_source, current_time,
+                    ignore_current_compute_allowed, dry_run
+                )
+                continue
+            renewal_events.append(
+                _renewal_event_for(
+                    compute_allowed, allocation_source, current_time,
+                    ignore_current_compute_allowed
+                )
             )
+    EventTable.create_events(renewal_events)
 
 
 def renew_allocation_source_for(
@@ -167,6 +182,33 @@ def renew_allocation_source_for(
     ignore_current_compute_allowed=False,
     dry_run=False
 ):
+    event = _renewal_event_for(
+        compute_allowed, allocation_source, current_time,
+        ignore_current_compute_allowed
+    )
+    if dry_run:
+        dry_run_text = '''EventTable.objects.create(name='allocation_source_created_or_renewed',
+                              payload={},
+                              entity_id='{}',
+                              timestamp={})
+        '''.format(
+            pprint.pformat(event['payload']), event['entity_id'], current_time
+        )
+        print(dry_run_text)
+    else:
+        EventTable.objects.create(**event)
+
+
+def _renewal_event_for(
+    compute_allowed,
+    allocation_source,
+    current_time,
+    ignore_current_compute_allowed=False
+):
+    """
+    The fields of the 'allocation_source_created_or_renewed' event that
+    renews `allocation_source` at `current_time`.
+    """
     total_compute_allowed = compute_allowed
     if not ignore_current_compute_allowed:
         source_snapshot = AllocationSourceSnapshot.objects.filter(
@@ -177,32 +219,15 @@ def renew_allocation_source_for(
             if snapshot_compute_allowed > compute_allowed:
                 total_compute_allowed = snapshot_compute_allowed
 
-    # fire renewal event
-
-    renewal_strategy = allocation_source.renewal_strategy
-    allocation_source_name = allocation_source.name
-    allocation_source_uuid = allocation_source.uuid
-
     payload = {
-        "uuid": str(allocation_source_uuid),
-        "renewal_strategy": renewal_strategy,
-        "allocation_source_name": allocation_source_name,
+        "uuid": str(allocation_source.uuid),
+        "renewal_strategy": allocation_source.renewal_strategy,
+        "allocation_source_name": allocation_source.name,
         "compute_allowed": total_compute_allowed
     }
-
-    if dry_run:
-        dry_run_text = '''EventTable.objects.create(name='allocation_source_created_or_renewed',
-                              payload={},
-                              entity_id='{}',
-                              timestamp={})
-        '''.format(
-            pprint.pformat(payload), allocation_source_name, current_time
-        )
-        print(dry_run_text)
-    else:
-        EventTable.objects.create(
-            name='allocation_source_created_or_renewed',
-            payload=payload,
-            entity_id=allocation_source_name,
-            timestamp=current_time
-        )
+    return {
+        'name': 'allocation_source_created_or_renewed',
+        'payload': payload,
+        'entity_id': allocation_source.name,
+        'timestamp': current_time
+    }
@@ -1,4 +1,7 @@
+import json
 import uuid
+from multiprocessing.pool import ThreadPool
+
 from django.conf import settings
 from django.db import IntegrityError
 from django.utils import timezone
@@ -9,9 +12,14 @@ from .exceptions import TASAPIException, NoTaccUserForXsedeException, NoAccountF
 from .tas_api import tacc_api_post, tacc_api_get
 from core.models import EventTable
 from core.models.allocation_source import AllocationSource, UserAllocationSource
+from redis import RedisError
+from service.cache import redis_connection
 
 from threepio import logger
 
+#: Prefix of the keys of the TAS API responses cached in redis
+CACHE_PREFIX = "tas-api."
+
 
 class TASAPIDriver(object):
     tacc_api = None
@@ -45,6 +53,39 @@ class TASAPIDriver(object):
         self.project_list = []
         self.allocation_list = []
         self.username_map = {}
+        try:
+            redis = redis_connection()
+            keys = list(redis.scan_iter(match=CACHE_PREFIX + '*'))
+            if keys:
+                redis.delete(*keys)
+        except RedisError:
+            logger.exception('Could not clear the cached TAS API responses')
+
+    def _cache_key(self, *parts):
+        return CACHE_PREFIX + '.'.join((self.resource_name, ) + parts)
+
+    def _cached(self, key, timeout, fetch):
+        """
+        Return the value cached in redis at `key`, or the result of `fetch`,
+        cached for `timeout` seconds (if not 0).
+
+        The TAS API is only looked at if redis can not be reached.
+        """
+        if not timeout:
+            return fetch()
+        try:
+            cached = redis_connection().get(key)
+        except RedisError:
+            logger.exception('Could not read the cached %s', key)
+            return fetch()
+        if cached is not None:
+            return json.loads(cached)
+        value = fetch()
+        try:
+            redis_connection().set(key, json.dumps(value), ex=timeout)
+        except RedisError:
+            logger.exception('Could not cache %s', key)
+        return value
 
     def get_all_allocations(self):
         if not self.allocation_list:
@@ -53,7 +94,11 @@ class TASAPIDriver(object):
 
     def get_all_projects(self):
         if not self.project_list:
-            self.project_list = self._get_all_projects()
+            self.project_list = self._cached(
+                self._cache_key('projects'),
+                getattr(settings, 'TAS_PROJECT_CACHE_TTL', 300),
+                self._get_all_projects
+            )
         return self.project_list
 
     def get_tacc_username(self, user, raise_exception=False):
@@ -61,7 +106,11 @@ class TASAPIDriver(object):
             return self.username_map[user.username]
         tacc_user = None
         try:
-            tacc_user = self._xsede_to_tacc_username(user.username)
+            tacc_user = self._cached(
+                self._cache_key('username', user.username),
+                getattr(settings, 'TAS_USERNAME_CACHE_TTL', 24 * 60 * 60),
+                lambda: self._xsede_to_tacc_username(user.username)
+            )
         except NoTaccUserForXsedeException:
             logger.exception('User: %s has no TACC username', user.username)
             if raise_exception:
@@ -103,13 +152,33 @@ class TASAPIDriver(object):
 
     def get_all_project_users(self):
         if not self.user_project_list:
-            self.project_list = self._get_all_projects()
-            for project in sorted(self.project_list, key=lambda p: p['id']):
-                project_users = self.get_project_users(project['id'])
-                project['users'] = project_users
-            self.user_project_list = self.project_list
+            self.user_project_list = self._cached(
+                self._cache_key('project-users'),
+                getattr(settings, 'TAS_PROJECT_CACHE_TTL', 300),
+                self._get_all_project_users
+            )
+            self.project_list = self.user_project_list
         return self.user_project_list
 
+    def _get_all_project_users(self):
+        """
+        Every project, along with the usernames of its users.
+
+        The users of TAS_API_CONCURRENCY projects are looked up at a time.
+        """
+        projects = self._get_all_projects()
+        pool = ThreadPool(getattr(settings, 'TAS_API_CONCURRENCY', 8))
+        try:
+            all_project_users = pool.map(
+                self.get_project_users, [project['id'] for project in projects]
+            )
+        finally:
+            pool.close()
+            pool.join()
+        for (project, project_users) in zip(projects, all_project_users):
+            project['users'] = project_users
+        return projects
+
     def _xsede_to_tacc_username(self, xsede_username):
         path = '/v1/users/xsede/%s' % xsede_username
         url_match = self.tacc_api + path
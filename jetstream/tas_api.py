@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ReadTimeout
 
 from django.conf import settings
@@ -8,6 +9,25 @@ from .exceptions import TASAPIException
 
 from threepio import logger
 
+session = None
+
+
+def _session():
+    """
+    The `requests.Session` shared by every call to the TAS API, so that
+    connections to it are kept alive and reused (up to TACC_API_POOL_SIZE
+    at a time).
+    """
+    global session
+    if not session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=getattr(settings, 'TACC_API_POOL_SIZE', 10)
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
 
 def tacc_api_post(url, post_data, username=None, password=None):
     if not username:
@@ -16,7 +36,7 @@ def tacc_api_post(url, post_data, username=None, password=None):
         password = settings.TACC_API_PASS
     logger.debug('url: %s', url)
     # logger.debug("REQ BODY: %s" % post_data)
-    resp = requests.post(url, post_data, auth=(username, password))
+    resp = _session().post(url, post_data, auth=(username, password))
     logger.debug('resp.status_code: %s', resp.status_code)
     # logger.debug('resp.__dict__: %s', resp.__dict__)
     return resp
@@ -30,7 +50,7 @@ def tacc_api_get(url, username=None, password=None):
         password = settings.TACC_API_PASS
     logger.debug('url: %s', url)
     try:
-        resp = requests.get(
+        resp = _session().get(
             url,
             auth=(username, password),
             timeout=settings.TACC_READ_API_TIMEOUT
@@ -8,7 +8,7 @@ from core.models.allocation_source import (
     UserAllocationSource, AllocationSourceSnapshot, AllocationSource,
     UserAllocationSnapshot
 )
-from core.models.allocation_source import total_usage
+from core.models.allocation_source import accumulated_usage, total_usage
 from .allocation import (
     TASAPIDriver, fill_user_allocation_sources, select_valid_allocation
 )
@@ -49,12 +49,14 @@ def create_reports():
         last_report_date = max_report_end_date['end_date__max']
     logger.info('create_reports - last_report_date: %s', last_report_date)
 
+    # One driver for every report, so TAS API lookups are only made once
+    driver = TASAPIDriver()
     for item in user_allocation_list:
         allocation_name = item.allocation_source.name
         logger.debug('create_reports - allocation_name: %s', allocation_name)
         logger.debug('create_reports - item.user: %s', item.user)
         project_report = _create_reports_for(
-            item.user, allocation_name, end_date
+            driver, item.user, allocation_name, end_date
         )
         if project_report:
             all_reports.append(project_report)
@@ -70,18 +72,19 @@ def create_reports():
         user = AtmosphereUser.objects.get(username=event.entity_id)
         allocation_name = event.payload['allocation_source_name']
         end_date = event.timestamp
-        project_report = _create_reports_for(user, allocation_name, end_date)
+        project_report = _create_reports_for(
+            driver, user, allocation_name, end_date
+        )
         if project_report:
             all_reports.append(project_report)
     return all_reports
 
 
-def _create_reports_for(user, allocation_name, end_date):
+def _create_reports_for(driver, user, allocation_name, end_date):
     logger.debug(
         '_create_reports_for - user: %s, allocation_name: %s, end_date: %s',
         user, allocation_name, end_date
     )
-    driver = TASAPIDriver()
     tacc_username = driver.get_tacc_username(user)
     if not tacc_username:
         logger.error(
@@ -212,12 +215,8 @@ def update_snapshot(start_date=None, end_date=None):
                 start_date = created_or_updated_event.payload['start_date']
 
             for user in allocation_source.all_users:
-                compute_used, burn_rate = total_usage(
-                    user.username,
-                    start_date,
-                    allocation_source_name=allocation_source.name,
-                    end_date=end_date,
-                    burn_rate=True
+                compute_used, burn_rate = accumulated_usage(
+                    user, allocation_source, start_date, end_date=end_date
                 )
                 total_burn_rate += burn_rate
                 UserAllocationSnapshot.objects.update_or_create(
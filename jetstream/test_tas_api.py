@@ -32,6 +32,9 @@ class TestJetstream(TestCase):
         # playback, we just need to clear the memoize cache
         from jetstream.tas_api import tacc_api_get
         memoize.delete_memoized(tacc_api_get)
+        # Same goes for the responses cached in redis
+        from jetstream.allocation import TASAPIDriver
+        TASAPIDriver().clear_cache()
 
     @my_vcr.use_cassette()
     def test_validate_account(self, cassette):
@@ -0,0 +1,80 @@
+"""
+A local stand-in for the TAS API, to test the TAS API client against.
+"""
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+import json
+import threading
+
+
+class _TASServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _TASRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server.tas_server
+        with server.lock:
+            server.requests.append(self.path)
+        data = server.responses.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps(data)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TASServer(object):
+    """
+    Serve `responses` ({path: json result}) over HTTP, as the TAS API
+    would, and remember the path of every request made.
+
+        with TASServer({'/v1/users/xsede/user': 'tacc_user'}) as server:
+            TASAPIDriver(tacc_api=server.url)...
+    """
+
+    def __init__(self, responses=None):
+        self.responses = {}
+        for (path, result) in (responses or {}).items():
+            self.add(path, result)
+        self.requests = []
+        self.lock = threading.Lock()
+        self._server = None
+
+    def add(self, path, result, status='success', message=None):
+        self.responses[path] = {
+            'status': status,
+            'message': message,
+            'result': result
+        }
+
+    @property
+    def url(self):
+        (host, port) = self._server.server_address
+        return 'http://%s:%s' % (host, port)
+
+    def start(self):
+        self._server = _TASServer(('127.0.0.1', 0), _TASRequestHandler)
+        self._server.tas_server = self
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,105 @@
+from fnmatch import fnmatch
+
+from django.test import TestCase, override_settings
+import memoize
+import mock
+
+from api.tests.factories import UserFactory
+from jetstream.allocation import TASAPIDriver
+from jetstream.tas_api import tacc_api_get, _session
+from jetstream.tests.tas_server import TASServer
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def scan_iter(self, match=None):
+        return [key for key in self.data.keys() if fnmatch(key, match)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@override_settings(TACC_READ_API_TIMEOUT=5, TAS_API_CONCURRENCY=4)
+class TestTASAPIClient(TestCase):
+    def setUp(self):
+        memoize.delete_memoized(tacc_api_get)
+        self.redis = FakeRedis()
+        patcher = mock.patch(
+            'jetstream.allocation.redis_connection', return_value=self.redis
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = TASServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add(
+            '/v1/projects/resource/Jetstream', [
+                {
+                    'id': project_id,
+                    'chargeCode': 'TG-%s' % project_id
+                } for project_id in range(1, 11)
+            ]
+        )
+        for project_id in range(1, 11):
+            self.server.add(
+                '/v1/projects/%s/users' % project_id,
+                [{
+                    'username': 'tacc_user_%s' % project_id
+                }]
+            )
+        self.server.add('/v1/users/xsede/xsede_user', 'tacc_user_1')
+        self.addCleanup(TASAPIDriver().clear_cache)
+
+    def _driver(self):
+        driver = TASAPIDriver(tacc_api=self.server.url)
+        driver.clear_cache()
+        memoize.delete_memoized(tacc_api_get)
+        return driver
+
+    def test_session_is_shared(self):
+        self.assertIs(_session(), _session())
+
+    def test_project_users(self):
+        projects = self._driver().get_all_project_users()
+        self.assertEqual(
+            [project['users'] for project in projects],
+            [['tacc_user_%s' % project_id] for project_id in range(1, 11)]
+        )
+        self.assertEqual(len(self.server.requests), 11)
+
+    def test_project_users_are_cached_across_drivers(self):
+        self._driver().get_all_project_users()
+        # A later run, with empty per-process caches
+        driver = TASAPIDriver(tacc_api=self.server.url)
+        driver.user_project_list = []
+        memoize.delete_memoized(tacc_api_get)
+        projects = driver.find_projects_for('tacc_user_2')
+        self.assertEqual([project['id'] for project in projects], [2])
+        self.assertEqual(len(self.server.requests), 11)
+
+    def test_username_is_cached_across_drivers(self):
+        user = UserFactory.create(username='xsede_user')
+        self.assertEqual(self._driver().get_tacc_username(user), 'tacc_user_1')
+        driver = TASAPIDriver(tacc_api=self.server.url)
+        driver.username_map = {}
+        memoize.delete_memoized(tacc_api_get)
+        self.assertEqual(driver.get_tacc_username(user), 'tacc_user_1')
+        self.assertEqual(self.server.requests, ['/v1/users/xsede/xsede_user'])
+
+    @override_settings(TAS_USERNAME_CACHE_TTL=0)
+    def test_username_cache_can_be_disabled(self):
+        user = UserFactory.create(username='xsede_user')
+        self._driver().get_tacc_username(user)
+        driver = TASAPIDriver(tacc_api=self.server.url)
+        driver.username_map = {}
+        memoize.delete_memoized(tacc_api_get)
+        driver.get_tacc_username(user)
+        self.assertEqual(len(self.server.requests), 2)
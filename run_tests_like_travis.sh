@@ -32,6 +32,9 @@ ${SUDO_POSTGRES} dropdb --if-exists atmosphere_db
 ${SUDO_POSTGRES} dropdb --if-exists test_atmosphere_db
 ${SUDO_POSTGRES} dropuser --if-exists atmosphere_db_user
 ${SUDO_POSTGRES} psql -c "CREATE USER atmosphere_db_user WITH PASSWORD 'atmosphere_db_pass' CREATEDB;" --dbname=postgres
+# Only a superuser can install pg_trgm: install it in the template of the
+# application and test databases
+${SUDO_POSTGRES} psql -c "CREATE EXTENSION IF NOT EXISTS pg_trgm;" --dbname=template1
 ${SUDO_POSTGRES} createdb --owner=atmosphere_db_user atmosphere_db
 
 cp ./variables.ini.dist ./variables.ini
@@ -2,10 +2,14 @@
 UserManager:
   Remote Openstack Admin controls..
 """
+from collections import OrderedDict
+from functools import partial
+from multiprocessing.pool import ThreadPool
 import time
 import string
 from urlparse import urlparse
 import glanceclient
+from django import db
 from django.db.models import ObjectDoesNotExist
 from rtwo.exceptions import (
     NovaOverLimit, KeystoneUnauthorized, NeutronClientException,
@@ -47,6 +51,14 @@ from service.exceptions import TimeoutError
 from atmosphere.settings import DEFAULT_PASSWORD_UPDATE, DEFAULT_RULES
 
 
+def _record_time(timings, step, start_time):
+    """
+    Record the milliseconds since `start_time` as `timings[step]`.
+    """
+    if timings is not None:
+        timings[step] = (time.time() - start_time) * 1000
+
+
 def timeout_after(seconds):
     def real_timeout(func):
         def wrapper(*args, **kwargs):
@@ -254,11 +266,16 @@ class AccountDriver(BaseAccountDriver):
         role_name=None,
         quota=None,
         is_leader=False,
-        max_quota=False
+        max_quota=False,
+        timings=None,
+        users=None
     ):
         """
         Create (And Update "latest changes") to an account
 
+        When given, `timings` records the milliseconds spent in each step
+        and `users` ({name: keystone user}) spares listing every user (see
+        `build_account`).
         """
         if not self.core_provider:
             raise Exception(
@@ -287,7 +304,13 @@ class AccountDriver(BaseAccountDriver):
             return
         try:
             (username, password, project) = self.build_account(
-                username, password, project_name, role_name, max_quota
+                username,
+                password,
+                project_name,
+                role_name,
+                max_quota,
+                timings=timings,
+                users=users
             )
         except (KeystoneUnauthorized, KeystoneauthUnauthorized) as exc:
             logger.exception("Encountered error creating account - %s" % exc)
@@ -297,6 +320,7 @@ class AccountDriver(BaseAccountDriver):
                 "This conflict should be addressed by hand." % (username, )
             )
 
+        start_time = time.time()
         try:
             has_allocations = core.plugins.AllocationSourcePluginManager.ensure_user_allocation_sources(
                 user
@@ -315,7 +339,9 @@ class AccountDriver(BaseAccountDriver):
                 'but while ensuring user has valid Allocation Sources there was a problem: {}'
                 .format(user, e)
             )
+        _record_time(timings, 'allocation_sources', start_time)
 
+        start_time = time.time()
         ident = self.create_identity(
             account_user,
             group_name,
@@ -326,8 +352,82 @@ class AccountDriver(BaseAccountDriver):
             max_quota=max_quota,
             is_leader=is_leader
         )
+        _record_time(timings, 'identity', start_time)
         return ident
 
+    def create_accounts(self, credentials_list, concurrency=None):
+        """
+        Create the account of each credentials (the arguments of
+        `create_account`) of `credentials_list`, the accounts of
+        ACCOUNT_CREATION_CONCURRENCY users at a time, sharing this driver's
+        keystone session.
+
+        Returns the {'username', 'project_name', 'identity', 'timings',
+        'error'} of each account, in order of the users' first account.
+        """
+        if not concurrency:
+            concurrency = getattr(settings, 'ACCOUNT_CREATION_CONCURRENCY', 8)
+        # The accounts of a user are created one after the other, so that
+        # its keystone user is only created once
+        by_username = OrderedDict()
+        for credentials in credentials_list:
+            user_credentials = by_username.setdefault(
+                credentials['username'], []
+            )
+            user_credentials.append(credentials)
+        # List the users once, rather than once per account
+        users = self.user_index()
+        pool = ThreadPool(max(min(concurrency, len(by_username)), 1))
+        try:
+            results = pool.map(
+                partial(self._create_accounts_for, users), by_username.values()
+            )
+        finally:
+            pool.close()
+            pool.join()
+        return [result for user_results in results for result in user_results]
+
+    def _create_accounts_for(self, users, credentials_list):
+        try:
+            return [
+                self._create_account_for(users, credentials)
+                for credentials in credentials_list
+            ]
+        finally:
+            # Worker threads have their own database connection
+            db.connection.close()
+
+    def _create_account_for(self, users, credentials):
+        timings = OrderedDict()
+        result = {
+            'username': credentials['username'],
+            'project_name': credentials.get('project_name'),
+            'identity': None,
+            'timings': timings,
+            'error': None,
+        }
+        try:
+            identity = self.create_account(
+                timings=timings, users=users, **credentials
+            )
+            if identity:
+                result['identity'] = str(identity.uuid)
+        except Exception as exc:
+            logger.exception(
+                "Could *NOT* Create NEW account for %s" %
+                credentials['username']
+            )
+            result['error'] = "%s: %s" % (type(exc).__name__, exc)
+        return result
+
+    def user_index(self, **list_kwargs):
+        """
+        Every user, by name: {name: keystone user}
+        """
+        return dict(
+            (user.name, user) for user in self.list_users(**list_kwargs)
+        )
+
     def build_account(
         self,
         username,
@@ -335,8 +435,20 @@ class AccountDriver(BaseAccountDriver):
         project_name=None,
         role_name=None,
         max_quota=False,
-        domain_name='default'
+        domain_name='default',
+        timings=None,
+        users=None
     ):
+        """
+        Create the keystone project and user of the account, give the user
+        its role and create its keypair. Returns (username, password,
+        project).
+
+        When given, `timings` records the milliseconds spent in each step
+        and `users` ({name: keystone user}, see `user_index`) is looked up
+        rather than listing every user. Users created meanwhile are added
+        to `users`.
+        """
         finished = False
         # Attempt account creation
         while not finished:
@@ -346,6 +458,7 @@ class AccountDriver(BaseAccountDriver):
                 if not project_name:
                     project_name = username
                 # 1. Create Project: should exist before creating user
+                start_time = time.time()
                 project_kwargs = {}
                 if self.identity_version > 2:
                     project_kwargs.update({'domain_id': domain_name})
@@ -358,8 +471,13 @@ class AccountDriver(BaseAccountDriver):
                     project = self.user_manager.create_project(
                         project_name, **project_kwargs
                     )
+                _record_time(timings, 'project', start_time)
                 # 2. Create User (And add them to the project)
-                user = self.get_user(username)
+                start_time = time.time()
+                if users is not None:
+                    user = users.get(username)
+                else:
+                    user = self.get_user(username)
                 if not user:
                     logger.info(
                         "Creating account: %s - %s - %s" %
@@ -371,7 +489,11 @@ class AccountDriver(BaseAccountDriver):
                     user = self.user_manager.create_user(
                         username, password, project, **user_kwargs
                     )
+                    if users is not None:
+                        users[username] = user
+                _record_time(timings, 'user', start_time)
                 # 3.1 Include the admin in the project
+                start_time = time.time()
                 # TODO: providercredential initialization of
                 #  "default_admin_role"
                 self.user_manager.include_admin(project_name)
@@ -390,9 +512,12 @@ class AccountDriver(BaseAccountDriver):
                         "Could not add role %s to user %s for project %s -- Check 'user_role_name'"
                         % (role_name, username, project_name)
                     )
+                _record_time(timings, 'membership', start_time)
 
                 # 4. Create a keypair to use when launching with atmosphere
+                start_time = time.time()
                 self.init_keypair(user.name, password, project.name)
+                _record_time(timings, 'keypair', start_time)
                 finished = True
 
             except ConnectionError:
@@ -597,7 +722,7 @@ class AccountDriver(BaseAccountDriver):
         return keypair
 
     def get_image_members(self, image_id, status="approved"):
-        all_projects = {p.id: p for p in self.list_projects()}
+        all_projects = self.project_map()
         shared_with = self.image_manager.glance.image_members.list(image_id)
         projects = []
         try:
@@ -930,57 +1055,83 @@ class AccountDriver(BaseAccountDriver):
         * match_all (bool) - If True, instances must match ALL words in the list.
         * include_empty (bool) - If True, include ALL tenants in the map.
         """
-        all_projects = self.list_projects()
-        all_instances = self.list_all_instances()
         if include_empty:
-            project_map = {proj: [] for proj in all_projects}
+            project_map = {proj: [] for proj in self.list_projects()}
         else:
             project_map = {}
-        for instance in all_instances:
-            try:
-                # NOTE: will someday be 'projectId'
-                tenant_id = instance.extra['tenantId']
-
-                project = [p for p in all_projects if p.id == tenant_id][0]
-            except (ValueError, KeyError):
-                raise Exception(
-                    "The implementaion for recovering a tenant id has changed. Update the code base above this line!"
-                )
+        for (project,
+             instances) in self.iter_tenant_instances(status_list, match_all):
+            project_map.setdefault(project, []).extend(instances)
+        return project_map
 
-            metadata = instance._node.extra.get('metadata', {})
-            instance_status = instance.extra.get('status')
-            task = instance.extra.get('task')
-            tmp_status = metadata.get('tmp_status', '')
-            if status_list:
-                if match_all:
-                    truth = all(
-                        True if (
-                            status_name and status_name in
-                            [instance_status, task, tmp_status]
-                        ) else False for status_name in status_list
-                    )
-                else:
-                    truth = any(
-                        True if (
-                            status_name and status_name in
-                            [instance_status, task, tmp_status]
-                        ) else False for status_name in status_list
+    def iter_tenant_instances(self, status_list=[], match_all=False):
+        """
+        Yield (project, [instances]) for the instances of each tenant, one
+        page of `iter_all_instances` at a time (so a project can be yielded
+        once per page). See `tenant_instances_map` for the optional fields.
+        """
+        all_projects = self.project_map()
+        for instances in self.iter_all_instances():
+            page_map = {}
+            for instance in instances:
+                try:
+                    # NOTE: will someday be 'projectId'
+                    tenant_id = instance.extra['tenantId']
+                except (ValueError, KeyError):
+                    raise Exception(
+                        "The implementaion for recovering a tenant id has changed. Update the code base above this line!"
                     )
-                if not truth:
-                    logger.info(
-                        "Found an instance:%s for tenant:%s but skipped because %s could be found in the list: (%s - %s - %s)"
-                        % (
-                            instance.id, project.name,
-                            "none of the status_names"
-                            if not match_all else "not all of the status names",
-                            instance_status, task, tmp_status
-                        )
+                project = all_projects.get(tenant_id)
+                if not project:
+                    logger.warn(
+                        "Found an instance:%s for unknown tenant:%s" %
+                        (instance.id, tenant_id)
                     )
                     continue
-            instance_list = project_map.get(project, [])
-            instance_list.append(instance)
-            project_map[project] = instance_list
-        return project_map
+                if status_list and not _has_status(
+                    instance, status_list, match_all
+                ):
+                    continue
+                page_map.setdefault(project, []).append(instance)
+            for (project, project_instances) in page_map.items():
+                yield (project, project_instances)
+
+    def iter_all_instances(self, page_size=None):
+        """
+        Yield the instances of every tenant, one page of
+        ACCOUNT_INSTANCE_PAGE_SIZE at a time (following the compute API's
+        marker pagination), rather than listing them all at once.
+        """
+        if not page_size:
+            page_size = getattr(settings, 'ACCOUNT_INSTANCE_PAGE_SIZE', 500)
+        lc_driver = self.admin_driver._connection
+        instance_cls = self.admin_driver.provider.instanceCls
+        seen_ids = set()
+        marker = None
+        while True:
+            params = {'all_tenants': 'True', 'limit': page_size}
+            if marker:
+                params['marker'] = marker
+            response = lc_driver.connection.request(
+                '/servers/detail', params=params
+            )
+            # The compute API has been known to return pages again
+            servers = [
+                server for server in response.object['servers']
+                if server['id'] not in seen_ids
+            ]
+            if not servers:
+                return
+            seen_ids.update(server['id'] for server in servers)
+            nodes = lc_driver._to_nodes({'servers': servers})
+            yield [instance_cls(node, self.admin_driver) for node in nodes]
+            marker = servers[-1]['id']
+
+    def project_map(self, **kwargs):
+        """
+        The projects of `list_projects` by id
+        """
+        return {project.id: project for project in self.list_projects(**kwargs)}
 
     def list_all_instances(self, **kwargs):
         return self.admin_driver.list_all_instances(**kwargs)
@@ -1200,10 +1351,18 @@ class AccountDriver(BaseAccountDriver):
             username, password, tenant_name
         )
         # Initialize managers with respective credentials
-        all_clients = self.get_user_clients(all_creds)
-        openstack_sdk = self.get_openstack_sdk_client(all_creds)
-        neutron = self.get_neutron_client(all_creds)
-        glance = self.get_glance_client(all_creds)
+        all_clients = dict(
+            self._get_cached_client('user', all_creds, self.get_user_clients)
+        )
+        openstack_sdk = self._get_cached_client(
+            'openstack', all_creds, self.get_openstack_sdk_client
+        )
+        neutron = self._get_cached_client(
+            'neutron', all_creds, self.get_neutron_client
+        )
+        glance = self._get_cached_client(
+            'glance', all_creds, self.get_glance_client
+        )
         tenant = self.get_project(tenant_name)
         tenant_id = tenant.id if tenant else None
         all_clients.update(
@@ -1226,19 +1385,30 @@ class AccountDriver(BaseAccountDriver):
         )
 
         if client_name == 'neutron':
-            return self.get_neutron_client(all_creds)
+            build_client = self.get_neutron_client
         elif client_name == 'glance':
-            return self.get_glance_client(all_creds)
-        elif client_name == 'keystone':
-            return self.get_user_clients(all_creds)['keystone']
-        elif client_name == 'nova':
-            return self.get_user_clients(all_creds)['nova']
-        elif client_name == 'swift':
-            return self.get_user_clients(all_creds)['swift']
+            build_client = self.get_glance_client
+        elif client_name in ['keystone', 'nova', 'swift']:
+            user_clients = self._get_cached_client(
+                'user', all_creds, self.get_user_clients
+            )
+            return user_clients[client_name]
         elif client_name == 'openstack':
-            return self.get_openstack_sdk_client(all_creds)
+            build_client = self.get_openstack_sdk_client
         else:
             raise ValueError("Invalid client_name %s" % client_name)
+        return self._get_cached_client(client_name, all_creds, build_client)
+
+    def _get_cached_client(self, service, all_creds, build_client):
+        """
+        The `service` client of `all_creds`, shared by every account driver
+        of this process (see `service.cache.get_cached_client`), rather
+        than authenticating again.
+        """
+        from service.cache import get_cached_client
+        return get_cached_client(
+            self.core_provider.uuid, service, all_creds, build_client
+        )
 
     def get_legacy_glance_client(self, all_creds):
         all_creds['admin_url'] = all_creds['admin_url'] + '/v2.0'
@@ -1506,3 +1676,28 @@ class AccountDriver(BaseAccountDriver):
         os_args.pop("ex_tenant_name", None)
         os_args.pop("tenant_name", None)
         return os_args
+
+
+def _has_status(instance, status_list, match_all=False):
+    """
+    True if the status, task or tmp_status of `instance` is in
+    `status_list` (all of the list, if `match_all`).
+    """
+    metadata = instance._node.extra.get('metadata', {})
+    statuses = (
+        instance.extra.get('status'), instance.extra.get('task'),
+        metadata.get('tmp_status', '')
+    )
+    found = [
+        bool(status_name) and status_name in statuses
+        for status_name in status_list
+    ]
+    has_status = all(found) if match_all else any(found)
+    if not has_status:
+        reason = "not all of the status names" if match_all \
+            else "none of the status_names"
+        logger.info(
+            "Found an instance:%s but skipped because %s could be found in the list: (%s - %s - %s)"
+            % ((instance.id, reason) + statuses)
+        )
+    return has_status
@@ -1,3 +1,4 @@
+import bisect
 import datetime
 
 import pytz
@@ -5,9 +6,11 @@ from dateutil.parser import parse
 from django.db.models.query import Q
 from threepio import logger
 
-from core.models import EventTable
-from core.models.allocation_source import AllocationSource
+from core.models.allocation_source import (
+    AllocationSource, InstanceAllocationTimeline
+)
 from core.models.instance import Instance
+from core.models.instance_history import InstanceStatusHistory
 
 
 def create_report(
@@ -47,8 +50,16 @@ def generate_data(report_start_date, report_end_date, username=None):
     filtered_items = filter_events_and_instances(
         report_start_date, report_end_date, username=username
     )
+    # one query for every allocation change up to the end of the report.
+    # Those inside the window split histories, those before it (and before
+    # each history) decide the allocation source an instance starts on.
+    allocation_events = list(filtered_items['allocation_events'])
+    window_events = [
+        event
+        for event in allocation_events if event.timestamp >= report_start_date
+    ]
     # create instance to event mappings
-    event_instance_dict = group_events_by_instances(filtered_items['events'])
+    event_instance_dict = group_events_by_instances(window_events)
     # get all instance status histories for the event
     filtered_instance_histories = get_all_histories_for_instance(
         filtered_items['instances'], report_start_date, report_end_date
@@ -60,7 +71,7 @@ def generate_data(report_start_date, report_end_date, username=None):
     # create rows of data
     data = create_rows(
         filtered_instance_histories, events_histories_dict, report_start_date,
-        report_end_date
+        report_end_date, group_events_by_instances(allocation_events)
     )
     return data
 
@@ -68,9 +79,8 @@ def generate_data(report_start_date, report_end_date, username=None):
 def filter_events_and_instances(
     report_start_date, report_end_date, username=None
 ):
-    events = EventTable.objects.filter(
-        Q(timestamp__gte=report_start_date) & Q(timestamp__lte=report_end_date)
-        & Q(name__exact="instance_allocation_source_changed")
+    allocation_events = InstanceAllocationTimeline.objects.filter(
+        timestamp__lte=report_end_date
     ).order_by('timestamp')
     instances = Instance.objects.filter(
         Q(
@@ -90,22 +100,22 @@ def filter_events_and_instances(
             user_id_int = AtmosphereUser.objects.get(username=username)
         except:
             raise Exception("User '%s' does not exist" % (username))
-        events = events.filter(
-            Q(payload__username__exact=username) | Q(entity_id=username)
-        ).order_by('timestamp')
+        allocation_events = allocation_events.filter(
+            InstanceAllocationTimeline.of_user(username)
+        )
         instances = instances.filter(Q(created_by__exact=user_id_int))
     instance_ids = instances.values_list("id", flat=True)
     logger.info(
         "Checking instance IDs %s for User %s" % (instance_ids, username)
     )
-    return {'events': events, 'instances': instances}
+    return {'allocation_events': allocation_events, 'instances': instances}
 
 
 def group_events_by_instances(events):
     out_dic = {}
 
     for event in events:
-        out_dic.setdefault(event.payload['instance_id'], []).append(event)
+        out_dic.setdefault(event.instance_alias, []).append(event)
 
     return out_dic
 
@@ -113,14 +123,23 @@ def group_events_by_instances(events):
 def get_all_histories_for_instance(
     instances, report_start_date, report_end_date
 ):
+    """
+    Fetch the status histories of every instance in one query, keyed by
+    instance provider alias and ordered by start date.
+    """
     histories = {}
     for instance in instances:
-        histories[
-            instance.provider_alias
-        ] = instance.instancestatushistory_set.filter(
-            ~Q(start_date__gte=report_end_date) &
-            ~Q(Q(end_date__isnull=False) & Q(end_date__lte=report_start_date))
-        ).order_by('start_date')
+        histories[instance.provider_alias] = []
+    instance_histories = InstanceStatusHistory.objects.filter(
+        ~Q(start_date__gte=report_end_date) &
+        ~Q(Q(end_date__isnull=False) & Q(end_date__lte=report_start_date)),
+        instance__in=instances
+    ).select_related(
+        'instance__created_by', 'instance__source__providermachine__'
+        'application_version__application', 'status', 'size'
+    ).order_by('start_date')
+    for history in instance_histories:
+        histories[history.instance.provider_alias].append(history)
 
     return histories
 
@@ -129,48 +148,77 @@ def map_events_to_histories(filtered_instance_histories, event_instance_dict):
     out_dic = {}
     for instance, events in event_instance_dict.iteritems():
         hist_list = filtered_instance_histories.get(instance, [])
+        start_dates = [hist.start_date for hist in hist_list]
         for info in events:
             ts = info.timestamp
-            inst_history = [
-                i.id for i in hist_list if i.start_date <= ts and
-                ((not i.end_date) or (i.end_date and i.end_date >= ts))
-            ]
-            if inst_history:
-                out_dic.setdefault(inst_history[-1], []).append(info)
+            # Walk back from the last history started by `ts` to the
+            # latest one still running at `ts`
+            index = bisect.bisect_right(start_dates, ts)
+            while index > 0:
+                index -= 1
+                hist = hist_list[index]
+                if not hist.end_date or hist.end_date >= ts:
+                    out_dic.setdefault(hist.id, []).append(info)
+                    break
     return out_dic
 
 
 def get_allocation_source_name_from_event(
-    username, report_start_date, instance_id, instance_history_start_date
+    username, report_start_date, instance_id, instance_history_start_date,
+    allocation_events, allocation_source_names
 ):
-    events = EventTable.objects.filter(
-        Q(
-            Q(timestamp__lt=report_start_date) |
-            Q(timestamp__gte=report_start_date
-             ) & Q(timestamp__lt=instance_history_start_date)
-        ) & Q(name__exact="instance_allocation_source_changed") &
-        Q(Q(payload__username__exact=username) |
-          Q(entity_id=username)) & Q(payload__instance_id__exact=instance_id)
-    ).order_by('timestamp')
-    if not events:
-        return False
+    """
+    Return the allocation source `instance_id` was on before
+    max(`report_start_date`, `instance_history_start_date`), or False.
+
+    `allocation_events` are the `InstanceAllocationTimeline` entries
+    grouped by instance, and `allocation_source_names` the result of
+    `get_allocation_source_names`, so no queries are made here.
+    """
+    events = allocation_events.get(instance_id, [])
+    before_date = max(report_start_date, instance_history_start_date)
+    index = bisect.bisect_left(
+        [event.timestamp for event in events], before_date
+    )
+    for event in reversed(events[:index]):
+        if event.belongs_to(username):
+            break
     else:
-        try:
-            allocation_source_object = AllocationSource.objects.get(
-                name=events.last().payload['allocation_source_name']
-            )
-        except KeyError:
-            allocation_source_object = AllocationSource.objects.get(
-                uuid=events.last().payload['allocation_source_id']
+        return False
+    by_name, by_uuid = allocation_source_names
+    name = event.allocation_source_name
+    if name:
+        if name not in by_name:
+            raise AllocationSource.DoesNotExist(
+                "AllocationSource %s does not exist" % name
             )
-        return allocation_source_object.name
+        return name
+    source_uuid = event.allocation_source_uuid
+    if source_uuid not in by_uuid:
+        raise AllocationSource.DoesNotExist(
+            "AllocationSource %s does not exist" % source_uuid
+        )
+    return by_uuid[source_uuid]
+
+
+def get_allocation_source_names():
+    """
+    Return the set of allocation source names and a uuid -> name mapping.
+    """
+    by_uuid = {}
+    for source_uuid, name in AllocationSource.objects.values_list(
+        'uuid', 'name'
+    ):
+        by_uuid[str(source_uuid)] = name
+    return (set(by_uuid.values()), by_uuid)
 
 
 def create_rows(
     filtered_instance_histories, events_histories_dict, report_start_date,
-    report_end_date
+    report_end_date, allocation_events
 ):
     data = []
+    allocation_source_names = get_allocation_source_names()
     current_user = ''
     allocation_source_name = ''
     current_instance_id = ''
@@ -190,7 +238,8 @@ def create_rows(
             if current_instance_id != hist.instance.id:
                 current_as_name = get_allocation_source_name_from_event(
                     current_user, report_start_date,
-                    hist.instance.provider_alias, hist.start_date
+                    hist.instance.provider_alias, hist.start_date,
+                    allocation_events, allocation_source_names
                 )
                 allocation_source_name = current_as_name if current_as_name else 'N/A'
                 current_instance_id = hist.instance.id
@@ -229,12 +278,8 @@ def create_rows(
                     filled_row_temp['instance_status_end_date'] = end_date
                     filled_row_temp['allocation_source'
                                    ] = allocation_source_name
-                    try:
-                        new_allocation_source = event.payload[
-                            'allocation_source_name']
-                    except:
-                        new_allocation_source = 'N/A'
-                    allocation_source_name = new_allocation_source
+                    allocation_source_name = \
+                        event.allocation_source_name or 'N/A'
                     filled_row_temp[
                         'applicable_duration'] = calculate_allocation(
                             hist, start_date, end_date, report_start_date,
@@ -289,8 +334,7 @@ def fill_data(row, history_obj, allocation_source):
     row['username'] = history_obj.instance.created_by.username
     row['allocation_source'] = allocation_source
     row['instance_id'] = history_obj.instance_id
-    row['image_name'] = Instance.objects.get(id=history_obj.instance_id
-                                            ).application_name()
+    row['image_name'] = history_obj.instance.application_name()
     row['provider_alias'] = history_obj.instance.provider_alias
     row['instance_status_history_id'] = history_obj.id
     row['cpu'] = history_obj.size.cpu
@@ -1,11 +1,18 @@
+import calendar
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
 import cPickle as pickle
 import redis
+from django.conf import settings
 from threepio import logger
 
 from service.driver import get_esh_driver, get_admin_driver
 
-admin_drivers = {}
-drivers = {}
 connection = None
 
 INSTANCES_KEY_PROVIDER = "instances.{0}"
@@ -15,59 +22,408 @@ VOLUMES_KEY_IDENTITY = "volumes.{0}.{1}"
 MACHINES_KEY_PROVIDER = "machines.{0}"
 MACHINES_KEY_IDENTITY = "machines.{0}.{1}"
 
+# Bump whenever the layout of cached entries changes
+RESOURCE_CACHE_VERSION = 2
+META_FIELD = "__meta__"
+REFRESH_LOCK_TIMEOUT = 60
+DEFAULT_RESOURCE_TTLS = {
+    'instances': 30,
+    'volumes': 30,
+}
+
+DRIVER_KEY_PROVIDER = "provider.{0}"
+DRIVER_KEY_IDENTITY = "identity.{0}"
+
+#: When a launch setup step (security group, keypair) was last done
+LAUNCH_SETUP_KEY = "launch-setup.{0}.{1}"
+
+#: OpenStack clients of AccountDriver: provider, project, user, service
+CLIENT_KEY = "client.{0}.{1}.{2}.{3}"
+#: Hash of '<service>.hit'/'<service>.miss' -> client lookups
+CLIENT_STATS_KEY = "openstack-client-cache"
+
+#: Client lookups of this process not yet added to CLIENT_STATS_KEY
+_client_lookups = Counter()
+_client_lookups_lock = threading.Lock()
+_client_lookups_flushed_at = time.time()
+
+
+class DriverCache(object):
+    """
+    A bounded, thread-safe LRU cache of rtwo drivers.
+
+    Each entry remembers a fingerprint of the credentials used to build the
+    driver and the time at which its token (or the configured TTL) expires.
+    A lookup only returns a driver if the fingerprint still matches and the
+    entry has not expired, so credential changes made in *any* process are
+    picked up on the next lookup.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, fingerprint):
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            (driver, entry_fingerprint, expires_at) = entry
+            if entry_fingerprint != fingerprint or expires_at <= time.time():
+                del self._entries[key]
+                return None
+            # Mark as most-recently used
+            del self._entries[key]
+            self._entries[key] = entry
+            return driver
+
+    def set(self, key, fingerprint, driver, expires_at):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (driver, fingerprint, expires_at)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
 
-def _get_cached_admin_driver(provider, force=True):
-    if not admin_drivers.get(provider) or force:
-        admin_drivers[provider] = get_admin_driver(provider)
-    return admin_drivers[provider]
+    def __contains__(self, key):
+        return key in self._entries
 
 
-def _get_cached_driver(provider=None, identity=None, force=True):
+driver_cache = DriverCache(
+    max_size=getattr(settings, 'DRIVER_CACHE_MAX_SIZE', 256)
+)
+
+client_cache = DriverCache(
+    max_size=getattr(settings, 'OPENSTACK_CLIENT_CACHE_MAX_SIZE', 256)
+)
+
+
+def _credential_fingerprint(identity):
+    """
+    Hash every credential (provider + identity) that goes into building a
+    driver for `identity`.
+    """
+    if not identity:
+        return None
+    return _fingerprint(identity.get_all_credentials())
+
+
+def _fingerprint(all_creds):
+    digest = hashlib.sha1()
+    for (key, value) in sorted(all_creds.items()):
+        digest.update(("%s=%s;" % (key, value)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _admin_identity(provider):
+    account_provider = provider.accountprovider_set.all().first()
+    if not account_provider:
+        return None
+    return account_provider.identity
+
+
+def _token_expires_at(driver):
+    """
+    Return the epoch time at which `driver` should no longer be re-used.
+
+    If the underlying libcloud connection exposes the expiry of its keystone
+    token, expire a little before it. Otherwise fall back to
+    `DRIVER_CACHE_TTL`.
+    """
+    now = time.time()
+    expires_at = now + getattr(settings, 'DRIVER_CACHE_TTL', 30 * 60)
+    try:
+        lc_connection = driver._connection.connection
+        token_expires = getattr(lc_connection, 'auth_token_expires', None)
+    except AttributeError:
+        token_expires = None
+    if token_expires:
+        margin = getattr(settings, 'DRIVER_CACHE_TOKEN_MARGIN', 5 * 60)
+        token_expires_at = calendar.timegm(token_expires.utctimetuple())
+        expires_at = min(expires_at, token_expires_at - margin)
+    return expires_at
+
+
+def _get_cached_admin_driver(provider, force=False):
+    key = DRIVER_KEY_PROVIDER.format(provider.id)
+    fingerprint = _credential_fingerprint(_admin_identity(provider))
+    driver = None if force else driver_cache.get(key, fingerprint)
+    if not driver:
+        driver = get_admin_driver(provider)
+        if driver:
+            driver_cache.set(
+                key, fingerprint, driver, _token_expires_at(driver)
+            )
+    return driver
+
+
+def _get_cached_driver(provider=None, identity=None, force=False):
     if provider:
         return _get_cached_admin_driver(provider, force)
-    if not drivers.get(identity) or force:
-        drivers[identity] = get_esh_driver(identity)
-    return drivers[identity]
+    key = DRIVER_KEY_IDENTITY.format(identity.id)
+    fingerprint = _credential_fingerprint(identity)
+    driver = None if force else driver_cache.get(key, fingerprint)
+    if not driver:
+        driver = get_esh_driver(identity)
+        if driver:
+            driver_cache.set(
+                key, fingerprint, driver, _token_expires_at(driver)
+            )
+    return driver
+
+
+def invalidate_cached_driver(provider=None, identity=None):
+    if provider:
+        driver_cache.delete(DRIVER_KEY_PROVIDER.format(provider.id))
+    if identity:
+        driver_cache.delete(DRIVER_KEY_IDENTITY.format(identity.id))
+
+
+def get_cached_client(provider_key, service, all_creds, build_client):
+    """
+    Return the `service` client of the credentials `all_creds` (username,
+    password, tenant_name...), built by `build_client(all_creds)` unless one
+    was built by this process since OPENSTACK_CLIENT_CACHE_TTL seconds.
+
+    Clients are dropped a little before the token of their keystone session
+    expires, so that callers never re-authenticate halfway through a task.
+    """
+    key = CLIENT_KEY.format(
+        provider_key, all_creds.get('tenant_name'), all_creds.get('username'),
+        service
+    )
+    fingerprint = _fingerprint(all_creds)
+    client = client_cache.get(key, fingerprint)
+    _record_client_lookup(service, hit=client is not None)
+    if client is None:
+        # Client builders are known to modify the credentials
+        client = build_client(all_creds.copy())
+        if client is not None:
+            client_cache.set(
+                key, fingerprint, client, _client_expires_at(client)
+            )
+    return client
+
+
+def _client_expires_at(client):
+    """
+    Return the epoch time at which `client` should no longer be re-used:
+    OPENSTACK_CLIENT_CACHE_TTL seconds from now, or a little before the
+    token of its keystone session expires.
+    """
+    now = time.time()
+    expires_at = now + getattr(settings, 'OPENSTACK_CLIENT_CACHE_TTL', 30 * 60)
+    clients = client.values() if isinstance(client, dict) else [client]
+    for each_client in clients:
+        session = getattr(each_client, 'session', None)
+        auth_ref = getattr(getattr(session, 'auth', None), 'auth_ref', None)
+        token_expires = getattr(auth_ref, 'expires', None)
+        if token_expires:
+            margin = getattr(settings, 'DRIVER_CACHE_TOKEN_MARGIN', 5 * 60)
+            token_expires_at = calendar.timegm(token_expires.utctimetuple())
+            expires_at = min(expires_at, token_expires_at - margin)
+    return expires_at
+
+
+def _record_client_lookup(service, hit):
+    """
+    Count a client lookup in memory, adding the counts of this process to
+    redis at most every OPENSTACK_CLIENT_STATS_INTERVAL seconds.
+    """
+    field = "%s.%s" % (service, 'hit' if hit else 'miss')
+    with _client_lookups_lock:
+        _client_lookups[field] += 1
+        interval = getattr(settings, 'OPENSTACK_CLIENT_STATS_INTERVAL', 60)
+        if time.time() - _client_lookups_flushed_at < interval:
+            return
+    _flush_client_lookups()
+
+
+def _flush_client_lookups():
+    global _client_lookups_flushed_at
+    with _client_lookups_lock:
+        counts = dict(_client_lookups)
+        _client_lookups.clear()
+        _client_lookups_flushed_at = time.time()
+    if not counts:
+        return
+    try:
+        pipe = redis_connection().pipeline()
+        for (field, count) in counts.items():
+            pipe.hincrby(CLIENT_STATS_KEY, field, count)
+        pipe.execute()
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
+
+
+def get_client_stats():
+    """
+    Lookups of OpenStack clients by every process, per service:
+    {service: {'hit': count, 'miss': count}}
+
+    Other processes add their lookups every OPENSTACK_CLIENT_STATS_INTERVAL
+    seconds, so their most recent lookups may be missing.
+    """
+    _flush_client_lookups()
+    try:
+        counts = redis_connection().hgetall(CLIENT_STATS_KEY)
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
+        return {}
+    stats = {}
+    for (field, count) in counts.items():
+        (service, result) = field.rsplit('.', 1)
+        stats.setdefault(service, {'hit': 0, 'miss': 0})[result] = int(count)
+    return stats
 
 
 def redis_connection():
     global connection
     if not connection:
-        connection = redis.StrictRedis()
+        connection = redis.StrictRedis.from_url(
+            getattr(
+                settings, 'RESOURCE_CACHE_REDIS_URL', 'redis://localhost:6379/0'
+            ),
+            max_connections=getattr(
+                settings, 'RESOURCE_CACHE_MAX_CONNECTIONS', 50
+            ),
+            socket_timeout=getattr(settings, 'RESOURCE_CACHE_TIMEOUT', 2),
+            socket_connect_timeout=getattr(
+                settings, 'RESOURCE_CACHE_TIMEOUT', 2
+            )
+        )
     return connection
 
 
+def _redis_unavailable(exc):
+    logger.error(
+        "EXTERNAL SERVICE redis-server IS NOT RESPONDING (%s)! "
+        "Bypassing the resource cache." % exc
+    )
+
+
+def _resource_ttl(resource):
+    """
+    Return (fresh, stale) lifetimes in seconds for `resource`.
+
+    Entries younger than `fresh` are served as-is. Entries between `fresh`
+    and `fresh + stale` are still served to every caller, except the single
+    caller that wins the refresh lock and re-fetches from the cloud.
+    """
+    ttls = getattr(settings, 'RESOURCE_CACHE_TTLS', {})
+    fresh = ttls.get(resource, DEFAULT_RESOURCE_TTLS.get(resource, 30))
+    stale = getattr(settings, 'RESOURCE_CACHE_STALE_TTL', 60)
+    return (fresh, stale)
+
+
+def _versioned(key):
+    return "atmo.cache.v{0}.{1}".format(RESOURCE_CACHE_VERSION, key)
+
+
+def _dumps(obj):
+    return zlib.compress(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+
+def _loads(blob):
+    return pickle.loads(zlib.decompress(blob))
+
+
+def _object_id(obj, index):
+    return str(getattr(obj, 'id', None) or index)
+
+
 def _invalidate(key):
-    r = redis_connection()
-    if key:
-        r.delete(key)
+    if not key:
+        return
+    try:
+        redis_connection().delete(_versioned(key))
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
 
 
-def _get_cached(key, data_method, scrub_method, force=False):
+def _read_entry(r, key):
+    """
+    Return (fresh_until, objects) for the cached hash at `key` or None
+    """
+    entry = r.hgetall(key)
+    if not entry or META_FIELD not in entry:
+        return None
     try:
-        r = redis_connection()
-        if force:
-            _invalidate(key)
-        data = r.get(key)
-    except redis.exceptions.ConnectionError:
-        logger.error(
-            "EXTERNAL SERVICE redis-server IS NOT RUNNING! "
-            "Somebody should turn it on!"
-        )
-        data = None
-    if not data:
-        data = data_method()
-        scrub_method(data)
+        meta = json.loads(entry[META_FIELD])
+        objects = [_loads(entry[object_id]) for object_id in meta['ids']]
+    except Exception:
+        logger.warn("Discarding unreadable cache entry %s" % key)
+        return None
+    return (meta['fresh_until'], objects)
+
+
+def _write_entry(r, key, resource, objects):
+    (fresh, stale) = _resource_ttl(resource)
+    mapping = {}
+    ids = []
+    for (index, obj) in enumerate(objects):
+        object_id = _object_id(obj, index)
+        ids.append(object_id)
+        mapping[object_id] = _dumps(obj)
+    mapping[META_FIELD] = json.dumps(
+        {
+            'ids': ids,
+            'fresh_until': time.time() + fresh
+        }
+    )
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hmset(key, mapping)
+    pipe.expire(key, fresh + stale)
+    pipe.execute()
+
+
+def _get_cached(key, resource, data_method, scrub_method, force=False):
+    """
+    Return the list produced by `data_method`, cached in redis as one hash
+    per `key` with one compressed field per object.
+    """
+    key = _versioned(key)
+    lock_key = key + ".refresh"
+    r = redis_connection()
+    try:
+        cached = None if force else _read_entry(r, key)
+        if cached:
+            (fresh_until, objects) = cached
+            if fresh_until > time.time():
+                return objects
+            # Stale: Only one caller refreshes, everyone else serves stale.
+            if not r.set(lock_key, 1, nx=True, ex=REFRESH_LOCK_TIMEOUT):
+                return objects
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
+        r = None
+    data = data_method()
+    scrub_method(data)
+    if not r:
+        return data
+    try:
+        _write_entry(r, key, resource, data)
+        r.delete(lock_key)
         logger.debug(
             "Updated redis({0}) using {1} and {2}".format(
                 key, data_method, scrub_method
             )
         )
-        r.set(key, pickle.dumps(data))
-        r.expire(key, 30)
-        return data
-    logger.debug("Actual type {0}".format(type(data)))
-    return pickle.loads(data)
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
+    return data
 
 
 def _scrub(objects):
@@ -86,7 +442,7 @@ def _validate_parameters(provider, identity):
         raise Exception("Use either provider or identity but not both.")
 
 
-def get_cached_driver(provider=None, identity=None, force=True):
+def get_cached_driver(provider=None, identity=None, force=False):
     _validate_parameters(provider, identity)
     return _get_cached_driver(provider=provider, identity=identity, force=force)
 
@@ -108,20 +464,88 @@ def get_cached_instances(provider=None, identity=None, force=False):
     else:
         instances_method = cached_driver.list_instances
 
-    if provider:
-        key = INSTANCES_KEY_PROVIDER.format(provider.id)
+    key = _resource_key(
+        INSTANCES_KEY_PROVIDER, INSTANCES_KEY_IDENTITY, provider, identity
+    )
+    return _get_cached(key, 'instances', instances_method, _scrub, force=force)
+
+
+def get_cached_volumes(provider=None, identity=None, force=False):
+    _validate_parameters(provider, identity)
+    cached_driver = _get_cached_driver(
+        provider=provider, identity=identity, force=force
+    )
+    # Admin identities can see every volume on the provider
+    if provider or identity.accountprovider_set.exists():
+        volumes_method = cached_driver.list_all_volumes
     else:
-        key = INSTANCES_KEY_IDENTITY.format(
-            identity.created_by.username, identity.id
-        )
-    return _get_cached(key, instances_method, _scrub, force=force)
+        volumes_method = cached_driver.list_volumes
+    key = _resource_key(
+        VOLUMES_KEY_PROVIDER, VOLUMES_KEY_IDENTITY, provider, identity
+    )
+    return _get_cached(key, 'volumes', volumes_method, _scrub, force=force)
 
 
-def invalidate_cached_instances(provider=None, identity=None):
+def _resource_key(provider_key, identity_key, provider=None, identity=None):
     if provider:
-        key = INSTANCES_KEY_PROVIDER.format(provider.id)
-    else:
-        key = INSTANCES_KEY_IDENTITY.format(
-            identity.created_by.username, identity.id
+        return provider_key.format(provider.id)
+    return identity_key.format(identity.created_by.username, identity.id)
+
+
+def invalidate_cached_instances(provider=None, identity=None):
+    _invalidate(
+        _resource_key(
+            INSTANCES_KEY_PROVIDER, INSTANCES_KEY_IDENTITY, provider, identity
         )
-    _invalidate(key)
+    )
+
+
+def invalidate_cached_volumes(provider=None, identity=None):
+    _invalidate(
+        _resource_key(
+            VOLUMES_KEY_PROVIDER, VOLUMES_KEY_IDENTITY, provider, identity
+        )
+    )
+
+
+def get_launch_setup_time(identity, step):
+    """
+    When the launch setup `step` of `identity` was last done, as a
+    timestamp, or None if not in the last LAUNCH_SETUP_TTL seconds (or
+    invalidated since).
+    """
+    try:
+        done_at = redis_connection().get(
+            LAUNCH_SETUP_KEY.format(identity.uuid, step)
+        )
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
+        return None
+    return float(done_at) if done_at else None
+
+
+def set_launch_setup_time(identity, step):
+    ttl = getattr(settings, 'LAUNCH_SETUP_TTL', 24 * 60 * 60)
+    try:
+        redis_connection().set(
+            LAUNCH_SETUP_KEY.format(identity.uuid, step), time.time(), ex=ttl
+        )
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
+
+
+def invalidate_launch_setup(identity_uuids, step):
+    """
+    Redo the launch setup `step` on the next launch of every identity of
+    `identity_uuids`.
+    """
+    keys = [
+        LAUNCH_SETUP_KEY.format(identity_uuid, step)
+        for identity_uuid in identity_uuids
+    ]
+    if not keys:
+        return
+    try:
+        redis_connection().delete(*keys)
+    except redis.exceptions.RedisError as exc:
+        _redis_unavailable(exc)
@@ -4,6 +4,7 @@ Deploy methods for Atmosphere
 import os
 import re
 import json
+import tempfile
 from threepio import logger, deploy_logger
 from django.conf import settings
 from atmosphere.settings import secrets
@@ -51,10 +52,31 @@ def ansible_deployment(
         else:
             limit_hosts = instance_ip
     host_file = settings.ANSIBLE_HOST_FILE
+    extra_vars.update(instance_vars(username, instance_id))
+    playbook_results = execute_playbooks(
+        playbooks_dir,
+        host_file,
+        extra_vars,
+        limit_hosts,
+        logger=logger,
+        limit_playbooks=limit_playbooks
+    )
+    if raise_exception:
+        raise_playbook_errors(
+            playbook_results, instance_id, instance_ip, hostname
+        )
+    return playbook_results
+
+
+def instance_vars(username, instance_id):
+    """
+    Variables of the instance given to every playbook
+    """
+    variables = {}
     identity = Identity.find_instance(instance_id)
     if identity:
         time_zone = identity.provider.timezone
-        extra_vars.update({
+        variables.update({
             "TIMEZONE": time_zone,
         })
     shared_users = list(
@@ -66,28 +88,59 @@ def ansible_deployment(
         shared_users = [username]
     if username not in shared_users:
         shared_users.append(username)
-    extra_vars.update({
+    variables.update({
         "SHARED_USERS": shared_users,
     })
-    extra_vars.update({
+    variables.update({
         "ATMOUSERNAME": username,
     })
-    extra_vars.update({
+    variables.update({
         "INSTANCE_UUID": instance_id,
     })
-    playbook_results = execute_playbooks(
+    return variables
+
+
+def ansible_deployment_many(
+    instances,
+    playbooks_dir,
+    limit_playbooks=[],
+    extra_vars={},
+    forks=None,
+    debug=False
+):
+    """
+    Use service.ansible to deploy to many instances at once.
+
+    `instances` is a list of (instance_ip, username, instance_id). Each
+    playbook runs once, against every instance the previous playbooks
+    succeeded on, with the variables of each instance (see `instance_vars`)
+    set on its host.
+
+    Returns {instance_id: playbook_results}, like `ansible_deployment`
+    with raise_exception=False for each instance.
+    """
+    if not check_ansible():
+        return dict((instance_id, []) for (_, _, instance_id) in instances)
+    if limit_playbooks == []:
+        limit_playbooks = sorted(os.listdir(playbooks_dir))
+    configure_ansible(debug=debug)
+    host_vars = {}
+    instance_ids = {}
+    for (instance_ip, username, instance_id) in instances:
+        hostname = build_host_name(instance_id, instance_ip) or instance_ip
+        host_vars[hostname] = instance_vars(username, instance_id)
+        instance_ids[hostname] = instance_id
+    host_results = execute_playbooks_many(
         playbooks_dir,
-        host_file,
         extra_vars,
-        limit_hosts,
-        logger=logger,
+        host_vars,
+        forks=forks,
         limit_playbooks=limit_playbooks
     )
-    if raise_exception:
-        raise_playbook_errors(
-            playbook_results, instance_id, instance_ip, hostname
-        )
-    return playbook_results
+    return dict(
+        (instance_ids[hostname], playbook_results)
+        for (hostname, playbook_results) in host_results.items()
+    )
 
 
 def ready_to_deploy(instance_ip, username, instance_id):
@@ -218,6 +271,27 @@ def instance_deploy(instance_ip, username, instance_id, limit_playbooks=[]):
     )
 
 
+def instance_deploy_many(instances, limit_playbooks=[], forks=None):
+    """
+    Use service.ansible to deploy to many instances at once.
+    (see `ansible_deployment_many`)
+    """
+    extra_vars = {
+        "SSH_IDENTITY_FILE": settings.ATMOSPHERE_PRIVATE_KEYFILE,
+        "VNCLICENSE": secrets.ATMOSPHERE_VNC_LICENSE,
+    }
+    playbooks_dir = settings.ANSIBLE_PLAYBOOKS_DIR
+    playbooks_dir = os.path.join(playbooks_dir, 'instance_deploy')
+
+    return ansible_deployment_many(
+        instances,
+        playbooks_dir,
+        limit_playbooks=limit_playbooks,
+        extra_vars=extra_vars,
+        forks=forks
+    )
+
+
 def user_deploy(instance_ip, username, instance_id, first_deploy=True):
     """
     Use service.ansible to deploy to an instance.
@@ -356,6 +430,99 @@ def execute_playbooks(
     return results
 
 
+def execute_playbooks_many(
+    playbook_dir,
+    extra_vars,
+    host_vars,
+    forks=None,
+    logger=None,
+    limit_playbooks=[]
+):
+    """
+    Run each playbook once against the hosts of `host_vars` ({host:
+    variables of the host}) that no previous playbook failed on, with up
+    to `forks` (ANSIBLE_DEPLOY_FORKS) hosts at a time.
+
+    Returns {host: [return code of each playbook run on the host]}
+    """
+    if not logger:
+        logger = deploy_logger
+    if not forks:
+        forks = getattr(settings, 'ANSIBLE_DEPLOY_FORKS', 20)
+
+    inventory_dir = "%s/ansible" % settings.ANSIBLE_ROOT
+
+    results = dict((host, []) for host in host_vars)
+    # The variables of each host are added to the inventory
+    with tempfile.NamedTemporaryFile(suffix='.yml') as host_vars_file:
+        json.dump({'all': {'hosts': host_vars}}, host_vars_file)
+        host_vars_file.flush()
+        for pb in limit_playbooks:
+            hosts = sorted(
+                host for (host, host_results) in results.items()
+                if not any(host_results)
+            )
+            if not hosts:
+                break
+            logger.info(
+                "Executing playbook %s/%s on %s host(s)" %
+                (playbook_dir, pb, len(hosts))
+            )
+            args = [
+                "--inventory=%s" % inventory_dir,
+                "--inventory=%s" % host_vars_file.name,
+                "--limit=%s" % ",".join(hosts),
+                "--forks=%s" % forks,
+                "--extra-vars=%s" % json.dumps(extra_vars),
+                "%s/%s" % (playbook_dir, pb)
+            ]
+            (rc, stats) = _run_playbook(args)
+            for host in hosts:
+                results[host].append(_host_result(rc, stats, host))
+    return results
+
+
+def _run_playbook(args):
+    """
+    Run a playbook like `PlaybookCLI(args).run()`, also returning the
+    statistics of each host.
+    """
+    from ansible.cli import CLI
+    from ansible.cli.playbook import PlaybookCLI
+    from ansible.executor.playbook_executor import PlaybookExecutor
+    pb_runner = PlaybookCLI(args)
+    pb_runner.parse()
+    loader, inventory, variable_manager = pb_runner._play_prereqs(
+        pb_runner.options
+    )
+    CLI.get_host_list(inventory, pb_runner.options.subset)
+    executor = PlaybookExecutor(
+        playbooks=pb_runner.args,
+        inventory=inventory,
+        variable_manager=variable_manager,
+        loader=loader,
+        options=pb_runner.options,
+        passwords={}
+    )
+    rc = executor.run()
+    return rc, executor._tqm._stats
+
+
+def _host_result(rc, stats, host):
+    """
+    The ansible-playbook return code of `host` (see `raise_playbook_errors`)
+    """
+    if host not in stats.processed:
+        # Nothing ran on the host, the whole run failed (or succeeded)
+        return rc
+    summary = stats.summarize(host)
+    if summary['unreachable']:
+        return 4
+    if summary['failures']:
+        return 2
+    return 0
+
+
 def check_ansible():
     """
     If the playbooks and roles directory exist then ANSIBLE_* settings
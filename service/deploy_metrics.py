@@ -0,0 +1,162 @@
+"""
+Timing of the stages of instance launches.
+
+The tasks of the launch chain record when each stage of an instance starts
+and ends (`start_stage`/`end_stage`, stored as `InstanceDeployStage`). The
+durations are exposed as Prometheus histograms (`render_stage_histograms`)
+and summarized as percentiles of time-to-active (`time_to_active`).
+"""
+from datetime import timedelta
+
+from django.db import DatabaseError, connections
+from django.db.models import (
+    Case, Count, DateTimeField, DurationField, ExpressionWrapper, F, OuterRef,
+    Subquery, Sum, When
+)
+
+from threepio import logger
+
+from core.models import Instance, InstanceDeployStage, InstanceStatusHistory
+
+APPLICATION_PATH = 'source__providermachine__application_version__application'
+
+#: Upper bounds (in seconds) of the histogram buckets
+STAGE_BUCKETS = [5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600]
+
+STAGE_METRIC = "atmosphere_deploy_stage_duration_seconds"
+
+TIME_TO_ACTIVE_SQL = """
+SELECT launch.provider_name, launch.image_name, COUNT(*),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY launch.time_to_active),
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY launch.time_to_active)
+FROM ({launches}) AS launch
+WHERE launch.time_to_active IS NOT NULL
+GROUP BY launch.provider_name, launch.image_name
+ORDER BY launch.provider_name, launch.image_name
+"""
+
+
+def start_stage(instance_alias, stage):
+    """
+    Record the start of `stage` (see `DEPLOY_STAGES`) of the instance.
+    """
+    try:
+        InstanceDeployStage.start(instance_alias, stage)
+    except DatabaseError:
+        logger.exception(
+            "Could not record the start of %s for %s" % (stage, instance_alias)
+        )
+
+
+def end_stage(instance_alias, stage=None, succeeded=True):
+    """
+    Record the end of `stage` (or of every started stage) of the instance.
+    """
+    try:
+        InstanceDeployStage.end(instance_alias, stage, succeeded=succeeded)
+    except DatabaseError:
+        logger.exception(
+            "Could not record the end of %s for %s" % (stage, instance_alias)
+        )
+
+
+def stage_histograms():
+    """
+    Yield the histogram of the durations of every stage, per provider and
+    result: (stage, provider, succeeded, [count per bucket], sum, count)
+    """
+    duration = ExpressionWrapper(
+        F('end_date') - F('start_date'), output_field=DurationField()
+    )
+    aggregates = {'duration_count': Count('id'), 'duration_sum': Sum(duration)}
+    for bucket in STAGE_BUCKETS:
+        # Buckets are cumulative, like Prometheus's
+        aggregates['le_%s' % bucket] = Count(
+            Case(
+                When(
+                    end_date__lte=F('start_date') + timedelta(seconds=bucket),
+                    then=F('id')
+                )
+            )
+        )
+    provider = 'instance__created_by_identity__provider__location'
+    stages = InstanceDeployStage.objects.filter(
+        end_date__isnull=False
+    ).values('stage', provider, 'succeeded').annotate(**aggregates)
+    for row in stages.order_by('stage', provider, 'succeeded'):
+        buckets = [row['le_%s' % bucket] for bucket in STAGE_BUCKETS]
+        total = row['duration_sum'].total_seconds()
+        yield (
+            row['stage'], row[provider], row['succeeded'], buckets, total,
+            row['duration_count']
+        )
+
+
+def _label(value):
+    value = unicode(value)
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render_stage_histograms():
+    """
+    The histograms of `stage_histograms`, in the Prometheus text format
+    """
+    lines = [
+        "# HELP %s Time spent by instances in each stage of their launch" %
+        STAGE_METRIC,
+        "# TYPE %s histogram" % STAGE_METRIC,
+    ]
+    for histogram in stage_histograms():
+        (stage, provider, succeeded, buckets, total, count) = histogram
+        labels = 'stage="%s",provider="%s",result="%s"' % (
+            _label(stage), _label(provider),
+            'succeeded' if succeeded else 'failed'
+        )
+        for (bucket, bucket_count) in zip(STAGE_BUCKETS, buckets):
+            lines.append(
+                '%s_bucket{%s,le="%s"} %s' %
+                (STAGE_METRIC, labels, float(bucket), bucket_count)
+            )
+        lines.append(
+            '%s_bucket{%s,le="+Inf"} %s' % (STAGE_METRIC, labels, count)
+        )
+        lines.append('%s_sum{%s} %s' % (STAGE_METRIC, labels, total))
+        lines.append('%s_count{%s} %s' % (STAGE_METRIC, labels, count))
+    return "\n".join(lines) + "\n"
+
+
+def time_to_active(queryset):
+    """
+    Summarize the time from launch to first 'active' of the instances of
+    `queryset` per provider and image: a list of
+    {provider, image, count, p50, p95}, the percentiles in seconds.
+
+    Instances that never became active are left out.
+    """
+    first_active = InstanceStatusHistory.objects.filter(
+        instance=OuterRef('pk'), status__name='active'
+    ).order_by('start_date').values('start_date')[:1]
+    launches = Instance.objects.filter(id__in=queryset.values('id')).annotate(
+        provider_name=F('created_by_identity__provider__location'),
+        image_name=F(APPLICATION_PATH + '__name'),
+        time_to_active=ExpressionWrapper(
+            Subquery(first_active, output_field=DateTimeField()) -
+            F('start_date'),
+            output_field=DurationField()
+        )
+    ).order_by().values('provider_name', 'image_name', 'time_to_active')
+    launches_sql, launches_params = launches.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            TIME_TO_ACTIVE_SQL.format(launches=launches_sql), launches_params
+        )
+        rows = cursor.fetchall()
+    return [
+        {
+            'provider': provider,
+            'image': image,
+            'count': count,
+            'p50': p50.total_seconds(),
+            'p95': p95.total_seconds(),
+        } for (provider, image, count, p50, p95) in rows
+    ]
@@ -0,0 +1,184 @@
+"""
+Deploy to launching instances in batches.
+
+Rather than running the playbooks of every instance on its own,
+`queue_deploy` holds the instance for INSTANCE_DEPLOY_BATCH_WINDOW seconds
+and `deploy_queued_instances` deploys to every instance queued meanwhile at
+once (see `service.deploy.instance_deploy_many`): when many instances are
+launched together, they are all deployed by a single run of each playbook.
+
+Instances being deployed are kept in redis until their linked tasks have
+been called, so that the instances of a run that died (worker killed or
+restarted halfway through the playbooks) are queued again once they have
+been in progress for INSTANCE_DEPLOY_STALE_AFTER seconds.
+"""
+import cPickle as pickle
+import time
+
+from django.conf import settings
+
+from threepio import celery_logger
+
+from service.cache import redis_connection
+from service.deploy import instance_deploy_many, raise_playbook_errors
+from service.deploy_metrics import end_stage
+from service.readiness import fail_chain, resume_chain
+
+#: Hash of task id -> pickled queued instance
+QUEUE_KEY = "instance-deploy-queue"
+#: Hash of task id -> pickled instance being deployed
+IN_PROGRESS_KEY = "instance-deploy-in-progress"
+#: Set while a run of `deploy_queued_instances` is scheduled
+SCHEDULED_KEY = "instance-deploy-scheduled"
+
+
+def queue_deploy(
+    task_id,
+    instance_ip,
+    username,
+    instance_id,
+    callbacks=None,
+    errbacks=None,
+    attempts=0
+):
+    """
+    Queue the deployment of `instance_id`, then apply `callbacks` once it
+    is deployed, like the task `task_id` would have.
+    """
+    queued = {
+        'instance': (instance_ip, username, instance_id),
+        'callbacks': callbacks or [],
+        'errbacks': errbacks or [],
+        'attempts': attempts,
+    }
+    redis_connection().hset(
+        QUEUE_KEY, task_id, pickle.dumps(queued, pickle.HIGHEST_PROTOCOL)
+    )
+
+
+def schedule_run(countdown):
+    """
+    Whether a run of `deploy_queued_instances` should be scheduled in
+    `countdown` seconds: False when one is scheduled already.
+    """
+    # Expires in case the scheduled run is lost
+    timeout = countdown + getattr(
+        settings, 'INSTANCE_DEPLOY_SCHEDULE_TIMEOUT', 5 * 60
+    )
+    return bool(redis_connection().set(SCHEDULED_KEY, 1, nx=True, ex=timeout))
+
+
+def take_queued_instances():
+    """
+    Move the queued instances to the instances in progress and return them:
+    {task id: queued instance}. Instances taken by another run meanwhile
+    are left out.
+    """
+    redis = redis_connection()
+    queued = redis.hgetall(QUEUE_KEY)
+    if not queued:
+        return {}
+    taken_at = time.time()
+    entries = []
+    pipeline = redis.pipeline(transaction=False)
+    for (task_id, data) in queued.items():
+        entry = pickle.loads(data)
+        entry['taken_at'] = taken_at
+        pipeline.hsetnx(
+            IN_PROGRESS_KEY, task_id,
+            pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+        )
+        entries.append((task_id, entry))
+    taken = {}
+    for ((task_id, entry), claimed) in zip(entries, pipeline.execute()):
+        if claimed:
+            taken[task_id] = entry
+    if taken:
+        redis.hdel(QUEUE_KEY, *taken.keys())
+    return taken
+
+
+def requeue_stale_instances():
+    """
+    Queue again the instances in progress for INSTANCE_DEPLOY_STALE_AFTER
+    seconds, whose run has died. Returns the number of instances queued
+    again.
+    """
+    redis = redis_connection()
+    stale_after = getattr(settings, 'INSTANCE_DEPLOY_STALE_AFTER', 40 * 60)
+    now = time.time()
+    requeued = 0
+    for (task_id, data) in redis.hgetall(IN_PROGRESS_KEY).items():
+        entry = pickle.loads(data)
+        if entry['taken_at'] + stale_after > now:
+            continue
+        celery_logger.warn(
+            "Deployment of %s was interrupted, queuing it again" %
+            (entry['instance'], )
+        )
+        _requeue(redis, task_id, entry)
+        requeued += 1
+    return requeued
+
+
+def _requeue(redis, task_id, entry):
+    (instance_ip, username, instance_id) = entry['instance']
+    queue_deploy(
+        task_id,
+        instance_ip,
+        username,
+        instance_id,
+        callbacks=entry['callbacks'],
+        errbacks=entry['errbacks'],
+        attempts=entry['attempts'] + 1
+    )
+    redis.hdel(IN_PROGRESS_KEY, task_id)
+
+
+def deploy_queued_instances():
+    """
+    Deploy to the queued instances, INSTANCE_DEPLOY_BATCH_SIZE at a time.
+
+    Instances that could not be deployed are queued again, up to
+    INSTANCE_DEPLOY_MAX_RETRIES times. Returns the number of instances
+    queued again.
+    """
+    redis = redis_connection()
+    # Instances queued from now on need another run
+    redis.delete(SCHEDULED_KEY)
+    batch_size = getattr(settings, 'INSTANCE_DEPLOY_BATCH_SIZE', 100)
+    max_retries = getattr(settings, 'INSTANCE_DEPLOY_MAX_RETRIES', 10)
+    requeue_stale_instances()
+    queued = sorted(take_queued_instances().items())
+    retried = 0
+    for start in range(0, len(queued), batch_size):
+        batch = queued[start:start + batch_size]
+        try:
+            results = instance_deploy_many(
+                [entry['instance'] for (_, entry) in batch]
+            )
+        except Exception as exc:
+            celery_logger.exception(exc)
+            results = exc
+        for (task_id, entry) in batch:
+            (instance_ip, username, instance_id) = entry['instance']
+            try:
+                if isinstance(results, Exception):
+                    raise results
+                raise_playbook_errors(
+                    results.get(instance_id, []), instance_id, instance_ip, None
+                )
+            except Exception as exc:
+                if entry['attempts'] < max_retries:
+                    _requeue(redis, task_id, entry)
+                    retried += 1
+                else:
+                    end_stage(instance_id, 'deploy_instance', succeeded=False)
+                    fail_chain(task_id, entry['errbacks'], exc)
+                    redis.hdel(IN_PROGRESS_KEY, task_id)
+                continue
+            celery_logger.debug("Ansible Finished for %s." % instance_ip)
+            end_stage(instance_id, 'deploy_instance')
+            resume_chain(entry['callbacks'], None)
+            redis.hdel(IN_PROGRESS_KEY, task_id)
+    return retried
@@ -1,8 +1,12 @@
+from functools import partial
+from multiprocessing.pool import ThreadPool
 import os.path
+import sys
 import time
 import json
 import uuid
 
+from django import db
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 from django.utils.timezone import datetime
@@ -45,7 +49,10 @@ from core.exceptions import ProviderNotActive
 from django.conf import settings
 from atmosphere.settings import secrets
 
-from service.cache import get_cached_driver, invalidate_cached_instances
+from service.cache import (
+    get_cached_driver, get_launch_setup_time, invalidate_cached_instances,
+    invalidate_cached_volumes, invalidate_launch_setup, set_launch_setup_time
+)
 from service.driver import _retrieve_source, get_account_driver
 from service.licensing import _test_license
 from service.networking import get_topology_cls
@@ -704,29 +711,95 @@ def update_status(esh_driver, instance_id, provider_uuid, identity_uuid, user):
 
 
 def _pre_launch_validation(
-    username, esh_driver, identity_uuid, boot_source, size, allocation_source
+    username,
+    esh_driver,
+    identity_uuid,
+    boot_source,
+    size,
+    allocation_source,
+    timings=None
 ):
     """
     Used BEFORE launching a volume/instance .. Raise exceptions here to be dealt with by the caller.
+
+    The validations that call the cloud run on a thread of their own while
+    the others run (unless LAUNCH_VALIDATION_PARALLEL is False). The time
+    taken by each is added to `timings`.
     """
     identity = CoreIdentity.objects.get(uuid=identity_uuid)
 
-    # May raise OverQuotaError
-    check_quota(username, identity_uuid, size, include_networking=True)
-
-    # May raise OverAllocationError, AllocationBlacklistedError
-    check_allocation(username, allocation_source)
-
-    # May raise UnderThresholdError
-    check_application_threshold(username, identity_uuid, size, boot_source)
-
-    if boot_source.is_machine():
+    def check_licensing():
         machine = _retrieve_source(
             esh_driver, boot_source.identifier, "machine"
         )
         # may raise an exception if licensing doesnt match identity
         _test_for_licensing(machine, identity)
 
+    # May raise OverQuotaError
+    quota = partial(
+        check_quota, username, identity_uuid, size, include_networking=True
+    )
+    cloud_validations = [('check_quota', quota)]
+    if boot_source.is_machine():
+        cloud_validations.append(('check_licensing', check_licensing))
+
+    # May raise OverAllocationError, AllocationBlacklistedError
+    allocation = partial(check_allocation, username, allocation_source)
+    # May raise UnderThresholdError
+    threshold = partial(
+        check_application_threshold, username, identity_uuid, size, boot_source
+    )
+    local_validations = [
+        ('check_allocation', allocation),
+        ('check_application_threshold', threshold),
+    ]
+    if not getattr(settings, 'LAUNCH_VALIDATION_PARALLEL', True):
+        _run_validations(cloud_validations + local_validations, timings)
+        return
+    pool = ThreadPool(processes=1)
+    try:
+        cloud_result = pool.apply_async(
+            _run_validations, (cloud_validations, timings, True)
+        )
+        local_error = None
+        try:
+            _run_validations(local_validations, timings)
+        except Exception:
+            local_error = sys.exc_info()
+        # Errors of the cloud validations (the quota first) come first
+        cloud_result.get()
+        if local_error:
+            raise local_error[0], local_error[1], local_error[2]
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _run_validations(validations, timings=None, close_connection=False):
+    """
+    Run each (name, method) of `validations`, in order. When run from a
+    worker thread, close_connection=True releases the thread's database
+    connection once done.
+    """
+    try:
+        for (name, method) in validations:
+            _timed(timings, name, method)
+    finally:
+        if close_connection:
+            db.connection.close()
+
+
+def _timed(timings, step, method, *args, **kwargs):
+    """
+    Call `method`, recording the milliseconds it took as `timings[step]`.
+    """
+    start_time = time.time()
+    try:
+        return method(*args, **kwargs)
+    finally:
+        if timings is not None:
+            timings[step] = (time.time() - start_time) * 1000
+
 
 def launch_instance(
     user,
@@ -735,6 +808,7 @@ def launch_instance(
     source_alias,
     name,
     deploy=True,
+    timings=None,
     **launch_kwargs
 ):
     """
@@ -748,6 +822,9 @@ def launch_instance(
     3. Test user is launching appropriate size (Not below Thresholds)
     4. Perform an 'Instance launch' depending on Boot Source
     5. Return CORE Instance with new 'esh' objects attached.
+
+    If `timings` (a dict) is passed, the milliseconds taken by each step
+    are recorded in it.
     """
     now_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     status_logger.debug(
@@ -764,17 +841,31 @@ def launch_instance(
     esh_driver = get_cached_driver(identity=identity)
 
     # May raise Exception("Volume/Machine not available")
-    boot_source = get_boot_source(user.username, identity_uuid, source_alias)
+    boot_source = _timed(
+        timings, 'get_boot_source', get_boot_source, user.username,
+        identity_uuid, source_alias
+    )
     # May raise Exception("Size not available")
-    size = check_size(esh_driver, size_alias, provider, boot_source)
+    size = _timed(
+        timings, 'check_size', check_size, esh_driver, size_alias, provider,
+        boot_source
+    )
 
     # Raise any other exceptions before launching here
     _pre_launch_validation(
-        user.username, esh_driver, identity_uuid, boot_source, size,
-        launch_kwargs.get('allocation_source')
+        user.username,
+        esh_driver,
+        identity_uuid,
+        boot_source,
+        size,
+        launch_kwargs.get('allocation_source'),
+        timings=timings
     )
 
-    core_instance = _select_and_launch_source(
+    core_instance = _timed(
+        timings,
+        'launch',
+        _select_and_launch_source,
         user,
         identity_uuid,
         esh_driver,
@@ -1322,6 +1413,7 @@ def check_quota(username, identity_uuid, esh_size, include_networking=False):
 
 
 def delete_security_group(core_identity):
+    invalidate_launch_setup([core_identity.uuid], 'security_group')
     has_secret = core_identity.get_credential('secret') is not None
     if has_secret:
         return admin_delete_security_group(core_identity)
@@ -1731,12 +1823,43 @@ def _provision_openstack_instance(core_identity, admin_user=False):
     """
     # NOTE: Admin users do NOT need a security group created for them!
     if not admin_user:
-        security_group_init(core_identity)
+        _launch_setup(core_identity, 'security_group')
     network = network_init(core_identity)
-    keypair_init(core_identity)
+    _launch_setup(core_identity, 'keypair')
     return network
 
 
+def _launch_setup(core_identity, step):
+    """
+    Run the launch setup `step` (see `run_launch_setup`) before booting,
+    unless it was done already. Then it is only redone in the background
+    (`launch_setup_task`), every LAUNCH_SETUP_REFRESH_INTERVAL seconds.
+    """
+    done_at = get_launch_setup_time(core_identity, step)
+    if done_at is None:
+        return run_launch_setup(core_identity, step)
+    refresh_interval = getattr(settings, 'LAUNCH_SETUP_REFRESH_INTERVAL', 3600)
+    if done_at < time.time() - refresh_interval:
+        from service.tasks.driver import launch_setup_task
+        # Launches that follow should not refresh it again
+        set_launch_setup_time(core_identity, step)
+        launch_setup_task.apply_async(args=(str(core_identity.uuid), step))
+
+
+def run_launch_setup(core_identity, step):
+    """
+    Create the security group ('security_group') or import the keypairs
+    ('keypair') of the identity, and remember it was done.
+    """
+    if step == 'security_group':
+        security_group_init(core_identity)
+    elif step == 'keypair':
+        keypair_init(core_identity)
+    else:
+        raise ValueError("Unknown launch setup step: %s" % step)
+    set_launch_setup_time(core_identity, step)
+
+
 def _extra_openstack_args(core_identity, ex_metadata={}):
     credentials = core_identity.get_credentials()
     username = core_identity.created_by.username
@@ -1997,6 +2120,7 @@ def run_instance_volume_action(
         if not result and error_msg:
             # Return reason for failed detachment
             raise VolumeDetachConflict(error_msg)
+    invalidate_cached_volumes(identity=identity)
     # Task complete, convert the volume and return the object
     esh_volume = esh_driver.get_volume(volume_id)
     core_volume = convert_esh_volume(
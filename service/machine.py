@@ -327,6 +327,62 @@ def update_db_membership_for_group(provider_machine, group):
             % (obj,))
 
 
+def bulk_update_db_membership(machine_groups):
+    """
+    Batched equivalent of `update_db_membership_for_group`.
+
+    Input: A list of (provider_machine, [group, ...]) pairs
+    Every missing Application/ApplicationVersion/ProviderMachine membership is
+    created with one `bulk_create` per model.
+    """
+    app_pairs = set()
+    version_pairs = set()
+    machine_pairs = set()
+    for (provider_machine, groups) in machine_groups:
+        version = provider_machine.application_version
+        for group in groups:
+            app_pairs.add((group.id, version.application_id))
+            version_pairs.add((group.id, version.id))
+            machine_pairs.add((group.id, provider_machine.id))
+    _bulk_create_missing(
+        models.ApplicationMembership, 'application_id', app_pairs
+    )
+    _bulk_create_missing(
+        models.ApplicationVersionMembership, 'image_version_id', version_pairs
+    )
+    _bulk_create_missing(
+        models.ProviderMachineMembership, 'provider_machine_id', machine_pairs
+    )
+
+
+def _bulk_create_missing(membership_cls, target_field, pairs):
+    if not pairs:
+        return []
+    existing = set(
+        membership_cls.objects.filter(
+            **{
+                'group_id__in': {group_id
+                                 for (group_id, _) in pairs},
+                target_field + '__in': {target_id
+                                        for (_, target_id) in pairs}
+            }
+        ).values_list('group_id', target_field)
+    )
+    created = membership_cls.objects.bulk_create(
+        [
+            membership_cls(**{
+                'group_id': group_id,
+                target_field: target_id
+            }) for (group_id, target_id) in pairs - existing
+        ]
+    )
+    if created:
+        logger.info(
+            "Created %s new %s" % (len(created), membership_cls.__name__)
+        )
+    return created
+
+
 def remove_membership(image_version, group, accounts=None):
     """
     This function will remove *all* users in the group
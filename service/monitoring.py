@@ -66,14 +66,15 @@ def _select_identities(provider, users=None):
 
 
 def _convert_tenant_id_to_names(instances, tenants):
+    tenant_names = {}
+    for tenant in tenants:
+        if type(tenant) == dict:
+            tenant_names[tenant['id']] = tenant['name']
+        else:
+            tenant_names[tenant.id] = tenant.name
     for i in instances:
-        for tenant in tenants:
-            if type(tenant) == dict:
-                if tenant['id'] == i.owner:
-                    i.owner = tenant['name']
-            else:
-                if tenant.id == i.owner:
-                    i.owner = tenant.name
+        if i.owner in tenant_names:
+            i.owner = tenant_names[i.owner]
     return instances
 
 
@@ -1,16 +1,176 @@
+from collections import OrderedDict
+import json
+import threading
+
 from threepio import logger
 
+from django import db
+from django.conf import settings
 from django.core.exceptions import ValidationError
+import redis
 
 from core.models import IdentityMembership, Identity
-from core.models.quota import (
-    has_floating_ip_count_quota, has_port_count_quota, has_instance_count_quota,
-    has_cpu_quota, has_mem_quota, has_storage_quota, has_storage_count_quota,
-    has_snapshot_count_quota
-)
-from service.cache import get_cached_driver
+from core.models.quota import _pre_cache_sizes, _raise_quota_error
+from service.cache import get_cached_driver, redis_connection
 from service.driver import get_account_driver
 
+#: Quota fields, and the name of the resource they limit (in quota errors)
+QUOTA_RESOURCES = OrderedDict(
+    [
+        ('cpu', 'CPU'),
+        ('memory', 'Memory'),
+        ('instance_count', 'Instance'),
+        ('floating_ip_count', 'Floating IP'),
+        ('port_count', 'Fixed IP'),
+        ('storage', 'Storage Size'),
+        ('storage_count', 'Volume'),
+        ('snapshot_count', 'Snapshot'),
+    ]
+)
+INSTANCE_RESOURCES = ('cpu', 'memory', 'instance_count')
+VOLUME_RESOURCES = ('storage', 'storage_count')
+
+USAGE_KEY = "quota-usage.{0}"
+
+
+def get_usage(identity, resources=QUOTA_RESOURCES.keys(), driver=None):
+    """
+    The amount of each of `resources` (quota fields) used by `identity`:
+    {resource: used}, memory and storage in GB.
+
+    Each kind of cloud resource is listed at most once, and ports (from the
+    network service) are listed while the compute resources are. A resource
+    that could not be listed is None.
+    """
+    if not driver:
+        driver = get_cached_driver(identity=identity)
+    usage = {}
+    ports = {}
+    port_thread = None
+    if 'port_count' in resources:
+        port_thread = threading.Thread(
+            target=_count_ports, args=(identity, ports)
+        )
+        port_thread.start()
+    if any(resource in resources for resource in INSTANCE_RESOURCES):
+        _pre_cache_sizes(driver)
+        instances = driver.list_instances()
+        usage['cpu'] = sum(_instance_cpu(instance) for instance in instances)
+        usage['memory'] = sum(
+            _instance_memory(instance) for instance in instances
+        )
+        usage['instance_count'] = len(instances)
+    if 'floating_ip_count' in resources:
+        floating_ips = driver._connection.ex_list_floating_ips()
+        usage['floating_ip_count'] = len(floating_ips)
+    if any(resource in resources for resource in VOLUME_RESOURCES):
+        volumes = driver.list_volumes()
+        usage['storage'] = sum(volume.size for volume in volumes)
+        usage['storage_count'] = len(volumes)
+    if 'snapshot_count' in resources:
+        snapshots = driver._connection.ex_list_snapshots()
+        usage['snapshot_count'] = len(snapshots)
+    if port_thread:
+        port_thread.join()
+        usage['port_count'] = ports.get('count')
+    return dict(
+        (resource, used)
+        for (resource, used) in usage.items() if resource in resources
+    )
+
+
+def _instance_cpu(instance):
+    try:
+        return instance.size._size.extra['cpu']
+    except (AttributeError, KeyError):
+        # Instance running on an unknown size..
+        return 1
+
+
+def _instance_memory(instance):
+    try:
+        return instance.size._size.ram / 1024.0
+    except (AttributeError, KeyError):
+        # Instance running on an unknown size..
+        return 1
+
+
+def _count_ports(identity, ports):
+    # Consider the ports unknown (and the quota met) if we fail to connect
+    try:
+        from service.instance import _to_network_driver
+        network_driver = _to_network_driver(identity)
+        port_list = network_driver.list_ports()
+        project_id = network_driver.get_tenant_id()
+    except Exception as exc:
+        logger.warn(
+            "Could not verify quota due to failed call to network_driver.list_ports() - %s"
+            % exc
+        )
+        return
+    finally:
+        # Runs in its own thread, which opened its own database connection
+        db.connection.close()
+    fixed_ips = [
+        port for port in port_list if 'compute:' in port['device_owner']
+        and port.get('project_id', project_id) == project_id
+    ]
+    ports['count'] = len(fixed_ips)
+
+
+def check_usage(quota, usage, requested, raise_exc=True):
+    """
+    True if `usage` (see `get_usage`) plus the `requested` amount of each
+    resource is within `quota`.
+
+    Resources without a limit (or whose usage is unknown) always pass. A
+    negative limit also means no limit, except for volume resources.
+    """
+    if not quota:
+        return True
+    for (resource, name) in QUOTA_RESOURCES.items():
+        limit = getattr(quota, resource)
+        used = usage.get(resource)
+        if resource not in requested or used is None:
+            continue
+        if not _is_limit(resource, limit):
+            continue
+        new_size = requested[resource]
+        total_size = used + new_size
+        if resource == 'memory':
+            total_size = int(total_size)
+        if total_size <= limit:
+            continue
+        if raise_exc:
+            _raise_quota_error(name, used, new_size, limit)
+        return False
+    return True
+
+
+def get_usage_summary(identity):
+    """
+    The amount of every resource used by `identity` (see `get_usage`),
+    cached for QUOTA_USAGE_CACHE_TTL seconds.
+    """
+    key = USAGE_KEY.format(identity.uuid)
+    try:
+        cached = redis_connection().get(key)
+    except redis.exceptions.RedisError:
+        logger.exception("Could not read the cached quota usage")
+        return get_usage(identity)
+    if cached is not None:
+        return json.loads(cached)
+    usage = get_usage(identity)
+    try:
+        redis_connection().set(
+            key,
+            json.dumps(usage),
+            ex=getattr(settings, 'QUOTA_USAGE_CACHE_TTL', 30)
+        )
+    except redis.exceptions.RedisError:
+        logger.exception("Could not cache the quota usage")
+    return usage
+
 
 def check_over_instance_quota(
     username,
@@ -39,23 +199,25 @@ def check_over_instance_quota(
         membership = memberships_available.first()
     identity = membership.identity
     quota = identity.quota
-    driver = get_cached_driver(identity=identity)
     new_port = new_floating_ip = new_instance = new_cpu = new_ram = 0
     if esh_size:
         new_cpu += esh_size.cpu
-        new_ram += esh_size.ram
+        new_ram += esh_size.ram / 1024.0
         new_instance += 1
         new_port += 1
     if include_networking:
         new_floating_ip += 1
+    requested = {
+        'cpu': new_cpu,
+        'memory': new_ram,
+        'instance_count': new_instance,
+        'floating_ip_count': new_floating_ip,
+        'port_count': new_port,
+    }
     # Will throw ValidationError if false.
     try:
-        has_cpu_quota(driver, quota, new_cpu)
-        has_mem_quota(driver, quota, new_ram)
-        has_instance_count_quota(driver, quota, new_instance)
-        has_floating_ip_count_quota(driver, quota, new_floating_ip)
-        has_port_count_quota(identity, driver, quota, new_port)
-        return True
+        usage = get_usage(identity, _limited(quota, requested))
+        return check_usage(quota, usage, requested)
     except ValidationError:
         if raise_exc:
             raise
@@ -87,7 +249,6 @@ def check_over_storage_quota(
         membership = memberships_available.first()
     identity = membership.identity
     quota = identity.quota
-    driver = get_cached_driver(identity=identity)
 
     # FIXME: I don't believe that 'snapshot' size and 'volume' size share
     # the same quota, so for now we ignore 'snapshot-size',
@@ -96,18 +257,43 @@ def check_over_storage_quota(
 
     new_disk = new_volume_size
     new_volume = 1 if new_volume_size > 0 else 0
+    requested = {
+        'storage': new_disk,
+        'storage_count': new_volume,
+        'snapshot_count': new_snapshot,
+    }
     # Will throw ValidationError if false.
     try:
-        has_storage_quota(driver, quota, new_disk)
-        has_storage_count_quota(driver, quota, new_volume)
-        has_snapshot_count_quota(driver, quota, new_snapshot)
-        return True
+        usage = get_usage(identity, _limited(quota, requested))
+        return check_usage(quota, usage, requested)
     except ValidationError:
         if raise_exc:
             raise
         return False
 
 
+def _limited(quota, requested):
+    """
+    The `requested` resources that `quota` limits (only those are listed)
+    """
+    if not quota:
+        return []
+    return [
+        resource for resource in requested
+        if _is_limit(resource, getattr(quota, resource))
+    ]
+
+
+def _is_limit(resource, limit):
+    """
+    True if `limit` limits `resource`: null never does, and a negative limit
+    does only for volume resources (as volume quotas always have).
+    """
+    if not limit:
+        return False
+    return limit >= 0 or resource in VOLUME_RESOURCES
+
+
 def set_provider_quota(identity_uuid, quota=None, limit_dict=None):
     """
     """
@@ -0,0 +1,201 @@
+"""
+Watch launching instances until they are ready.
+
+Rather than a task polling each instance (and rebuilding a driver) every
+15 seconds, `watch_instance` registers the instance along with the tasks to
+run once it is ready, and `check_pending_instances` looks at every pending
+instance watched with the same driver credentials with a single
+`list_instances` call. Instances are looked at less often the longer they
+take (see `next_check_delay`).
+"""
+from collections import defaultdict
+import cPickle as pickle
+import time
+
+from celery import current_app as app
+from celery.app.task import Context
+from django.conf import settings
+
+from threepio import celery_logger
+
+from service.cache import _fingerprint, redis_connection
+from service.deploy_metrics import end_stage
+from service.driver import get_driver
+
+#: Hash of task id -> pickled pending instance
+PENDING_KEY = "instance-readiness-pending"
+#: Held while pending instances are checked
+LOCK_KEY = "instance-readiness-lock"
+
+
+class InstanceNotReady(Exception):
+    pass
+
+
+def next_check_delay(attempts):
+    """
+    Seconds to wait before looking at an instance again, after `attempts`
+    looks: the delay doubles every 3 attempts, up to
+    INSTANCE_READINESS_MAX_INTERVAL.
+    """
+    interval = getattr(settings, 'INSTANCE_READINESS_INTERVAL', 10)
+    max_interval = getattr(settings, 'INSTANCE_READINESS_MAX_INTERVAL', 60)
+    return min(interval * 2**(attempts // 3), max_interval)
+
+
+def watch_instance(
+    task_id,
+    instance_alias,
+    driverCls,
+    provider,
+    identity,
+    status_query,
+    callbacks=None,
+    errbacks=None,
+    **ready_kwargs
+):
+    """
+    Wait for `instance_alias` to reach `status_query` (see
+    `service.tasks.driver._is_instance_ready` for `ready_kwargs`), then
+    apply `callbacks` with the result, like the task `task_id` would have.
+
+    If it is not ready after INSTANCE_READINESS_TIMEOUT seconds, the task
+    `task_id` fails and `errbacks` are applied.
+    """
+    now = time.time()
+    timeout = getattr(settings, 'INSTANCE_READINESS_TIMEOUT', 250 * 15)
+    pending = {
+        'instance_alias': instance_alias,
+        'driver': (driverCls, provider, identity),
+        'status_query': status_query,
+        'ready_kwargs': ready_kwargs,
+        'callbacks': callbacks or [],
+        'errbacks': errbacks or [],
+        'group': _driver_group(driverCls, provider, identity),
+        'attempts': 0,
+        'next_check': now + next_check_delay(0),
+        'deadline': now + timeout,
+    }
+    redis_connection().hset(
+        PENDING_KEY, task_id, pickle.dumps(pending, pickle.HIGHEST_PROTOCOL)
+    )
+
+
+def _driver_group(driverCls, provider, identity):
+    """
+    Instances watched with the same driver credentials (provider plus
+    identity) are listed together, by the driver of any of them.
+    """
+    credentials = dict(getattr(identity, 'credentials', None) or {})
+    credentials['driver'] = getattr(driverCls, '__name__', driverCls)
+    credentials['provider'] = getattr(provider, 'identifier', provider)
+    return _fingerprint(credentials)
+
+
+def check_pending_instances():
+    """
+    Look at the pending instances of every driver with an instance due
+    for a check. Returns the number of instances no longer pending.
+    """
+    redis = redis_connection()
+    lock_timeout = getattr(settings, 'INSTANCE_READINESS_LOCK_TIMEOUT', 300)
+    if not redis.set(LOCK_KEY, 1, nx=True, ex=lock_timeout):
+        celery_logger.info("Pending instances are already being checked")
+        return 0
+    try:
+        now = time.time()
+        groups = defaultdict(dict)
+        for (task_id, data) in redis.hgetall(PENDING_KEY).items():
+            pending = pickle.loads(data)
+            groups[pending['group']][task_id] = pending
+        finished = 0
+        for group in groups.values():
+            if any(
+                pending['next_check'] <= now or pending['deadline'] <= now
+                for pending in group.values()
+            ):
+                finished += _check_group(redis, group, now)
+        return finished
+    finally:
+        redis.delete(LOCK_KEY)
+
+
+def _check_group(redis, group, now):
+    from service.tasks.driver import _is_instance_ready
+    (driverCls, provider, identity) = group.values()[0]['driver']
+    try:
+        driver = get_driver(driverCls, provider, identity)
+        instances = dict(
+            (instance.id, instance) for instance in driver.list_instances()
+        )
+    except Exception:
+        celery_logger.exception("Could not list the pending instances")
+        instances = None
+    finished = 0
+    for (task_id, pending) in group.items():
+        try:
+            if instances is None:
+                raise InstanceNotReady("Instances could not be listed")
+            instance = instances.get(pending['instance_alias'])
+            if not instance:
+                celery_logger.debug(
+                    "Instance has been terminated: %s." %
+                    pending['instance_alias']
+                )
+                result = False
+            else:
+                result = _is_instance_ready(
+                    instance, pending['status_query'], **pending['ready_kwargs']
+                )
+        except Exception as exc:
+            if pending['deadline'] > now:
+                pending['attempts'] += 1
+                pending['next_check'] = now + next_check_delay(
+                    pending['attempts']
+                )
+                redis.hset(
+                    PENDING_KEY, task_id,
+                    pickle.dumps(pending, pickle.HIGHEST_PROTOCOL)
+                )
+                continue
+            # Only the check that removed the instance finishes it
+            if redis.hdel(PENDING_KEY, task_id):
+                celery_logger.error(
+                    "Instance %s was not ready in time: %s" %
+                    (pending['instance_alias'], exc)
+                )
+                end_stage(
+                    pending['instance_alias'],
+                    'wait_for_instance',
+                    succeeded=False
+                )
+                fail_chain(task_id, pending['errbacks'], exc)
+                finished += 1
+            continue
+        if redis.hdel(PENDING_KEY, task_id):
+            end_stage(
+                pending['instance_alias'],
+                'wait_for_instance',
+                succeeded=bool(result)
+            )
+            resume_chain(pending['callbacks'], result)
+            finished += 1
+    return finished
+
+
+def resume_chain(callbacks, result):
+    """
+    Apply `callbacks` (the linked tasks of a task) with `result`, as if
+    the task had returned it.
+    """
+    for callback in callbacks:
+        app.signature(callback).apply_async((result, ))
+
+
+def fail_chain(task_id, errbacks, exc):
+    """
+    Fail the task `task_id` with `exc` and apply `errbacks` (its linked
+    error tasks), as if the task had raised it.
+    """
+    request = Context(id=task_id, errbacks=errbacks)
+    app.backend.mark_as_failure(task_id, exc, request=request)
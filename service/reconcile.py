@@ -0,0 +1,115 @@
+"""
+Reconcile the resources known to the database with those seen on the cloud.
+
+Both sides are indexed by identifier once, so reconciling N database objects
+against M cloud objects is O(N + M) instead of O(N * M).
+"""
+from collections import namedtuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models.application import Application
+from core.models.application_version import ApplicationVersion
+from core.models.instance_source import InstanceSource
+from core.models.machine import ProviderMachine
+from core.query import only_current
+
+ReconcileDiff = namedtuple('ReconcileDiff', ['added', 'removed', 'changed'])
+
+
+def reconcile(db_objects, cloud_objects, db_key, cloud_key, has_changed=None):
+    """
+    Compare `db_objects` to `cloud_objects`, matching them with the
+    identifiers returned by `db_key(db_obj)` and `cloud_key(cloud_obj)`.
+
+    Returns a ReconcileDiff where:
+    - added:   cloud objects with no database counterpart
+    - removed: database objects with no cloud counterpart
+    - changed: (db_obj, cloud_obj) pairs for which
+               `has_changed(db_obj, cloud_obj)` is True
+    """
+    cloud_index = {}
+    for cloud_obj in cloud_objects:
+        cloud_index[cloud_key(cloud_obj)] = cloud_obj
+    seen_keys = set()
+    removed = []
+    changed = []
+    for db_obj in db_objects:
+        key = db_key(db_obj)
+        seen_keys.add(key)
+        cloud_obj = cloud_index.get(key)
+        if cloud_obj is None:
+            removed.append(db_obj)
+        elif has_changed and has_changed(db_obj, cloud_obj):
+            changed.append((db_obj, cloud_obj))
+    added = [
+        new_obj for (index_key, new_obj) in cloud_index.items()
+        if index_key not in seen_keys
+    ]
+    return ReconcileDiff(added=added, removed=removed, changed=changed)
+
+
+def end_date_sources(source_models, now_time=None):
+    """
+    End-date the InstanceSource of every volume/machine in `source_models`
+    with a single UPDATE. Returns the number of rows updated.
+    """
+    return _end_date_ids(
+        InstanceSource, [model.instance_source_id for model in source_models],
+        now_time
+    )
+
+
+def end_date_models(model_class, models, now_time=None):
+    """
+    End-date every `model_class` in `models` with a single UPDATE.
+    Returns the number of rows updated.
+    """
+    return _end_date_ids(model_class, [model.id for model in models], now_time)
+
+
+def end_date_machines(db_machines, now_time=None):
+    """
+    End-date `db_machines` and cascade to the versions left without a
+    current machine and the applications left without a current version.
+    Returns the number of (machines, versions, applications) end-dated.
+    """
+    if not now_time:
+        now_time = timezone.now()
+    mach_count = end_date_sources(db_machines, now_time)
+
+    version_ids = set(machine.application_version_id for machine in db_machines)
+    current_version_ids = set(
+        ProviderMachine.objects.filter(
+            Q(instance_source__end_date__isnull=True) |
+            Q(instance_source__end_date__gt=now_time),
+            application_version_id__in=version_ids
+        ).values_list('application_version_id', flat=True)
+    )
+    ended_version_ids = version_ids - current_version_ids
+    ver_count = _end_date_ids(ApplicationVersion, ended_version_ids, now_time)
+
+    application_ids = set(
+        ApplicationVersion.objects.filter(
+            id__in=ended_version_ids
+        ).values_list('application_id', flat=True)
+    )
+    current_application_ids = set(
+        ApplicationVersion.objects.filter(
+            only_current(now_time), application_id__in=application_ids
+        ).values_list('application_id', flat=True)
+    )
+    app_count = _end_date_ids(
+        Application, application_ids - current_application_ids, now_time
+    )
+    return (mach_count, ver_count, app_count)
+
+
+def _end_date_ids(model_class, model_ids, now_time=None):
+    if not model_ids:
+        return 0
+    if not now_time:
+        now_time = timezone.now()
+    return model_class.objects.filter(id__in=list(model_ids)
+                                     ).update(end_date=now_time)
@@ -0,0 +1,275 @@
+"""
+Instance reports, built by the database and written out row by row.
+
+Rows are read through a server-side cursor and the summaries are
+aggregated with GROUP BY date_trunc(...), so the memory used by a report
+does not depend on how many instances it covers.
+"""
+from django.contrib.postgres.aggregates import BoolOr
+from django.db import connections
+from django.db.models import (
+    BooleanField, Case, Exists, F, OuterRef, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+import unicodecsv
+import xlsxwriter
+
+from core.models import Application, Instance, InstanceStatusHistory, Size
+
+APPLICATION_PATH = 'source__providermachine__application_version__application'
+
+#: Report columns, in order
+REPORT_HEADERS = [
+    "id", "instance_id", "username", "staff_user", "provider", "start_date",
+    "end_date", "image_name", "version_name", "size.name", "size.cpu",
+    "size.mem", "size.disk", "is_featured_image", "hit_active",
+    "hit_deploy_error", "hit_error", "hit_aborted", "hit_active_or_aborted",
+    "hit_active_or_aborted_or_error"
+]
+
+#: Report frequency -> date_trunc() field
+FREQUENCY_TRUNC = {
+    'AS': 'year',
+    'QS': 'quarter',
+    'MS': 'month',
+    'W': 'week',
+    'D': 'day',
+    'H': 'hour',
+}
+
+#: Summary column -> aggregated SQL, from the statuses each instance reached
+SUMMARY_COLUMNS = {
+    'Active': "report.had_active",
+    'Deploy Error': "NOT report.had_active AND report.had_deploy_error",
+    'Aborted':
+        "NOT (report.had_active OR report.had_deploy_error"
+        " OR report.had_error)",
+    'Active/Aborted':
+        "report.had_active OR NOT (report.had_deploy_error"
+        " OR report.had_error)",
+    'Active/Aborted/Error':
+        "report.had_active OR report.had_error"
+        " OR NOT report.had_deploy_error",
+}
+
+SUMMARY_SQL = """
+SELECT date_trunc(%s, report.start_date) AS period{group_column}, {columns}
+FROM ({report}) AS report
+GROUP BY period{group_column}
+ORDER BY period{group_column}
+"""
+
+#: (Summary sheet, grouping column, summary columns)
+SUMMARIES = [
+    ('Monthly Summary', None, ['Active/Aborted', 'Active/Aborted/Error']),
+    ('Image Summary', 'image_name', ['Active/Aborted', 'Active/Aborted/Error']),
+    (
+        'User Summary', 'username', [
+            'Active', 'Deploy Error', 'Aborted', 'Active/Aborted',
+            'Active/Aborted/Error'
+        ]
+    ),
+]
+
+
+def _had_status(status_name):
+    return Exists(
+        InstanceStatusHistory.objects.filter(
+            instance=OuterRef('pk'), status__name=status_name
+        )
+    )
+
+
+def _last_size(field):
+    """
+    `field` of the size of the newest history of the instance. Instances
+    without a `last_history` yet (see `backfill_instance_last_history`) fall
+    back to their newest history, like `Instance.get_size`.
+    """
+    newest_history = InstanceStatusHistory.objects.filter(
+        instance=OuterRef('pk')
+    ).order_by('-start_date').values('size__' + field)[:1]
+    output_field = Size._meta.get_field(field)
+    return Coalesce(
+        F('last_history__size__' + field),
+        Subquery(newest_history, output_field=output_field),
+        output_field=output_field
+    )
+
+
+def _format_date(date):
+    return date.strftime("%x %X") if date else None
+
+
+def report_rows(queryset):
+    """
+    Yield the report row (a list, ordered like REPORT_HEADERS) of every
+    instance in `queryset`, oldest first.
+    """
+    featured = Application.objects.filter(
+        tags__name__icontains='featured', id=OuterRef(APPLICATION_PATH)
+    )
+    instances = Instance.objects.filter(id__in=queryset.values('id')).annotate(
+        had_active=_had_status('active'),
+        had_deploy_error=_had_status('deploy_error'),
+        had_error=_had_status('error'),
+        is_featured_image=Exists(featured),
+        size_name=_last_size('name'),
+        size_cpu=_last_size('cpu'),
+        size_mem=_last_size('mem'),
+        size_disk=_last_size('disk')
+    ).order_by('start_date', 'id').values_list(
+        'id', 'provider_alias', 'created_by__username', 'created_by__is_staff',
+        'created_by_identity__provider__location', 'start_date', 'end_date',
+        APPLICATION_PATH + '__name',
+        'source__providermachine__application_version__name', 'size_name',
+        'size_cpu', 'size_mem', 'size_disk', 'is_featured_image', 'had_active',
+        'had_deploy_error', 'had_error'
+    )
+    for row in instances.iterator():
+        (
+            instance_id, alias, username, is_staff, provider, start_date,
+            end_date, image_name, version_name, size_name, size_cpu, size_mem,
+            size_disk, is_featured, active, deploy_error, error
+        ) = row
+        hit_deploy_error = not active and deploy_error
+        hit_error = not active and error
+        hit_aborted = not (active or deploy_error or error)
+        yield [
+            instance_id, alias, username,
+            str(is_staff), provider,
+            _format_date(start_date),
+            _format_date(end_date),
+            image_name.replace(",", "-") if image_name else "Deleted Image",
+            version_name.replace(",", "-") if version_name else "N/A",
+            size_name, size_cpu, size_mem, size_disk, is_featured, active,
+            hit_deploy_error, hit_error, hit_aborted,
+            1 if active or hit_aborted else 0,
+            1 if active or hit_aborted or hit_error else 0
+        ]
+
+
+def _reached_status(status_name):
+    return BoolOr(
+        Case(
+            When(instancestatushistory__status__name=status_name, then=True),
+            default=Value(False),
+            output_field=BooleanField()
+        )
+    )
+
+
+def summarize(queryset, frequency, group_by=None, columns=None):
+    """
+    Summarize the launches of featured images in `queryset` per
+    `frequency` period (and per `group_by`: 'username' or 'image_name').
+
+    Returns the header and a list of rows:
+    [period, (group,) average of column, sum of column, ...]
+    """
+    if not columns:
+        columns = sorted(SUMMARY_COLUMNS.keys())
+    featured = Application.objects.filter(tags__name__icontains='featured')
+    report = Instance.objects.filter(
+        id__in=queryset.values('id'), **{
+            APPLICATION_PATH + '__in': featured
+        }
+    ).order_by().annotate(
+        username=F('created_by__username'),
+        image_name=F(APPLICATION_PATH + '__name')
+    ).values('id', 'start_date', 'username', 'image_name').annotate(
+        had_active=_reached_status('active'),
+        had_deploy_error=_reached_status('deploy_error'),
+        had_error=_reached_status('error')
+    )
+    report_sql, report_params = report.query.sql_with_params()
+
+    selected = []
+    header = ['Start Date']
+    if group_by:
+        header.append({'username': 'Username'}.get(group_by, 'Image Name'))
+    for column in columns:
+        selected.append("AVG((%s)::int)::float" % SUMMARY_COLUMNS[column])
+        selected.append("SUM((%s)::int)" % SUMMARY_COLUMNS[column])
+        header.extend(['Average of %s' % column, 'Sum of %s' % column])
+    sql = SUMMARY_SQL.format(
+        group_column=', report.%s' % group_by if group_by else '',
+        columns=', '.join(selected),
+        report=report_sql
+    )
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, [FREQUENCY_TRUNC[frequency]] + list(report_params))
+        return header, cursor.fetchall()
+
+
+class Echo(object):
+    """
+    A file-like object returning what is written to it
+    """
+
+    def write(self, value):
+        return value
+
+
+def write_csv(rows, headers=REPORT_HEADERS):
+    """
+    Yield `headers`, then every row of `rows`, as lines of CSV
+    """
+    writer = unicodecsv.writer(Echo(), encoding='utf-8')
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(output, queryset, frequency):
+    """
+    Write the summaries and the rows of the report of `queryset` to the
+    file `output`, as an XLSX workbook.
+
+    The workbook is written in constant memory mode: each row is flushed
+    to disk as soon as it is written.
+    """
+    if frequency in ['AS']:
+        summary_format = 'yyyy'
+    elif frequency in ['MS', 'QS']:
+        summary_format = 'mmmm yyyy'
+    elif frequency in ['W', 'D']:
+        summary_format = 'mmm d yyyy'
+    else:
+        summary_format = 'mmm d yyyy hh:mm:ss'
+
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    date_format = workbook.add_format({'num_format': summary_format})
+    pct_format = workbook.add_format({'num_format': '0.00%'})
+    name_format = workbook.add_format()
+    name_format.set_align('left')
+
+    for (sheet_name, group_by, columns) in SUMMARIES:
+        header, summary = summarize(queryset, frequency, group_by, columns)
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.set_column(0, 0, 34, date_format)
+        first_value = 1
+        if group_by:
+            worksheet.set_column(1, 1, 36, name_format)
+            first_value = 2
+        # Averages are percentages
+        for column in range(first_value, len(header), 2):
+            worksheet.set_column(column, column, 26, pct_format)
+            worksheet.set_column(column + 1, column + 1, 17)
+        worksheet.write_row(0, 0, header)
+        for (row_number, row) in enumerate(summary, 1):
+            worksheet.write_datetime(row_number, 0, row[0].replace(tzinfo=None))
+            worksheet.write_row(row_number, 1, row[1:])
+
+    worksheet = workbook.add_worksheet('Raw Data')
+    worksheet.set_column('C:C', 32)
+    worksheet.set_column('F:G', 23)
+    worksheet.set_column('H:H', 34)
+    worksheet.set_column('I:I', 17)
+    worksheet.write_row(0, 0, REPORT_HEADERS)
+    row_number = 0
+    for (row_number, row) in enumerate(report_rows(queryset), 1):
+        worksheet.write_row(row_number, 0, row)
+    worksheet.autofilter(0, 0, row_number, len(REPORT_HEADERS) - 1)
+    workbook.close()
+    return output
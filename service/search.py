@@ -4,8 +4,14 @@ Provide pluggable machine search for Atmosphere.
 """
 from abc import ABCMeta, abstractmethod
 import operator
+import re
 
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, TrigramSimilarity
+)
+from django.db.models import F, FloatField, Func, Q, TextField, Value
+from django.db.models.functions import Coalesce
 
 from core.models.machine import ProviderMachine
 from core.query import only_current_source
@@ -57,3 +63,98 @@ class CoreSearchProvider(BaseSearchProvider):
             Q(application__description__icontains=query),
             *only_current_source()
         )
+
+
+class FullTextSearchProvider(BaseSearchProvider):
+    """
+    Search core.models.machine ProviderMachine through the full-text
+    search index of their applications, best matches first.
+    """
+
+    @classmethod
+    def search(cls, identity, query):
+        machines = ProviderMachine.objects.filter(
+            Q(
+                application_version__application__private=True,
+                instance_source__created_by_identity=identity
+            ) | Q(
+                application_version__application__private=False,
+                instance_source__provider=identity.provider
+            ), *only_current_source()
+        )
+        return full_text_search(
+            machines,
+            query,
+            application_path='application_version__application'
+        )
+
+
+class PrefixSearchQuery(SearchQuery):
+    """
+    Match documents containing every term of `value` as a word prefix
+    ('ubu cent' matches 'Ubuntu 16.04 with CentOS tools').
+    """
+
+    def __init__(self, value, **extra):
+        terms = [
+            re.sub(r'[^\w.-]', '', term, flags=re.UNICODE).strip('.-')
+            for term in value.split()
+        ]
+        value = ' & '.join('%s:*' % term for term in terms if term)
+        super(PrefixSearchQuery, self).__init__(value, **extra)
+
+    def as_sql(self, compiler, connection):
+        sql, params = super(PrefixSearchQuery,
+                            self).as_sql(compiler, connection)
+        return sql.replace('plainto_tsquery', 'to_tsquery', 1), params
+
+
+class SearchHeadline(Func):
+    """
+    `expression` with the terms matching `query` highlighted (<b>term</b>)
+    """
+    function = 'ts_headline'
+
+    def __init__(self, expression, query, config=None, **extra):
+        expressions = [expression, query]
+        if config:
+            expressions.insert(0, Value(config))
+        super(SearchHeadline, self).__init__(
+            *expressions, output_field=TextField(), **extra
+        )
+
+
+def full_text_search(queryset, query, application_path=None, extra=None):
+    """
+    Filter `queryset` to the applications (or the objects whose
+    `application_path` leads to an application) matching `query`:
+    - every term as a prefix of a word of the name, tags or description
+    - OR the name being similar to `query`, which catches typos
+    - OR the filter `extra`, when given
+
+    Results are annotated with their `search_rank` and a highlighted
+    `search_headline` of the description, and ordered best match first.
+    """
+
+    def path(field):
+        if not application_path:
+            return field
+        return '%s__%s' % (application_path, field)
+
+    config = getattr(settings, 'SEARCH_CONFIG', 'english')
+    search_query = PrefixSearchQuery(query, config=config)
+    matches = Q(**{path('search_vector'): search_query}) |\
+        Q(**{path('name__trigram_similar'): query})
+    if extra is not None:
+        matches |= extra
+    rank = Coalesce(
+        SearchRank(F(path('search_vector')), search_query),
+        Value(0.0),
+        output_field=FloatField()
+    ) + TrigramSimilarity(path('name'), query)
+    return queryset.filter(matches).annotate(
+        search_rank=rank,
+        search_headline=SearchHeadline(
+            path('description'), search_query, config=config
+        )
+    ).order_by('-search_rank')
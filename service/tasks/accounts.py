@@ -3,7 +3,8 @@ from django.utils.timezone import datetime
 from rtwo.exceptions import NeutronClientException, NeutronException
 from threepio import celery_logger
 
-from core.models import Provider, Identity, Credential
+from core.models import AtmosphereUser, Provider, Identity, Credential
+from core.plugins import AccountCreationPluginManager
 from service.driver import get_account_driver
 
 
@@ -69,6 +70,43 @@ def remove_empty_networks_for(provider_id):
                 )
 
 
+@task(name="create_accounts_for")
+def create_accounts_for(provider_id, usernames, force=False, concurrency=None):
+    """
+    Create the accounts of every user of `usernames` on the provider at
+    once (see `AccountDriver.create_accounts`). Returns the
+    {'username', 'project_name', 'identity', 'timings', 'error'} of each
+    account. Usernames without an AtmosphereUser are reported as errors.
+    """
+    provider = Provider.objects.get(id=provider_id)
+    users = AtmosphereUser.objects.filter(username__in=usernames)
+    known_usernames = set(users.values_list('username', flat=True))
+    results = [
+        {
+            'username': username,
+            'project_name': None,
+            'identity': None,
+            'timings': {},
+            'error': "No user named %s" % username
+        } for username in usernames if username not in known_usernames
+    ]
+    if known_usernames:
+        results.extend(
+            AccountCreationPluginManager.create_many_accounts(
+                provider,
+                [name for name in usernames if name in known_usernames],
+                force=force,
+                concurrency=concurrency
+            )
+        )
+    failed = [result for result in results if result['error']]
+    celery_logger.info(
+        "Created %s accounts for %s users on %s (%s failed)" %
+        (len(results) - len(failed), len(usernames), provider, len(failed))
+    )
+    return results
+
+
 @task(name="remove_empty_networks")
 def remove_empty_networks():
     celery_logger.debug(
@@ -9,6 +9,7 @@ import time
 from django.conf import settings
 from django.utils.timezone import datetime, timedelta
 from celery.decorators import task
+from celery.exceptions import Ignore
 from celery.task import current
 
 from rtwo.exceptions import LibcloudInvalidCredsError, LibcloudBadResponseError
@@ -31,9 +32,15 @@ from service.deploy import (
     ansible_ready_to_deploy, run_utility_playbooks, execution_has_failures,
     execution_has_unreachable
 )
+from service.deploy_metrics import end_stage, start_stage
+from service.cache import invalidate_launch_setup
+from service.deploy_queue import (
+    deploy_queued_instances, queue_deploy, schedule_run
+)
 from service.driver import get_driver, get_account_driver
 from service.exceptions import AnsibleDeployException
-from service.instance import _update_instance_metadata
+from service.readiness import check_pending_instances, watch_instance
+from service.instance import _update_instance_metadata, run_launch_setup
 from service.mock import MockInstance
 
 
@@ -112,7 +119,30 @@ def wait_for_instance(
 
     status_query = "active" Match only one value, active
     status_query = ["active","suspended"] or match multiple values.
+
+    With INSTANCE_READINESS_WATCHER (the default), the instance is handed
+    to the readiness watcher instead (see `service.readiness`), which
+    runs the rest of the chain once the instance is ready.
     """
+    start_stage(instance_alias, 'wait_for_instance')
+    request = current.request
+    if getattr(settings, 'INSTANCE_READINESS_WATCHER', True)\
+            and not request.called_directly:
+        watch_instance(
+            request.id,
+            instance_alias,
+            driverCls,
+            provider,
+            identity,
+            status_query,
+            callbacks=request.callbacks,
+            errbacks=request.errbacks,
+            tasks_allowed=tasks_allowed,
+            test_tmp_status=test_tmp_status,
+            return_id=return_id
+        )
+        # The watcher, not this task, calls the linked tasks
+        raise Ignore()
     try:
         celery_logger.debug("wait_for task started at %s." % datetime.now())
         driver = get_driver(driverCls, provider, identity)
@@ -121,10 +151,12 @@ def wait_for_instance(
             celery_logger.debug(
                 "Instance has been terminated: %s." % instance_alias
             )
+            end_stage(instance_alias, 'wait_for_instance', succeeded=False)
             return False
         result = _is_instance_ready(
             instance, status_query, tasks_allowed, test_tmp_status, return_id
         )
+        end_stage(instance_alias, 'wait_for_instance')
         return result
     except Exception as exc:
         if "Not Ready" not in str(exc):
@@ -134,6 +166,29 @@ def wait_for_instance(
         wait_for_instance.retry(exc=exc)
 
 
+@task(name="check_pending_instances", ignore_result=True)
+def check_pending_instances_task():
+    finished = check_pending_instances()
+    celery_logger.debug("%s pending instance(s) finished" % finished)
+
+
+@task(name="launch_setup_task", ignore_result=True)
+def launch_setup_task(identity_uuid, step):
+    """
+    Redo the launch setup `step` (security group, keypair) of the identity,
+    off the launch request.
+    """
+    identity = Identity.objects.get(uuid=identity_uuid)
+    try:
+        run_launch_setup(identity, step)
+    except Exception:
+        celery_logger.exception(
+            "Could not redo the %s setup of %s" % (step, identity)
+        )
+        # The next launch will do it before booting
+        invalidate_launch_setup([identity_uuid], step)
+
+
 def _is_instance_ready(
     instance,
     status_query,
@@ -192,6 +247,7 @@ def add_fixed_ip(
     driverCls, provider, identity, instance_id, core_identity_uuid=None
 ):
     from service.instance import _to_network_driver, _get_network_id
+    start_stage(instance_id, 'add_fixed_ip')
     try:
         celery_logger.debug("add_fixed_ip task started at %s." % datetime.now())
         core_identity = Identity.objects.get(uuid=core_identity_uuid)
@@ -231,6 +287,7 @@ def add_fixed_ip(
             # Only add fixed ip if the instance doesn't already have one
             driver._connection.ex_add_fixed_ip(instance, network_id)
 
+        end_stage(instance_id, 'add_fixed_ip')
         celery_logger.debug(
             "add_fixed_ip task finished at %s." % datetime.now()
         )
@@ -462,6 +519,7 @@ def deploy_failed(
         celery_logger.info("exception_msg=%s" % (exception_msg, ))
         err_str = "DEPLOYERROR::%s" % (traceback, )
         celery_logger.error(err_str)
+        end_stage(instance_id, succeeded=False)
         driver = get_driver(driverCls, provider, identity)
         instance = driver.get_instance(instance_id)
         limited_trace = str(traceback)[-255:]
@@ -1004,6 +1062,7 @@ def deploy_ready_test(
     Before making call to retry, send _deploy_ready_failed_email_test the
     current number of retries, max retries, etc. to see if additional action should be taken.
     """
+    start_stage(instance_id, 'deploy_ready_test')
     current_count = current.request.retries + 1
     total = deploy_ready_test.max_retries
     celery_logger.debug(
@@ -1052,6 +1111,7 @@ def deploy_ready_test(
         _update_status_log(
             instance, "Ansible Finished (ready test) for %s." % instance.ip
         )
+        end_stage(instance_id, 'deploy_ready_test')
         celery_logger.debug(
             "deploy_ready_test task finished at %s." % datetime.now()
         )
@@ -1138,6 +1198,7 @@ def _deploy_instance(
     redeploy=False,
     **celery_task_args
 ):
+    start_stage(instance_id, 'deploy_instance')
     try:
         celery_logger.debug(
             "_deploy_instance task started at %s." % datetime.now()
@@ -1164,10 +1225,29 @@ def _deploy_instance(
     except (BaseException, Exception) as exc:
         celery_logger.exception(exc)
         _deploy_instance.retry(exc=exc)
+    request = current.request
+    if getattr(settings, 'INSTANCE_DEPLOY_BATCH', False)\
+            and not request.called_directly:
+        # Deployed with the instances queued during the batch window
+        queue_deploy(
+            request.id,
+            instance.ip,
+            identity.user.username,
+            instance_id,
+            callbacks=request.callbacks,
+            errbacks=request.errbacks
+        )
+        window = getattr(settings, 'INSTANCE_DEPLOY_BATCH_WINDOW', 30)
+        # A single run for every instance queued during the window
+        if schedule_run(window):
+            deploy_queued_instances_task.apply_async(countdown=window)
+        # The batch, not this task, calls the linked tasks
+        raise Ignore()
     try:
         username = identity.user.username
         instance_deploy(instance.ip, username, instance_id)
         _update_status_log(instance, "Ansible Finished for %s." % instance.ip)
+        end_stage(instance_id, 'deploy_instance')
         celery_logger.debug(
             "_deploy_instance task finished at %s." % datetime.now()
         )
@@ -1179,12 +1259,27 @@ def _deploy_instance(
         _deploy_instance.retry(exc=exc)
 
 
+@task(
+    name="deploy_queued_instances", ignore_result=True, soft_time_limit=32 * 60
+)
+def deploy_queued_instances_task():
+    """
+    Deploy to the instances queued by `_deploy_instance`
+    (with INSTANCE_DEPLOY_BATCH)
+    """
+    retried = deploy_queued_instances()
+    countdown = _deploy_instance.default_retry_delay
+    if retried and schedule_run(countdown):
+        deploy_queued_instances_task.apply_async(countdown=countdown)
+
+
 @task(name="check_web_desktop_task", max_retries=4, default_retry_delay=15)
 def check_web_desktop_task(
     driverCls, provider, identity, instance_alias, *args, **kwargs
 ):
     """
     """
+    start_stage(instance_alias, 'check_web_desktop')
     try:
         celery_logger.debug(
             "check_web_desktop_task started at %s." % datetime.now()
@@ -1214,6 +1309,7 @@ def check_web_desktop_task(
         core_instance = Instance.objects.get(provider_alias=instance_alias)
         core_instance.web_desktop = desktop_enabled
         core_instance.save()
+        end_stage(instance_alias, 'check_web_desktop')
         celery_logger.debug(
             "check_web_desktop_task finished at %s." % datetime.now()
         )
@@ -1359,6 +1455,7 @@ def add_floating_ip(
     if app.conf.CELERY_ALWAYS_EAGER:
         celery_logger.debug("Eager task waiting 15 seconds")
         time.sleep(15)
+    start_stage(instance_alias, 'add_floating_ip')
     try:
         celery_logger.debug(
             "add_floating_ip task started at %s." % datetime.now()
@@ -1474,6 +1571,7 @@ def add_floating_ip(
             "Assigned IP:%s - Hostname:%s" % (floating_ip, hostname)
         )
         # End
+        end_stage(instance_alias, 'add_floating_ip')
         celery_logger.debug(
             "add_floating_ip task finished at %s." % datetime.now()
         )
@@ -1,6 +1,10 @@
+import time
 from datetime import timedelta
+from multiprocessing.pool import ThreadPool
 
+from django import db
 from django.conf import settings
+from django.db import transaction
 from django.db.models import Q, Count
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
@@ -16,6 +20,7 @@ from core.models.group import Group
 from core.models.size import Size, convert_esh_size
 from core.models.volume import Volume, convert_esh_volume
 from core.models.instance import convert_esh_instance
+from core.models.instance_source import InstanceSource
 from core.models.provider import Provider
 from core.models.machine import convert_glance_image, ProviderMachine, ProviderMachineMembership
 from core.models.machine_request import MachineRequest
@@ -24,7 +29,7 @@ from core.models.allocation_source import AllocationSource
 from core.models.application_version import ApplicationVersion
 
 from service.machine import (
-    update_db_membership_for_group, update_cloud_membership_for_machine,
+    bulk_update_db_membership, update_cloud_membership_for_machine,
     remove_membership
 )
 from service.monitoring import (
@@ -33,6 +38,9 @@ from service.monitoring import (
 )
 from service.driver import get_account_driver
 from service.cache import get_cached_driver
+from service.reconcile import (
+    reconcile, end_date_machines, end_date_models, end_date_sources
+)
 from service.exceptions import TimeoutError
 from rtwo.models.size import OSSize
 from rtwo.exceptions import GlanceConflict, GlanceForbidden
@@ -77,8 +85,10 @@ def tenant_id_to_name_map(account_driver):
     Get a list of projects
     OUTPUT: A dictionary with keys of ID and values of name
     """
-    all_projects = account_driver.list_projects()
-    return {tenant.id: tenant.name for tenant in all_projects}
+    return {
+        tenant_id: tenant.name
+        for (tenant_id, tenant) in account_driver.project_map().items()
+    }
 
 
 @task(name="prune_machines")
@@ -220,46 +230,98 @@ def monitor_machines_for(
         cloud_machines = [
             cm for cm in cloud_machines if cm.id in limit_machines
         ]
-    db_machines = []
     # ASSERT: All non-end-dated machines in the DB can be found in the cloud
     # if you do not believe this is the case, you should call 'prune_machines_for'
     machine_validator = MachineValidationPluginManager.get_validator(
         account_driver
     )
+    cloud_machines = [
+        cloud_machine for cloud_machine in cloud_machines
+        if not validate or machine_validator.machine_is_valid(cloud_machine)
+    ]
+    chunk_size = getattr(settings, 'MONITOR_MACHINES_CHUNK_SIZE', 500)
+    db_machines = []
+    for index in range(0, len(cloud_machines), chunk_size):
+        db_machines.extend(
+            _sync_machines(
+                account_driver, provider,
+                cloud_machines[index:index + chunk_size]
+            )
+        )
+
+    # ASSERTIONS about this method:
+    # 1) We will never 'remove' membership,
+    # 2) We will never 'remove' a public or private flag as listed in application.
+    # 2b) Future: Individual versions/machines as described by relationships above dictate whats shown in the application.
+
+    if print_logs:
+        _exit_stdout_logging(console_handler)
+    return db_machines
+
+
+def _sync_machines(account_driver, provider, cloud_machines):
+    """
+    Register `cloud_machines` in the DB and update their memberships.
+
+    Machines already known to the DB are fetched with a single query and
+    their changes (size, memberships) are written in bulk, inside one
+    transaction. Only new images go through `convert_glance_image`.
+    Return the list of (non-end-dated) ProviderMachines.
+    """
+    known_machines = {
+        db_machine.instance_source.identifier: db_machine
+        for db_machine in ProviderMachine.objects.filter(
+            instance_source__provider=provider,
+            instance_source__identifier__in=[cm.id for cm in cloud_machines]
+        ).select_related('instance_source', 'application_version__application')
+    }
+    db_machines = []
+    synced_machines = []
+    resized_sources = {}
     for cloud_machine in cloud_machines:
-        if validate and not machine_validator.machine_is_valid(cloud_machine):
-            continue
-        owner = cloud_machine.get('owner')
-        if owner:
-            owner_project = account_driver.get_project_by_id(owner)
-        else:
-            owner = cloud_machine.get('application_owner')
-            owner_project = account_driver.get_project(owner)
         #STEP 1: Get the application, version, and provider_machine registered in Atmosphere
-        (db_machine, created) = convert_glance_image(
-            account_driver, cloud_machine, provider.uuid, owner_project
-        )
+        db_machine = known_machines.get(cloud_machine.id)
         if not db_machine:
+            (db_machine, _) = convert_glance_image(
+                account_driver, cloud_machine, provider.uuid,
+                _get_owner_project(account_driver, cloud_machine)
+            )
+            if not db_machine:
+                continue
+        elif db_machine.is_end_dated():
             continue
+        else:
+            size_bytes = cloud_machine.get('size')
+            if size_bytes and size_bytes != db_machine.instance_source.size_bytes:
+                resized_sources.setdefault(size_bytes, []).append(
+                    db_machine.instance_source_id
+                )
         db_machines.append(db_machine)
-        #STEP 2: For any private cloud_machine, convert the 'shared users' as known by cloud
-        #        into DB relationships: ApplicationVersionMembership, ProviderMachineMembership
-        update_image_membership(account_driver, cloud_machine, db_machine)
-
-        # STEP 3: if ENFORCING -- occasionally 're-distribute' any ACLs that
-        # are *listed on DB but not on cloud* -- removals should be done
-        # explicitly, outside of this function
-        if settings.ENFORCING:
+        synced_machines.append((cloud_machine, db_machine))
+
+    #STEP 2: For any private cloud_machine, convert the 'shared users' as known by cloud
+    #        into DB relationships: ApplicationVersionMembership, ProviderMachineMembership
+    machine_groups = get_image_memberships(account_driver, synced_machines)
+    with transaction.atomic():
+        for (size_bytes, source_ids) in resized_sources.items():
+            InstanceSource.objects.filter(id__in=source_ids
+                                         ).update(size_bytes=size_bytes)
+        bulk_update_db_membership(machine_groups)
+
+    # STEP 3: if ENFORCING -- occasionally 're-distribute' any ACLs that
+    # are *listed on DB but not on cloud* -- removals should be done
+    # explicitly, outside of this function
+    if settings.ENFORCING:
+        for (cloud_machine, db_machine) in synced_machines:
             distribute_image_membership(account_driver, cloud_machine, provider)
+    return db_machines
 
-        # ASSERTIONS about this method:
-        # 1) We will never 'remove' membership,
-        # 2) We will never 'remove' a public or private flag as listed in application.
-        # 2b) Future: Individual versions/machines as described by relationships above dictate whats shown in the application.
 
-    if print_logs:
-        _exit_stdout_logging(console_handler)
-    return db_machines
+def _get_owner_project(account_driver, cloud_machine):
+    owner = cloud_machine.get('owner')
+    if owner:
+        return account_driver.get_project_by_id(owner)
+    return account_driver.get_project(cloud_machine.get('application_owner'))
 
 
 def distribute_image_membership(account_driver, cloud_machine, provider):
@@ -289,9 +351,12 @@ def distribute_image_membership(account_driver, cloud_machine, provider):
     return groups
 
 
-def _get_all_access_list(account_driver, db_machine, cloud_machine):
+def _get_all_access_list(
+    account_driver, db_machine, cloud_machine, machine_request=None
+):
     """
-    Input: AccountDriver, ProviderMachine, glance_image
+    Input: AccountDriver, ProviderMachine, glance_image,
+           the last completed MachineRequest for glance_image (if any)
     Output: A list of _all project names_ that should be included on `cloud_machine`
 
     This list will include:
@@ -321,13 +386,9 @@ def _get_all_access_list(account_driver, db_machine, cloud_machine):
     # Extend to include based on projects already granted access to the image
     cloud_shared_set = {p.name for p in existing_members}
 
-    has_machine_request = MachineRequest.objects.filter(
-        new_machine__instance_source__identifier=cloud_machine.id,
-        status__name='completed'
-    ).last()
     machine_request_set = set()
-    if has_machine_request:
-        access_list = has_machine_request.get_access_list()
+    if machine_request:
+        access_list = machine_request.get_access_list()
         # NOTE: This assumes that every name in
         #      accesslist (AtmosphereUser) == project_name(Openstack)
         machine_request_set = {name.strip() for name in access_list}
@@ -345,17 +406,46 @@ def _get_all_access_list(account_driver, db_machine, cloud_machine):
     return shared_project_names
 
 
-def update_image_membership(account_driver, cloud_machine, db_machine):
+def get_image_memberships(account_driver, synced_machines):
     """
-    Given a cloud_machine and db_machine, create any relationships possible for ProviderMachineMembership and ApplicationVersionMembership
-    Return a list of all group names who have been given share access.
+    Given a list of (cloud_machine, db_machine), return a list of (db_machine, groups) for every group that should be given share access.
     """
-    image_visibility = cloud_machine.get('visibility', 'private')
-    if image_visibility.lower() == 'public':
-        return
-    shared_project_names = _get_all_access_list(
-        account_driver, db_machine, cloud_machine
-    )
+    private_machines = [
+        (cloud_machine, db_machine)
+        for (cloud_machine, db_machine) in synced_machines
+        if cloud_machine.get('visibility', 'private').lower() != 'public'
+    ]
+    if not private_machines:
+        return []
+    machine_requests = {}
+    for machine_request in MachineRequest.objects.filter(
+        new_machine__instance_source__identifier__in=[
+            cloud_machine.id for (cloud_machine, _) in private_machines
+        ],
+        status__name='completed'
+    ).select_related('new_machine__instance_source').order_by('id'):
+        # Keep the last completed request for each image
+        machine_requests[machine_request.new_machine.instance_source.identifier
+                        ] = machine_request
+
+    shared_names_by_machine = []
+    for (cloud_machine, db_machine) in private_machines:
+        machine_request = machine_requests.get(cloud_machine.id)
+        shared_project_names = _get_all_access_list(
+            account_driver, db_machine, cloud_machine, machine_request
+        )
+        # THIS IS A HACK - some images have been 'compromised' in this event,
+        # reset the access list _back_ to the last-known-good configuration, based
+        # on a machine request.
+        if len(shared_project_names) > 128:
+            celery_logger.warn(
+                "Application %s has too many shared users. Consider running 'prune_machines' to cleanup",
+                db_machine.application_version.application
+            )
+            if not machine_request:
+                continue
+        #ENDHACK
+        shared_names_by_machine.append((db_machine, shared_project_names))
 
     #Future-FIXME: This logic expects project_name == Group.name
     #       When this changes, logic should update to include checks for:
@@ -363,71 +453,21 @@ def update_image_membership(account_driver, cloud_machine, db_machine):
     #       - Share with group that has IdentityMembership
     #       - Alternatively, consider changing ProviderMachineMembership
     #       to point to Identity for a 1-to-1 mapping.
-    groups = Group.objects.filter(name__in=shared_project_names)
-
-    # THIS IS A HACK - some images have been 'compromised' in this event,
-    # reset the access list _back_ to the last-known-good configuration, based
-    # on a machine request.
-    has_machine_request = MachineRequest.objects.filter(
-        new_machine__instance_source__identifier=cloud_machine.id,
-        status__name='completed'
-    ).last()
-    parent_app = db_machine.application_version.application
-    if len(shared_project_names) > 128:
-        celery_logger.warn(
-            "Application %s has too many shared users. Consider running 'prune_machines' to cleanup",
-            parent_app
-        )
-        if not has_machine_request:
-            return
-        access_list = has_machine_request.get_access_list()
-        shared_project_names = access_list
-    #ENDHACK
-    for group in groups:
-        update_db_membership_for_group(db_machine, group)
-    return groups
-
-
-def remove_machine(db_machine, now_time=None, dry_run=False):
-    """
-    End date the DB ProviderMachine
-    If all PMs are end-dated, End date the ApplicationVersion
-    if all Versions are end-dated, End date the Application
-    """
-    if not now_time:
-        now_time = timezone.now()
-
-    db_machine.end_date = now_time
-    celery_logger.info("End dating machine: %s" % db_machine)
-    if not dry_run:
-        db_machine.save()
-
-    db_version = db_machine.application_version
-    if db_version.machines.filter(
-    # Look and see if all machines are end-dated.
-        Q(instance_source__end_date__isnull=True) |
-        Q(instance_source__end_date__gt=now_time)
-    ).count() != 0:
-        # Other machines exist.. No cascade necessary.
-        return True
-    # Version also completely end-dated. End date this version.
-    db_version.end_date = now_time
-    celery_logger.info("End dating version: %s" % db_version)
-    if not dry_run:
-        db_version.save()
-
-    db_application = db_version.application
-    if db_application.versions.filter(
-    # If all versions are end-dated
-        only_current(now_time)
-    ).count() != 0:
-        # Other versions exist.. No cascade necessary..
-        return True
-    db_application.end_date = now_time
-    celery_logger.info("End dating application: %s" % db_application)
-    if not dry_run:
-        db_application.save()
-    return True
+    all_names = set()
+    for (_, shared_project_names) in shared_names_by_machine:
+        all_names.update(shared_project_names)
+    groups_by_name = {
+        group.name: group
+        for group in Group.objects.filter(name__in=all_names)
+    }
+    return [
+        (
+            db_machine, [
+                groups_by_name[name]
+                for name in set(shared_project_names) if name in groups_by_name
+            ]
+        ) for (db_machine, shared_project_names) in shared_names_by_machine
+    ]
 
 
 def memoized_image(account_driver, db_machine, image_maps={}):
@@ -629,13 +669,20 @@ def allocation_source_overage_enforcement_for_user(allocation_source, user):
 
 @task(name="monitor_instances_for")
 def monitor_instances_for(
-    provider_id, users=None, print_logs=False, start_date=None, end_date=None
+    provider_id,
+    users=None,
+    print_logs=False,
+    start_date=None,
+    end_date=None,
+    concurrency=None
 ):
     """
     Run the set of tasks related to monitoring instances for a provider.
     Optionally, provide a list of usernames to monitor
     While debugging, print_logs=True can be very helpful.
     start_date and end_date allow you to search a 'non-standard' window of time.
+    concurrency overrides settings.MONITOR_INSTANCES_CONCURRENCY, the number
+    of threads used to process batches of tenants (1 == serial).
     """
     provider = Provider.objects.get(id=provider_id)
 
@@ -646,34 +693,30 @@ def monitor_instances_for(
 
     if print_logs:
         console_handler = _init_stdout_logging()
-    seen_instances = []
-    # DEVNOTE: Potential slowdown running multiple functions
-    # Break this out when instance-caching is enabled
     if not settings.ENFORCING:
         celery_logger.debug('Settings dictate allocations are NOT enforced')
-    for tenant_name in sorted(instance_map.keys()):
-        running_instances = instance_map[tenant_name]
-        identity = _get_identity_from_tenant_name(provider, tenant_name)
-        if identity and running_instances:
-            try:
-                driver = get_cached_driver(identity=identity)
-                core_running_instances = [
-                    convert_esh_instance(
-                        driver, inst, identity.provider.uuid, identity.uuid,
-                        identity.created_by
-                    ) for inst in running_instances
-                ]
-                seen_instances.extend(core_running_instances)
-            except Exception:
-                celery_logger.exception(
-                    "Could not convert running instances for %s" % tenant_name
-                )
-                continue
-        else:
-            # No running instances.
-            core_running_instances = []
-        # Using the 'known' list of running instances, cleanup the DB
-        _cleanup_missing_instances(identity, core_running_instances)
+    if not concurrency:
+        concurrency = getattr(settings, 'MONITOR_INSTANCES_CONCURRENCY', 1)
+    batch_size = getattr(settings, 'MONITOR_INSTANCES_BATCH_SIZE', 50)
+    tenant_names = sorted(instance_map.keys())
+    batches = [
+        tenant_names[index:index + batch_size]
+        for index in range(0, len(tenant_names), batch_size)
+    ]
+    if concurrency > 1 and len(batches) > 1:
+        pool = ThreadPool(processes=min(concurrency, len(batches)))
+        try:
+            pool.map(
+                lambda batch: _monitor_instances_batch(
+                    provider, instance_map, batch, close_connection=True
+                ), batches
+            )
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for batch in batches:
+            _monitor_instances_batch(provider, instance_map, batch)
     if print_logs:
         _exit_stdout_logging(console_handler)
     # return seen_instances  NOTE: this has been commented out to avoid PicklingError!
@@ -681,6 +724,64 @@ def monitor_instances_for(
     return
 
 
+def _monitor_instances_batch(
+    provider, instance_map, tenant_names, close_connection=False
+):
+    """
+    Monitor the instances of every tenant in `tenant_names`.
+
+    A failure on one tenant is logged and does not stop the rest of the
+    batch. When run from a worker thread, close_connection=True releases the
+    thread's database connection once the batch is done.
+    """
+    start_time = time.time()
+    failed = 0
+    try:
+        for tenant_name in tenant_names:
+            try:
+                _monitor_tenant_instances(
+                    provider, tenant_name, instance_map[tenant_name]
+                )
+            except Exception:
+                failed += 1
+                celery_logger.exception(
+                    "Could not monitor instances for %s" % tenant_name
+                )
+    finally:
+        if close_connection:
+            db.connection.close()
+    celery_logger.info(
+        "Monitored instances for %s tenants (%s - %s) on %s in %.2fs, "
+        "%s failed" % (
+            len(tenant_names), tenant_names[0], tenant_names[-1], provider,
+            time.time() - start_time, failed
+        )
+    )
+
+
+def _monitor_tenant_instances(provider, tenant_name, running_instances):
+    identity = _get_identity_from_tenant_name(provider, tenant_name)
+    if identity and running_instances:
+        try:
+            driver = get_cached_driver(identity=identity)
+            core_running_instances = [
+                convert_esh_instance(
+                    driver, inst, identity.provider.uuid, identity.uuid,
+                    identity.created_by
+                ) for inst in running_instances
+            ]
+        except Exception:
+            celery_logger.exception(
+                "Could not convert running instances for %s" % tenant_name
+            )
+            return
+    else:
+        # No running instances.
+        core_running_instances = []
+    # Using the 'known' list of running instances, cleanup the DB
+    _cleanup_missing_instances(identity, core_running_instances)
+
+
 @task(name="monitor_volumes")
 def monitor_volumes():
     """
@@ -708,7 +809,7 @@ def monitor_volumes_for(provider_id, print_logs=False):
     # Non-End dated volumes on this provider
     db_volumes = Volume.objects.filter(
         only_current_source(), instance_source__provider=provider
-    )
+    ).select_related('instance_source')
     all_volumes = account_driver.admin_driver.list_all_volumes(timeout=30)
     seen_volumes = []
     for cloud_volume in all_volumes:
@@ -747,14 +848,10 @@ def monitor_volumes_for(provider_id, print_logs=False):
                 )
             pass
 
-    now_time = timezone.now()
-    needs_end_date = [
-        volume for volume in db_volumes if volume not in seen_volumes
-    ]
-    for volume in needs_end_date:
+    diff = _reconcile_models(db_volumes, seen_volumes)
+    for volume in diff.removed:
         celery_logger.debug("End dating inactive volume: %s" % volume)
-        volume.end_date = now_time
-        volume.save()
+    end_date_sources(diff.removed)
 
     if print_logs:
         _exit_stdout_logging(console_handler)
@@ -795,12 +892,10 @@ def monitor_sizes_for(provider_id, print_logs=False):
         core_size = convert_esh_size(cloud_size, provider.uuid)
         seen_sizes.append(core_size)
 
-    now_time = timezone.now()
-    needs_end_date = [size for size in db_sizes if size not in seen_sizes]
-    for size in needs_end_date:
+    diff = _reconcile_models(db_sizes, seen_sizes)
+    for size in diff.removed:
         celery_logger.debug("End dating inactive size: %s" % size)
-        size.end_date = now_time
-        size.save()
+    end_date_models(Size, diff.removed)
 
     # Find home for 'Unknown Size'
     unknown_sizes = Size.objects.filter(
@@ -830,6 +925,18 @@ def monitor_sizes_for(provider_id, print_logs=False):
     return seen_sizes
 
 
+def _reconcile_models(db_models, seen_models):
+    """
+    Reconcile DB models against the (converted) models seen on the cloud.
+    """
+    return reconcile(
+        db_models,
+        seen_models,
+        db_key=lambda model: model.id,
+        cloud_key=lambda model: model.id
+    )
+
+
 def _clean_memberships(db_machines, acct_driver=None):
     """
     For each db_machine, check the # of shared access.
@@ -857,15 +964,21 @@ def _end_date_missing_database_machines(
 ):
     if not now:
         now = timezone.now()
-    mach_count = 0
-    cloud_machine_ids = [mach.id for mach in cloud_machines]
-    for machine in db_machines:
-        cloud_match = [
-            mach for mach in cloud_machine_ids if mach == machine.identifier
-        ]
-        if not cloud_match:
-            remove_machine(machine, now, dry_run=dry_run)
-            mach_count += 1
+    diff = reconcile(
+        db_machines.select_related('instance_source'),
+        cloud_machines,
+        db_key=lambda machine: machine.instance_source.identifier,
+        cloud_key=lambda mach: mach.id
+    )
+    for machine in diff.removed:
+        celery_logger.info("End dating machine: %s" % machine)
+    if dry_run:
+        return len(diff.removed)
+    (mach_count, ver_count, app_count) = end_date_machines(diff.removed, now)
+    celery_logger.info(
+        "End dated %s machines, %s versions and %s applications "
+        "missing from the cloud" % (mach_count, ver_count, app_count)
+    )
     return mach_count
 
 
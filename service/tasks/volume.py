@@ -200,7 +200,7 @@ def attach_task(
 ):
     celery_logger.debug("attach_task started at %s." % timezone.now())
     driver = get_driver(driverCls, provider, identity)
-    from service.volume import attach_volume
+    from service.volume import attach_volume, invalidate_cached_volumes_of
     attach_volume(driver, instance_id, volume_id, device_choice=device_choice)
 
     attempts = 0
@@ -226,6 +226,7 @@ def attach_task(
         time.sleep(10)
         attempts += 1
 
+    invalidate_cached_volumes_of(driver)
     try:
         attach_data = volume.extra['attachments'][0]
         device = attach_data['device']
@@ -279,6 +280,8 @@ def detach_task(
             )
             time.sleep(sleep_time)
 
+        from service.volume import invalidate_cached_volumes_of
+        invalidate_cached_volumes_of(driver)
         if 'in-use' in volume.extra['status']:
             raise Exception(
                 "Failed to detach Volume %s to instance %s" %
@@ -0,0 +1,109 @@
+from django.test import TestCase
+import mock
+
+from api.tests.factories import ProviderFactory, UserFactory
+from core.models import AtmosphereUser
+from service.accounts.openstack_manager import AccountDriver
+from service.tasks.accounts import create_accounts_for
+
+
+def keystone_user(name):
+    user = mock.Mock()
+    # 'name' is taken by the Mock constructor
+    user.name = name
+    return user
+
+
+class BuildAccountTest(TestCase):
+    def setUp(self):
+        with mock.patch.object(AccountDriver, '__init__', return_value=None):
+            self.accounts = AccountDriver()
+        self.accounts.identity_version = 2
+        self.accounts.user_manager = mock.Mock()
+        self.accounts.get_config = mock.Mock(return_value='member')
+        self.accounts.init_keypair = mock.Mock()
+        self.accounts.list_users = mock.Mock(
+            return_value=[keystone_user('existing')]
+        )
+
+    def test_users_are_looked_up_in_the_index(self):
+        users = self.accounts.user_index()
+        timings = {}
+        self.accounts.build_account(
+            'existing', 'password', timings=timings, users=users
+        )
+        self.accounts.build_account('new', 'password', users=users)
+        self.assertEqual(self.accounts.list_users.call_count, 1)
+        self.assertEqual(self.accounts.user_manager.create_user.call_count, 1)
+        self.assertIn('new', users)
+        self.assertEqual(
+            sorted(timings), ['keypair', 'membership', 'project', 'user']
+        )
+
+
+class CreateAccountsTest(TestCase):
+    def setUp(self):
+        with mock.patch.object(AccountDriver, '__init__', return_value=None):
+            self.accounts = AccountDriver()
+        self.accounts.list_users = mock.Mock(return_value=[])
+
+        def create_account(username, project_name, timings, users, **kwargs):
+            if project_name == 'broken':
+                raise ValueError("Could not create %s" % project_name)
+            timings['identity'] = 1.0
+            return mock.Mock(uuid='%s-%s' % (username, project_name))
+
+        self.accounts.create_account = mock.Mock(side_effect=create_account)
+
+    def test_results_are_reported_per_account(self):
+        results = self.accounts.create_accounts(
+            [
+                {
+                    'username': 'alice',
+                    'project_name': 'alice'
+                },
+                {
+                    'username': 'bob',
+                    'project_name': 'broken'
+                },
+                {
+                    'username': 'alice',
+                    'project_name': 'shared'
+                },
+            ],
+            concurrency=2
+        )
+        self.assertEqual(
+            [(result['username'], result['identity']) for result in results], [
+                ('alice', 'alice-alice'), ('alice', 'alice-shared'),
+                ('bob', None)
+            ]
+        )
+        self.assertEqual(results[0]['timings'], {'identity': 1.0})
+        self.assertEqual(
+            results[2]['error'], "ValueError: Could not create broken"
+        )
+        self.assertEqual(self.accounts.list_users.call_count, 1)
+
+
+class CreateAccountsForTest(TestCase):
+    def test_unknown_users_are_reported_not_created(self):
+        provider = ProviderFactory.create()
+        user = UserFactory.create()
+        with mock.patch(
+            'service.tasks.accounts.AccountCreationPluginManager'
+        ) as manager:
+            manager.create_many_accounts.return_value = []
+            results = create_accounts_for(
+                provider.id, [user.username, 'nobody']
+            )
+        manager.create_many_accounts.assert_called_once_with(
+            provider, [user.username], force=False, concurrency=None
+        )
+        self.assertEqual(
+            [(result['username'], result['error']) for result in results],
+            [('nobody', "No user named nobody")]
+        )
+        self.assertFalse(
+            AtmosphereUser.objects.filter(username='nobody').exists()
+        )
@@ -0,0 +1,74 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from service.allocation_logic import (
+    get_allocation_source_name_from_event, map_events_to_histories
+)
+
+History = namedtuple('History', ['id', 'start_date', 'end_date'])
+Event = namedtuple(
+    'Event', [
+        'timestamp', 'username', 'allocation_source_name',
+        'allocation_source_uuid'
+    ]
+)
+
+
+class MapEventsToHistoriesTest(TestCase):
+    def test_event_maps_to_latest_history_running_at_timestamp(self):
+        now = timezone.now()
+        histories = {
+            'alias':
+                [
+                    History(1, now, None),
+                    History(
+                        2, now + timedelta(hours=1), now + timedelta(hours=2)
+                    ),
+                    History(3, now + timedelta(hours=3), None),
+                ]
+        }
+        inside_second = Event(now + timedelta(minutes=90), '', None, None)
+        between = Event(now + timedelta(minutes=150), '', None, None)
+        before_all = Event(now - timedelta(hours=1), '', None, None)
+
+        mapped = map_events_to_histories(
+            histories, {'alias': [inside_second, between, before_all]}
+        )
+
+        self.assertEqual(mapped, {2: [inside_second], 1: [between]})
+
+
+class AllocationSourceNameFromEventTest(TestCase):
+    def test_last_matching_event_before_history_start_wins(self):
+        now = timezone.now()
+        events = {
+            'alias':
+                [
+                    Event(now - timedelta(hours=3), 'user', 'first', None),
+                    Event(now - timedelta(hours=2), 'other', 'not-mine', None),
+                    Event(now - timedelta(hours=1), 'user', None, 'abc'),
+                    Event(now, 'user', 'too-late', None),
+                ]
+        }
+        names = ({'first', 'not-mine', 'too-late'}, {'abc': 'second'})
+
+        self.assertEqual(
+            get_allocation_source_name_from_event(
+                'user', now - timedelta(days=1), 'alias', now, events, names
+            ), 'second'
+        )
+        self.assertEqual(
+            get_allocation_source_name_from_event(
+                'user', now - timedelta(days=1), 'alias',
+                now - timedelta(minutes=90), events, names
+            ), 'first'
+        )
+        self.assertFalse(
+            get_allocation_source_name_from_event(
+                'user', now - timedelta(days=1), 'alias',
+                now - timedelta(hours=4), events, names
+            )
+        )
@@ -0,0 +1,161 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+import mock
+import redis
+
+from api.tests.factories import IdentityFactory
+from core.models import Credential
+from service.cache import (
+    DriverCache, client_cache, driver_cache, get_cached_client,
+    get_cached_driver, get_cached_volumes, get_client_stats, _client_lookups,
+    _get_cached
+)
+from service.volume import invalidate_cached_volumes_of
+
+
+class DriverCacheTest(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = DriverCache(max_size=2)
+        cache.set('a', 'fp', 'driver-a', float('inf'))
+        cache.set('b', 'fp', 'driver-b', float('inf'))
+        # Touch 'a' so that 'b' becomes the least recently used
+        self.assertEqual(cache.get('a', 'fp'), 'driver-a')
+        cache.set('c', 'fp', 'driver-c', float('inf'))
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+
+    def test_expired_entry_is_not_returned(self):
+        cache = DriverCache()
+        cache.set('a', 'fp', 'driver-a', 0)
+        self.assertIsNone(cache.get('a', 'fp'))
+        self.assertNotIn('a', cache)
+
+    def test_fingerprint_mismatch_is_not_returned(self):
+        cache = DriverCache()
+        cache.set('a', 'fp', 'driver-a', float('inf'))
+        self.assertIsNone(cache.get('a', 'other-fp'))
+
+
+class GetCachedDriverTest(TestCase):
+    def setUp(self):
+        driver_cache.clear()
+        self.identity = IdentityFactory.create()
+
+    def test_driver_is_reused_until_credentials_change(self):
+        with mock.patch('service.cache.get_esh_driver') as get_esh_driver:
+            get_esh_driver.side_effect = lambda identity: object()
+            first = get_cached_driver(identity=self.identity)
+            self.assertIs(get_cached_driver(identity=self.identity), first)
+            self.assertEqual(get_esh_driver.call_count, 1)
+
+            Credential.objects.create(
+                identity=self.identity, key='secret', value='rotated'
+            )
+            self.assertIsNot(get_cached_driver(identity=self.identity), first)
+            self.assertEqual(get_esh_driver.call_count, 2)
+
+    def test_force_rebuilds_driver(self):
+        with mock.patch('service.cache.get_esh_driver') as get_esh_driver:
+            get_esh_driver.side_effect = lambda identity: object()
+            first = get_cached_driver(identity=self.identity)
+            second = get_cached_driver(identity=self.identity, force=True)
+            self.assertIsNot(first, second)
+
+    def test_force_rebuilds_driver_of_cached_list(self):
+        with mock.patch('service.cache.get_esh_driver') as get_esh_driver, \
+                mock.patch('service.cache._get_cached', return_value=[]):
+            get_esh_driver.side_effect = lambda identity: mock.Mock()
+            get_cached_volumes(identity=self.identity)
+            get_cached_volumes(identity=self.identity, force=True)
+            self.assertEqual(get_esh_driver.call_count, 2)
+
+    def test_volume_changes_invalidate_the_users_volume_lists(self):
+        driver = mock.Mock()
+        driver.identity.user = self.identity.created_by
+        with mock.patch(
+            'service.volume.invalidate_cached_volumes'
+        ) as invalidate:
+            invalidate_cached_volumes_of(driver)
+        invalidate.assert_called_once_with(identity=self.identity)
+
+
+class GetCachedTest(TestCase):
+    def test_redis_connection_error_bypasses_cache(self):
+        unavailable = mock.Mock()
+        unavailable.hgetall.side_effect = redis.exceptions.ConnectionError()
+        with mock.patch(
+            'service.cache.redis_connection', return_value=unavailable
+        ):
+            data = _get_cached(
+                'instances.test', 'instances', lambda: ['a', 'b'],
+                lambda _: None
+            )
+        self.assertEqual(data, ['a', 'b'])
+        self.assertFalse(unavailable.pipeline.called)
+
+
+class GetCachedClientTest(TestCase):
+    def setUp(self):
+        client_cache.clear()
+        _client_lookups.clear()
+        self.redis = mock.Mock()
+        patcher = mock.patch(
+            'service.cache.redis_connection', return_value=self.redis
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.creds = {
+            'username': 'user',
+            'password': 'secret',
+            'tenant_name': 'project'
+        }
+
+    def test_client_is_reused_until_credentials_change(self):
+        build_client = mock.Mock(side_effect=lambda creds: object())
+        first = get_cached_client(
+            'provider', 'neutron', self.creds, build_client
+        )
+        self.assertIs(
+            get_cached_client('provider', 'neutron', self.creds, build_client),
+            first
+        )
+        self.assertEqual(build_client.call_count, 1)
+
+        self.creds['password'] = 'rotated'
+        self.assertIsNot(
+            get_cached_client('provider', 'neutron', self.creds, build_client),
+            first
+        )
+
+    @override_settings(OPENSTACK_CLIENT_STATS_INTERVAL=60 * 60)
+    def test_lookups_are_counted_in_memory(self):
+        build_client = mock.Mock(side_effect=lambda creds: object())
+        get_cached_client('provider', 'neutron', self.creds, build_client)
+        get_cached_client('provider', 'neutron', self.creds, build_client)
+        self.assertFalse(self.redis.pipeline.called)
+
+        pipe = self.redis.pipeline.return_value
+        self.redis.hgetall.return_value = {
+            'neutron.hit': '1',
+            'neutron.miss': '1'
+        }
+        self.assertEqual(get_client_stats(), {'neutron': {'hit': 1, 'miss': 1}})
+        self.assertEqual(
+            sorted(pipe.hincrby.call_args_list), [
+                mock.call('openstack-client-cache', 'neutron.hit', 1),
+                mock.call('openstack-client-cache', 'neutron.miss', 1),
+            ]
+        )
+
+    def test_stats_bypass_unavailable_redis(self):
+        self.redis.hgetall.side_effect = redis.exceptions.ConnectionError()
+        self.assertEqual(get_client_stats(), {})
+
+    def test_client_expires_before_its_token(self):
+        client = mock.Mock()
+        client.session.auth.auth_ref.expires = timezone.now()
+        build_client = mock.Mock(return_value=client)
+        get_cached_client('provider', 'glance', self.creds, build_client)
+        get_cached_client('provider', 'glance', self.creds, build_client)
+        self.assertEqual(build_client.call_count, 2)
@@ -38,3 +38,30 @@ class UserDeployTests(TestCase):
             }
             self.assertIn(instance_script.get_title_slug(), script_titles)
             self.assertIn(image_script.get_title_slug(), script_titles)
+
+
+class ExecutePlaybooksManyTests(TestCase):
+    def test_failed_hosts_are_left_out_of_later_playbooks(self):
+        stats = mock.Mock(processed={'vm-a': 1, 'vm-b': 1})
+        stats.summarize.side_effect = lambda host: {
+            'unreachable': 0,
+            'failures': 1 if host == 'vm-b' else 0
+        }
+        with mock.patch(
+            'service.deploy._run_playbook', return_value=(2, stats)
+        ) as run_playbook:
+            from service.deploy import execute_playbooks_many
+            results = execute_playbooks_many(
+                '/playbooks', {}, {
+                    'vm-a': {},
+                    'vm-b': {}
+                },
+                forks=5,
+                limit_playbooks=['one.yml', 'two.yml']
+            )
+        self.assertEqual(results, {'vm-a': [0, 0], 'vm-b': [2]})
+        limits = [
+            [arg for arg in call[0][0] if arg.startswith('--limit=')]
+            for call in run_playbook.call_args_list
+        ]
+        self.assertEqual(limits, [['--limit=vm-a,vm-b'], ['--limit=vm-a']])
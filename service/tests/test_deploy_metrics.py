@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.factories import InstanceFactory
+from core.models import InstanceDeployStage
+from service.deploy_metrics import (
+    STAGE_METRIC, end_stage, render_stage_histograms, start_stage
+)
+
+
+class DeployStageTest(TestCase):
+    def setUp(self):
+        self.instance = InstanceFactory.create(provider_alias='instance-1')
+
+    def test_retried_stage_is_started_once(self):
+        start_stage('instance-1', 'add_floating_ip')
+        start_stage('instance-1', 'add_floating_ip')
+        end_stage('instance-1', 'add_floating_ip')
+        stage = InstanceDeployStage.objects.get(instance=self.instance)
+        self.assertTrue(stage.succeeded)
+        self.assertIsNotNone(stage.end_date)
+
+    def test_failure_ends_every_started_stage(self):
+        start_stage('instance-1', 'deploy_ready_test')
+        start_stage('instance-1', 'deploy_instance')
+        end_stage('instance-1', succeeded=False)
+        self.assertEqual(
+            InstanceDeployStage.objects.filter(
+                instance=self.instance, succeeded=False
+            ).count(), 2
+        )
+
+    def test_histograms_are_cumulative(self):
+        start_date = timezone.now()
+        InstanceDeployStage.objects.create(
+            instance=self.instance,
+            stage='deploy_instance',
+            start_date=start_date,
+            end_date=start_date + timedelta(seconds=20),
+            succeeded=True
+        )
+        histograms = render_stage_histograms()
+        labels = 'stage="deploy_instance",provider="%s",result="succeeded"' % (
+            self.instance.created_by_identity.provider.location
+        )
+        for (bucket, count) in [('15.0', 0), ('30.0', 1), ('+Inf', 1)]:
+            self.assertIn(
+                '%s_bucket{%s,le="%s"} %s' %
+                (STAGE_METRIC, labels, bucket, count), histograms
+            )
+        self.assertIn('%s_sum{%s} 20.0' % (STAGE_METRIC, labels), histograms)
@@ -0,0 +1,153 @@
+import time
+
+from django.test import TestCase, override_settings
+import mock
+
+from service import deploy_queue
+
+
+class FakePipeline(object):
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        return lambda *args: self.calls.append((method, args))
+
+    def execute(self):
+        return [method(*args) for (method, args) in self.calls]
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    def hsetnx(self, key, field, value):
+        if field in self.data.get(key, {}):
+            return 0
+        self.hset(key, field, value)
+        return 1
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hdel(self, key, *fields):
+        return len(
+            [
+                field
+                for field in fields if self.data.get(key, {}).pop(field, None)
+            ]
+        )
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@override_settings(INSTANCE_DEPLOY_MAX_RETRIES=2)
+class DeployQueueTest(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.failing = set()
+        patches = [
+            mock.patch(
+                'service.deploy_queue.redis_connection',
+                return_value=self.redis
+            ),
+            mock.patch(
+                'service.deploy_queue.instance_deploy_many', return_value={}
+            ),
+            mock.patch(
+                'service.deploy_queue.raise_playbook_errors',
+                side_effect=self.raise_playbook_errors
+            ),
+            mock.patch('service.deploy_queue.end_stage'),
+            mock.patch('service.deploy_queue.resume_chain'),
+            mock.patch('service.deploy_queue.fail_chain'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def raise_playbook_errors(self, errors, instance_id, instance_ip, _):
+        if instance_id in self.failing:
+            raise Exception("Deploy failed for %s" % instance_id)
+
+    def queue(self, instance_id, attempts=0):
+        deploy_queue.queue_deploy(
+            'task-%s' % instance_id,
+            '10.0.0.1',
+            'user',
+            instance_id,
+            callbacks=['callback-%s' % instance_id],
+            errbacks=['errback-%s' % instance_id],
+            attempts=attempts
+        )
+
+    def queued(self, key=deploy_queue.QUEUE_KEY):
+        return sorted(self.redis.hgetall(key))
+
+    def test_deployed_instances_resume_their_chain(self):
+        self.queue('a')
+        self.queue('b')
+        self.assertEqual(deploy_queue.deploy_queued_instances(), 0)
+        deploy_queue.instance_deploy_many.assert_called_once_with(
+            [('10.0.0.1', 'user', 'a'), ('10.0.0.1', 'user', 'b')]
+        )
+        self.assertEqual(
+            deploy_queue.resume_chain.call_args_list,
+            [mock.call(['callback-a'], None),
+             mock.call(['callback-b'], None)]
+        )
+        self.assertEqual(self.queued(), [])
+        self.assertEqual(self.queued(deploy_queue.IN_PROGRESS_KEY), [])
+
+    def test_failed_instances_are_queued_again(self):
+        self.failing.add('a')
+        self.queue('a')
+        self.queue('b')
+        self.assertEqual(deploy_queue.deploy_queued_instances(), 1)
+        self.assertEqual(self.queued(), ['task-a'])
+        self.assertEqual(
+            deploy_queue.take_queued_instances()['task-a']['attempts'], 1
+        )
+        self.assertFalse(deploy_queue.fail_chain.called)
+
+    def test_instances_out_of_retries_fail_their_chain(self):
+        self.failing.add('a')
+        self.queue('a', attempts=2)
+        self.assertEqual(deploy_queue.deploy_queued_instances(), 0)
+        (task_id, errbacks, _) = deploy_queue.fail_chain.call_args[0]
+        self.assertEqual((task_id, errbacks), ('task-a', ['errback-a']))
+        self.assertEqual(self.queued(), [])
+        self.assertEqual(self.queued(deploy_queue.IN_PROGRESS_KEY), [])
+
+    def test_interrupted_instances_are_queued_again(self):
+        self.queue('a')
+        deploy_queue.take_queued_instances()
+        # Taken by a run that died
+        self.assertEqual(deploy_queue.requeue_stale_instances(), 0)
+        with mock.patch(
+            'service.deploy_queue.time.time', return_value=time.time() + 3600
+        ):
+            self.assertEqual(deploy_queue.requeue_stale_instances(), 1)
+        self.assertEqual(self.queued(), ['task-a'])
+        self.assertEqual(self.queued(deploy_queue.IN_PROGRESS_KEY), [])
+
+    def test_a_single_run_is_scheduled(self):
+        self.assertTrue(deploy_queue.schedule_run(30))
+        self.assertFalse(deploy_queue.schedule_run(30))
+        deploy_queue.deploy_queued_instances()
+        self.assertTrue(deploy_queue.schedule_run(30))
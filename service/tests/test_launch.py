@@ -0,0 +1,92 @@
+import time
+
+from django.test import TestCase, override_settings
+import mock
+
+from service.instance import _launch_setup, _pre_launch_validation
+
+
+@mock.patch('service.instance._test_for_licensing')
+@mock.patch('service.instance._retrieve_source')
+@mock.patch('service.instance.check_application_threshold')
+@mock.patch('service.instance.check_allocation')
+@mock.patch('service.instance.check_quota')
+@mock.patch('service.instance.CoreIdentity')
+class PreLaunchValidationTest(TestCase):
+    def validate(self, timings=None):
+        boot_source = mock.Mock()
+        boot_source.is_machine.return_value = True
+        _pre_launch_validation(
+            'user',
+            mock.Mock(),
+            'identity-uuid',
+            boot_source,
+            mock.Mock(),
+            None,
+            timings=timings
+        )
+
+    def test_every_validation_is_timed(self, *mocks):
+        timings = {}
+        self.validate(timings)
+        self.assertEqual(
+            sorted(timings.keys()), [
+                'check_allocation', 'check_application_threshold',
+                'check_licensing', 'check_quota'
+            ]
+        )
+        for mock_method in mocks[1:]:
+            self.assertEqual(mock_method.call_count, 1)
+
+    def test_quota_error_comes_first(
+        self, _, check_quota, check_allocation, *mocks
+    ):
+        check_quota.side_effect = ValueError("Over quota")
+        check_allocation.side_effect = KeyError("Over allocation")
+        with self.assertRaisesRegexp(ValueError, "Over quota"):
+            self.validate()
+        self.assertEqual(check_allocation.call_count, 1)
+
+    @override_settings(LAUNCH_VALIDATION_PARALLEL=False)
+    def test_serial_validation(self, _, check_quota, check_allocation, *mocks):
+        check_quota.side_effect = ValueError("Over quota")
+        with self.assertRaises(ValueError):
+            self.validate()
+        self.assertFalse(check_allocation.called)
+
+
+@mock.patch('service.instance.set_launch_setup_time')
+@mock.patch('service.instance.security_group_init')
+@mock.patch('service.instance.get_launch_setup_time')
+class LaunchSetupTest(TestCase):
+    def test_first_setup_runs_before_booting(
+        self, get_launch_setup_time, security_group_init, set_launch_setup_time
+    ):
+        get_launch_setup_time.return_value = None
+        _launch_setup(mock.Mock(), 'security_group')
+        self.assertTrue(security_group_init.called)
+        self.assertTrue(set_launch_setup_time.called)
+
+    def test_recent_setup_is_skipped(
+        self, get_launch_setup_time, security_group_init, set_launch_setup_time
+    ):
+        get_launch_setup_time.return_value = time.time()
+        with mock.patch(
+            'service.tasks.driver.launch_setup_task'
+        ) as launch_setup_task:
+            _launch_setup(mock.Mock(), 'security_group')
+        self.assertFalse(security_group_init.called)
+        self.assertFalse(launch_setup_task.apply_async.called)
+
+    def test_old_setup_is_redone_in_the_background(
+        self, get_launch_setup_time, security_group_init, set_launch_setup_time
+    ):
+        get_launch_setup_time.return_value = time.time() - 2 * 3600
+        with mock.patch(
+            'service.tasks.driver.launch_setup_task'
+        ) as launch_setup_task:
+            _launch_setup(mock.Mock(uuid='identity-uuid'), 'security_group')
+        self.assertFalse(security_group_init.called)
+        launch_setup_task.apply_async.assert_called_once_with(
+            args=('identity-uuid', 'security_group')
+        )
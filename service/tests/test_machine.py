@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from api.tests.factories import GroupFactory, ProviderMachineFactory
+from core.models import (
+    ApplicationMembership, ApplicationVersionMembership,
+    ProviderMachineMembership
+)
+from service.machine import bulk_update_db_membership
+
+
+class BulkUpdateDBMembershipTest(TestCase):
+    def test_missing_memberships_are_created_once(self):
+        machine = ProviderMachineFactory.create()
+        other_machine = ProviderMachineFactory.create()
+        group = GroupFactory.create()
+        other_group = GroupFactory.create()
+        ProviderMachineMembership.objects.create(
+            provider_machine=machine, group=group
+        )
+        machine_groups = [
+            (machine, [group, other_group]),
+            (other_machine, [group]),
+        ]
+
+        bulk_update_db_membership(machine_groups)
+        bulk_update_db_membership(machine_groups)
+
+        self.assertEqual(ProviderMachineMembership.objects.count(), 3)
+        self.assertEqual(ApplicationVersionMembership.objects.count(), 3)
+        self.assertEqual(ApplicationMembership.objects.count(), 3)
@@ -0,0 +1,70 @@
+from django.test import TestCase, override_settings
+import mock
+
+from service.tasks.monitoring import (
+    monitor_instances_for, _monitor_instances_batch
+)
+
+
+class MonitorInstancesTest(TestCase):
+    def setUp(self):
+        self.provider = mock.Mock()
+        self.provider.type.name = 'OpenStack'
+        self.instance_map = dict(
+            ('tenant-%s' % index, ['instance-%s' % index])
+            for index in range(5)
+        )
+        patchers = [
+            mock.patch('service.tasks.monitoring.Provider'),
+            mock.patch(
+                'service.tasks.monitoring._get_instance_owner_map',
+                return_value=self.instance_map
+            ),
+            mock.patch('service.tasks.monitoring.db'),
+            mock.patch('service.tasks.monitoring._monitor_tenant_instances'),
+        ]
+        (provider_model, _, self.db,
+         self.monitor_tenant) = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        provider_model.objects.get.return_value = self.provider
+
+    def monitored_tenants(self):
+        return sorted(call[0][1] for call in self.monitor_tenant.call_args_list)
+
+    @override_settings(MONITOR_INSTANCES_BATCH_SIZE=2)
+    def test_batches_are_monitored_across_threads(self):
+        with mock.patch(
+            'service.tasks.monitoring._monitor_instances_batch',
+            wraps=_monitor_instances_batch
+        ) as monitor_batch:
+            monitor_instances_for(1, concurrency=2)
+        self.assertEqual(
+            sorted(call[0][2] for call in monitor_batch.call_args_list),
+            [['tenant-0', 'tenant-1'], ['tenant-2', 'tenant-3'], ['tenant-4']]
+        )
+        self.assertEqual(self.monitored_tenants(), sorted(self.instance_map))
+        # Each worker thread releases its database connection
+        self.assertEqual(self.db.connection.close.call_count, 3)
+
+    @override_settings(MONITOR_INSTANCES_BATCH_SIZE=2)
+    def test_serial_monitoring_keeps_the_connection(self):
+        monitor_instances_for(1, concurrency=1)
+        self.assertEqual(self.monitored_tenants(), sorted(self.instance_map))
+        self.assertFalse(self.db.connection.close.called)
+
+    def test_failed_tenant_does_not_stop_its_batch(self):
+        def monitor_tenant(provider, tenant_name, running_instances):
+            if tenant_name == 'tenant-1':
+                raise Exception("Could not reach %s" % tenant_name)
+
+        self.monitor_tenant.side_effect = monitor_tenant
+        _monitor_instances_batch(
+            self.provider,
+            self.instance_map, ['tenant-0', 'tenant-1', 'tenant-2'],
+            close_connection=True
+        )
+        self.assertEqual(
+            self.monitored_tenants(), ['tenant-0', 'tenant-1', 'tenant-2']
+        )
+        self.assertEqual(self.db.connection.close.call_count, 1)
@@ -0,0 +1,130 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+import mock
+
+from service.quota import check_over_storage_quota, check_usage, get_usage
+
+
+def cloud_instance(cpu, ram):
+    instance = mock.Mock()
+    instance.size._size.extra = {'cpu': cpu}
+    instance.size._size.ram = ram
+    return instance
+
+
+def quota(**limits):
+    values = dict(
+        cpu=-1,
+        memory=-1,
+        instance_count=-1,
+        floating_ip_count=-1,
+        port_count=-1,
+        storage=None,
+        storage_count=None,
+        snapshot_count=-1
+    )
+    values.update(limits)
+    return mock.Mock(**values)
+
+
+class QuotaUsageTest(TestCase):
+    def setUp(self):
+        self.driver = mock.Mock()
+        self.driver.list_instances.return_value = [
+            cloud_instance(2, 4096),
+            cloud_instance(4, 8192)
+        ]
+        self.driver.list_volumes.return_value = [
+            mock.Mock(size=10), mock.Mock(size=20)
+        ]
+        self.driver._connection.ex_list_floating_ips.return_value = [{}]
+        self.driver._connection.ex_list_snapshots.return_value = []
+        network_driver = mock.Mock()
+        network_driver.get_tenant_id.return_value = 'project'
+        network_driver.list_ports.return_value = [
+            {
+                'device_owner': 'compute:nova'
+            }, {
+                'device_owner': 'compute:nova',
+                'project_id': 'other-project'
+            }, {
+                'device_owner': 'network:router_interface'
+            }
+        ]
+        patcher = mock.patch(
+            'service.instance._to_network_driver', return_value=network_driver
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_each_resource_is_listed_once(self):
+        usage = get_usage(mock.Mock(), driver=self.driver)
+        self.assertEqual(
+            usage, {
+                'cpu': 6,
+                'memory': 12.0,
+                'instance_count': 2,
+                'floating_ip_count': 1,
+                'port_count': 1,
+                'storage': 30,
+                'storage_count': 2,
+                'snapshot_count': 0,
+            }
+        )
+        self.assertEqual(self.driver.list_instances.call_count, 1)
+        self.assertEqual(self.driver.list_volumes.call_count, 1)
+
+    def test_only_requested_resources_are_listed(self):
+        usage = get_usage(
+            mock.Mock(), resources=['storage'], driver=self.driver
+        )
+        self.assertEqual(usage, {'storage': 30})
+        self.assertFalse(self.driver.list_instances.called)
+
+    def test_unreachable_network_passes(self):
+        with mock.patch(
+            'service.instance._to_network_driver', side_effect=Exception
+        ):
+            usage = get_usage(
+                mock.Mock(), resources=['port_count'], driver=self.driver
+            )
+        self.assertTrue(
+            check_usage(quota(port_count=1), usage, {'port_count': 1})
+        )
+
+    def test_check_usage(self):
+        usage = get_usage(mock.Mock(), driver=self.driver)
+        self.assertTrue(check_usage(quota(cpu=8), usage, {'cpu': 2}))
+        self.assertFalse(
+            check_usage(quota(cpu=8), usage, {'cpu': 4}, raise_exc=False)
+        )
+        with self.assertRaisesRegexp(ValidationError, 'Memory Quota Exceeded'):
+            check_usage(quota(memory=14), usage, {'memory': 4})
+
+    def test_negative_volume_limits_are_not_unlimited(self):
+        usage = get_usage(mock.Mock(), driver=self.driver)
+        self.assertTrue(check_usage(quota(cpu=-1), usage, {'cpu': 2}))
+        self.assertFalse(
+            check_usage(quota(storage=-1), usage, {'storage': 1}, False)
+        )
+        self.assertFalse(
+            check_usage(
+                quota(storage_count=-1), usage, {'storage_count': 1}, False
+            )
+        )
+
+    def test_negative_storage_limit_blocks_new_volumes(self):
+        memberships = mock.MagicMock()
+        memberships.first.return_value.identity.quota = quota(storage=-1)
+        with mock.patch(
+            'service.quota.IdentityMembership.objects.filter',
+            return_value=memberships
+        ), mock.patch(
+            'service.quota.get_cached_driver', return_value=self.driver
+        ):
+            self.assertFalse(
+                check_over_storage_quota(
+                    'user', 'identity', new_volume_size=1, raise_exc=False
+                )
+            )
+        self.assertEqual(self.driver.list_volumes.call_count, 1)
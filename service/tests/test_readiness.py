@@ -0,0 +1,128 @@
+from django.test import TestCase
+import mock
+
+from service import readiness
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hdel(self, key, field):
+        return 1 if self.data.get(key, {}).pop(field, None) else 0
+
+
+class FakeIdentity(object):
+    def __init__(self, key):
+        self.credentials = {'key': key}
+
+
+def cloud_instance(alias, status):
+    return mock.Mock(
+        id=alias, _node=mock.Mock(extra={
+            'status': status,
+            'metadata': {}
+        })
+    )
+
+
+class ReadinessWatcherTest(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.driver = mock.Mock()
+        self.driver.list_instances.return_value = [
+            cloud_instance('ready', 'active'),
+            cloud_instance('building', 'build')
+        ]
+        patches = [
+            mock.patch(
+                'service.readiness.redis_connection', return_value=self.redis
+            ),
+            mock.patch(
+                'service.readiness.get_driver', return_value=self.driver
+            ),
+            mock.patch('service.readiness.app'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.app = readiness.app
+
+    def watch(self, alias, identity=None):
+        readiness.watch_instance(
+            'task-%s' % alias,
+            alias,
+            'driverCls',
+            'provider',
+            identity or FakeIdentity('user'),
+            'active',
+            callbacks=['callback-%s' % alias],
+            errbacks=['errback-%s' % alias]
+        )
+
+    def check(self, delay=0):
+        with mock.patch(
+            'service.readiness.time.time',
+            return_value=readiness.time.time() + delay
+        ):
+            return readiness.check_pending_instances()
+
+    def test_instances_of_a_driver_are_listed_together(self):
+        self.watch('ready')
+        self.watch('building')
+        self.assertEqual(self.check(delay=10), 1)
+        self.assertEqual(self.driver.list_instances.call_count, 1)
+        self.app.signature.assert_called_once_with('callback-ready')
+        self.app.signature.return_value.apply_async.assert_called_once_with(
+            (True, )
+        )
+        pending = self.redis.hgetall(readiness.PENDING_KEY)
+        self.assertEqual(pending.keys(), ['task-building'])
+
+    def test_instances_are_listed_with_their_own_driver(self):
+        admin_driver = mock.Mock()
+        admin_driver.list_instances.return_value = [
+            cloud_instance('ready', 'active')
+        ]
+        self.driver.list_instances.return_value = [
+            cloud_instance('building', 'build')
+        ]
+
+        def get_driver(driverCls, provider, identity):
+            if identity.credentials['key'] == 'admin':
+                return admin_driver
+            return self.driver
+
+        with mock.patch('service.readiness.get_driver', side_effect=get_driver):
+            self.watch('ready', identity=FakeIdentity('admin'))
+            self.watch('building')
+            self.assertEqual(self.check(delay=10), 1)
+        self.app.signature.return_value.apply_async.assert_called_once_with(
+            (True, )
+        )
+
+    def test_instances_are_not_checked_before_they_are_due(self):
+        self.watch('building')
+        self.assertEqual(self.check(), 0)
+        self.assertFalse(self.driver.list_instances.called)
+
+    def test_instance_not_ready_in_time_fails(self):
+        self.watch('building')
+        self.assertEqual(self.check(delay=250 * 15), 1)
+        self.assertTrue(self.app.backend.mark_as_failure.called)
+        self.assertEqual(self.redis.hgetall(readiness.PENDING_KEY), {})
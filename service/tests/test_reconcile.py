@@ -0,0 +1,58 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.factories import (
+    ApplicationVersionFactory, ProviderMachineFactory
+)
+from core.models import Application, ApplicationVersion, ProviderMachine
+from service.reconcile import reconcile, end_date_machines
+
+
+class ReconcileTest(TestCase):
+    def test_diff_is_keyed_on_identifier(self):
+        db_objects = [('a', 1), ('b', 1), ('c', 1)]
+        cloud_objects = [('b', 1), ('c', 2), ('d', 1)]
+        diff = reconcile(
+            db_objects,
+            cloud_objects,
+            db_key=lambda obj: obj[0],
+            cloud_key=lambda obj: obj[0],
+            has_changed=lambda db_obj, cloud_obj: db_obj[1] != cloud_obj[1]
+        )
+        self.assertEqual(diff.added, [('d', 1)])
+        self.assertEqual(diff.removed, [('a', 1)])
+        self.assertEqual(diff.changed, [(('c', 1), ('c', 2))])
+
+
+class EndDateMachinesTest(TestCase):
+    def test_end_date_cascades_to_versions_and_applications(self):
+        version = ApplicationVersionFactory.create()
+        shared_version = ApplicationVersionFactory.create()
+        missing = ProviderMachineFactory.create(application_version=version)
+        missing_shared = ProviderMachineFactory.create(
+            application_version=shared_version
+        )
+        still_current = ProviderMachineFactory.create(
+            application_version=shared_version
+        )
+        now_time = timezone.now()
+
+        counts = end_date_machines([missing, missing_shared], now_time)
+
+        self.assertEqual(counts, (2, 1, 1))
+        self.assertEqual(
+            ProviderMachine.objects.get(id=missing.id).end_date, now_time
+        )
+        self.assertIsNone(
+            ProviderMachine.objects.get(id=still_current.id).end_date
+        )
+        self.assertEqual(
+            ApplicationVersion.objects.get(id=version.id).end_date, now_time
+        )
+        self.assertIsNone(
+            ApplicationVersion.objects.get(id=shared_version.id).end_date
+        )
+        self.assertEqual(
+            Application.objects.get(id=version.application_id).end_date,
+            now_time
+        )
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from django.test import TestCase
+import pytz
+
+from api.tests.factories import (
+    IdentityFactory, InstanceFactory, InstanceHistoryFactory,
+    InstanceStatusFactory, ProviderMachineFactory, TagFactory, UserFactory
+)
+from core.models import Instance
+from service.reporting import REPORT_HEADERS, report_rows, summarize
+
+
+class ReportingTest(TestCase):
+    def setUp(self):
+        self.user = UserFactory.create(username='test-username')
+        identity = IdentityFactory.create_identity(created_by=self.user)
+        machine = ProviderMachineFactory.create_provider_machine(
+            self.user, identity
+        )
+        machine.application_version.application.tags.add(
+            TagFactory.create(name='featured')
+        )
+        active = InstanceStatusFactory.create(name='active')
+        deploy_error = InstanceStatusFactory.create(name='deploy_error')
+        for (month, status) in [(1, active), (1, deploy_error), (2, None)]:
+            instance = InstanceFactory.create(
+                provider_alias='instance-%s-%s' % (month, status),
+                source=machine.instance_source,
+                created_by=self.user,
+                created_by_identity=identity,
+                start_date=datetime(2017, month, 15, tzinfo=pytz.utc)
+            )
+            if status:
+                InstanceHistoryFactory.create(
+                    status=status, activity="", instance=instance
+                )
+
+    def test_report_rows(self):
+        rows = [
+            dict(zip(REPORT_HEADERS, row))
+            for row in report_rows(Instance.objects.all())
+        ]
+        self.assertEqual(
+            [row['instance_id'] for row in rows],
+            ['instance-1-active', 'instance-1-deploy_error', 'instance-2-None']
+        )
+        self.assertEqual(
+            [
+                (
+                    row['hit_active'], row['hit_deploy_error'],
+                    row['hit_aborted']
+                ) for row in rows
+            ],
+            [(True, False, False), (False, True, False), (False, False, True)]
+        )
+        self.assertTrue(all(row['is_featured_image'] for row in rows))
+
+    def test_sizes_without_last_history(self):
+        # As left by instances saved before `last_history` was added
+        Instance.objects.update(last_history=None)
+        instance = Instance.objects.get(provider_alias='instance-1-active')
+        size = instance.instancestatushistory_set.get().size
+        row = dict(
+            zip(
+                REPORT_HEADERS,
+                next(report_rows(Instance.objects.filter(id=instance.id)))
+            )
+        )
+        self.assertEqual(
+            (row['size.name'], row['size.cpu']), (size.name, size.cpu)
+        )
+
+    def test_summaries_are_grouped_by_period(self):
+        header, summary = summarize(
+            Instance.objects.all(), 'MS', 'username', ['Active', 'Aborted']
+        )
+        self.assertEqual(
+            header, [
+                'Start Date', 'Username', 'Average of Active', 'Sum of Active',
+                'Average of Aborted', 'Sum of Aborted'
+            ]
+        )
+        self.assertEqual(
+            [row[:2] for row in summary], [
+                (datetime(2017, 1, 1, tzinfo=pytz.utc), 'test-username'),
+                (datetime(2017, 2, 1, tzinfo=pytz.utc), 'test-username'),
+            ]
+        )
+        self.assertEqual(summary[0][2:], (0.5, 1, 0.0, 0))
+        self.assertEqual(summary[1][2:], (0.0, 0, 1.0, 1))
@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from api.tests.factories import ImageFactory, TagFactory
+from core.models import Application
+from service.search import full_text_search
+
+
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        self.ubuntu = ImageFactory.create(
+            name='Ubuntu 16.04', description='Base image with Docker'
+        )
+        self.centos = ImageFactory.create(
+            name='CentOS 7', description='Minimal install'
+        )
+
+    def search(self, query):
+        return list(full_text_search(Application.objects.all(), query))
+
+    def test_terms_match_as_prefixes(self):
+        self.assertEqual(self.search('ubun'), [self.ubuntu])
+        self.assertEqual(self.search('cent min'), [self.centos])
+
+    def test_typos_match_the_name(self):
+        self.assertEqual(self.search('Ubunto 16.04'), [self.ubuntu])
+
+    def test_search_vector_follows_tags(self):
+        tag = TagFactory.create(name='bioinformatics')
+        self.centos.tags.add(tag)
+        self.assertEqual(self.search('bioinfo'), [self.centos])
+
+        tag.name = 'genomics'
+        tag.save()
+        self.assertEqual(self.search('bioinfo'), [])
+        self.assertEqual(self.search('genom'), [self.centos])
+
+        self.centos.tags.remove(tag)
+        self.assertEqual(self.search('genom'), [])
+
+    def test_name_ranks_above_description(self):
+        docker = ImageFactory.create(name='Docker', description='Containers')
+        results = self.search('docker')
+        self.assertEqual(results, [docker, self.ubuntu])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+        self.assertIn('<b>Docker</b>', results[1].search_headline)
@@ -0,0 +1,91 @@
+from django.test import TestCase
+import mock
+
+from service.accounts.openstack_manager import AccountDriver
+from service.monitoring import _convert_tenant_id_to_names
+
+
+class FakeInstance(object):
+    def __init__(self, node, driver):
+        self.id = node['id']
+        self.extra = node['extra']
+        self._node = mock.Mock(extra=node['extra'])
+
+
+def server(server_id, tenant_id, status='active'):
+    return {
+        'id': server_id,
+        'extra': {
+            'tenantId': tenant_id,
+            'status': status,
+            'metadata': {}
+        }
+    }
+
+
+def project(project_id):
+    tenant = mock.Mock(id=project_id)
+    # 'name' is taken by the Mock constructor
+    tenant.name = 'name-%s' % project_id
+    return tenant
+
+
+class TenantInstancesMapTest(TestCase):
+    def setUp(self):
+        with mock.patch.object(AccountDriver, '__init__', return_value=None):
+            self.accounts = AccountDriver()
+        self.projects = [project('p1'), project('p2'), project('p3')]
+        self.accounts.project_list = self.projects
+        self.accounts.identity_version = 2
+        pages = [
+            [server('i1', 'p1'),
+             server('i2', 'p2', 'shutoff')],
+        # Pages have been known to repeat
+            [server('i2', 'p2', 'shutoff'),
+             server('i3', 'p1')],
+            [server('i3', 'p1')],
+        ]
+        admin_driver = mock.Mock()
+        admin_driver.provider.instanceCls = FakeInstance
+        lc_driver = admin_driver._connection
+        lc_driver.connection.request.side_effect = [
+            mock.Mock(object={'servers': page}) for page in pages
+        ]
+        lc_driver._to_nodes.side_effect = lambda data: data['servers']
+        self.accounts.admin_driver = admin_driver
+        self.request = lc_driver.connection.request
+
+    def test_instances_are_mapped_to_their_tenant(self):
+        tenant_map = self.accounts.tenant_instances_map(include_empty=True)
+        self.assertEqual(
+            dict(
+                (tenant.id, [instance.id for instance in instances])
+                for (tenant, instances) in tenant_map.items()
+            ), {
+                'p1': ['i1', 'i3'],
+                'p2': ['i2'],
+                'p3': []
+            }
+        )
+        self.assertEqual(
+            self.request.call_args_list[-1][1]['params']['marker'], 'i3'
+        )
+
+    def test_status_filter(self):
+        tenant_map = self.accounts.tenant_instances_map(status_list=['shutoff'])
+        self.assertEqual(
+            [
+                (tenant.id, [instance.id for instance in instances])
+                for (tenant, instances) in tenant_map.items()
+            ], [('p2', ['i2'])]
+        )
+
+
+class ConvertTenantIdToNamesTest(TestCase):
+    def test_owners_are_renamed(self):
+        instances = [mock.Mock(owner='p1'), mock.Mock(owner='unknown')]
+        tenants = [project('p1'), {'id': 'p2', 'name': 'name-p2'}]
+        _convert_tenant_id_to_names(instances, tenants)
+        self.assertEqual(
+            [instance.owner for instance in instances], ['name-p1', 'unknown']
+        )
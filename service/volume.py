@@ -1,12 +1,11 @@
 from threepio import logger
 
 from django.core.exceptions import ValidationError
-from core.models.quota import get_quota, has_storage_count_quota
 from core.models.identity import Identity
 from core.models.volume import Volume
 from core.models.instance_source import InstanceSource
 
-from service.cache import get_cached_driver
+from service.cache import get_cached_driver, invalidate_cached_volumes
 from service.driver import _retrieve_source, get_esh_driver
 from service.quota import check_over_storage_quota
 from service import exceptions
@@ -43,7 +42,7 @@ def _update_volume_metadata(esh_driver, esh_volume, metadata={}):
     data = esh_volume.extra.get('metadata', {})
     data.update(metadata)
     try:
-        return esh_driver._connection.ex_update_volume_metadata(
+        result = esh_driver._connection.ex_update_volume_metadata(
             esh_volume, data
         )
     except Exception as e:
@@ -52,6 +51,22 @@ def _update_volume_metadata(esh_driver, esh_volume, metadata={}):
             return {}
         else:
             raise
+    invalidate_cached_volumes_of(esh_driver)
+    return result
+
+
+def invalidate_cached_volumes_of(esh_driver):
+    """
+    Invalidate the cached volume lists of the user of `esh_driver`.
+
+    Tasks only hold the rtwo driver, so every identity of its user is
+    invalidated.
+    """
+    user = getattr(esh_driver.identity, 'user', None)
+    if not user:
+        return
+    for identity in Identity.objects.filter(created_by__username=user.username):
+        invalidate_cached_volumes(identity=identity)
 
 
 def restrict_size_by_image(size, image):
@@ -170,15 +185,11 @@ def create_esh_volume(
     image=None,
     raise_exception=False
 ):
-    quota = get_quota(identity_uuid)
+    # Checks the storage size and the number of volumes
     try:
         check_over_storage_quota(username, identity_uuid, new_volume_size=size)
     except ValidationError as over_quota:
         raise exceptions.OverQuotaError(message=over_quota.message)
-    if not has_storage_count_quota(esh_driver, quota, 1):
-        raise exceptions.OverQuotaError(
-            message="Maximum # of Storage Volumes Exceeded"
-        )
     # NOTE: Calling non-standard create_volume_obj so we know the ID
     # of newly created volume. Libcloud just returns 'True'... --Steve
     conn_kwargs = {'max_attempts': 1}
@@ -194,6 +205,7 @@ def create_esh_volume(
     if not success and raise_exception:
         raise exceptions.VolumeError("The volume failed to be created.")
 
+    invalidate_cached_volumes(identity=Identity.objects.get(uuid=identity_uuid))
     return success, esh_volume
 
 
@@ -225,6 +237,7 @@ def destroy_volume_or_fail(volume, user, cascade=False):
     # destroy the volume successfully or raise an exception
     if not driver.destroy_volume(esh_volume):
         raise Exception("Encountered an error destroying the volume.")
+    invalidate_cached_volumes(identity=identity)
 
 
 def create_bootable_volume(
@@ -275,4 +288,6 @@ def attach_volume(driver, instance_id, volume_id, device_choice=None):
                 return volume
     # Step 1. Attach the volume
     # NOTE: device_choice !== device 100%
-    return driver.attach_volume(instance, volume, device_choice)
+    result = driver.attach_volume(instance, volume, device_choice)
+    invalidate_cached_volumes_of(driver)
+    return result